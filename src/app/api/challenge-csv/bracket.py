@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+bracket.py
+
+Flat array-backed single-elimination bracket that supports any field size.
+
+The bracket is a complete binary tree in heap layout (children of node i are
+2i+1 and 2i+2) over `size` leaves, where size is the next power of two >= the
+number of teams. Leaves hold team indices, or EMPTY for a bye. occupant[node]
+is the team that won that node (UNDECIDED until the match is played); a team
+facing an EMPTY sibling advances without a match, so byes only ever appear in
+round 1 and every later round costs one tree step per match.
+
+Byes are seeded: they go to the best teams by pre-tournament price and are
+spread over the bracket so bye teams meet round-1 winners rather than each
+other. Optional reseeding rebuilds the tree from the survivors after a round
+so that the best remaining seed meets the worst.
+
+Used by simulate_tournament.py, live_repricer.py, price_generation.py and
+generate_initial_state.py.
+"""
+
+EMPTY = -1      # no team in this subtree (bye)
+UNDECIDED = -2  # match not played yet
+
+
+# -------------------
+# SIZING & SEEDING
+# -------------------
+def bracket_size(num_teams):
+    """Number of leaves: the next power of two >= num_teams."""
+    if num_teams < 2:
+        raise ValueError(f"A bracket needs at least 2 teams, got {num_teams}")
+    return 1 << (num_teams - 1).bit_length()
+
+
+def bracket_rounds(num_teams):
+    """Rounds needed to crown a champion (ceil(log2(num_teams)))."""
+    return bracket_size(num_teams).bit_length() - 1
+
+
+def bye_count(num_teams):
+    return bracket_size(num_teams) - num_teams
+
+
+def seed_positions(size):
+    """Standard seeding order: position -> seed rank, e.g. size 4 -> [0, 3, 1, 2] (1v4, 2v3)."""
+    order = [0]
+    while len(order) < size:
+        total = 2 * len(order)
+        order = [s for seed in order for s in (seed, total - 1 - seed)]
+    return order
+
+
+def seed_ranking(teams):
+    """Team indices ordered best seed first (highest tournament_price; ties keep list order)."""
+    return sorted(range(len(teams)), key=lambda i: -float(teams[i].get("tournament_price") or 0.0))
+
+
+def split_byes(teams):
+    """Return (bye_indices, other_indices): the top seeds get the byes."""
+    ranking = seed_ranking(teams)
+    byes = ranking[:bye_count(len(teams))]
+    bye_set = set(byes)
+    return byes, [i for i in range(len(teams)) if i not in bye_set]
+
+
+# -------------------
+# LEAF LAYOUT
+# -------------------
+def leaves_from_pairs(pairs, byes):
+    """
+    Lay out round 1 from explicit matchups plus bye teams (best seed first).
+    Round-1 slots ranked highest by seed_positions hold the byes; the remaining
+    slots take the pairs in order, so with no byes this is plain sequential pairing.
+    """
+    half = len(pairs) + len(byes)
+    if half < 1 or half & (half - 1):
+        raise ValueError(f"{len(pairs)} matchups and {len(byes)} byes do not fill a bracket")
+    slot_rank = seed_positions(half)
+    leaves = []
+    pairs_iter = iter(pairs)
+    for k in range(half):
+        if slot_rank[k] < len(byes):
+            leaves.extend((byes[slot_rank[k]], EMPTY))
+        else:
+            leaves.extend(next(pairs_iter))
+    return leaves
+
+
+def leaves_from_ranking(ranking):
+    """Classic seeded layout (1 vs N, 2 vs N-1, ...) with byes for the top seeds."""
+    size = bracket_size(len(ranking))
+    return [ranking[seed] if seed < len(ranking) else EMPTY for seed in seed_positions(size)]
+
+
+# -------------------
+# TREE
+# -------------------
+def new_bracket(leaves):
+    """Build the flat tree over the given leaves and advance bye teams."""
+    size = len(leaves)
+    if size < 2 or size & (size - 1):
+        raise ValueError(f"Leaf count must be a power of two, got {size}")
+    occupant = [UNDECIDED] * (size - 1) + list(leaves)
+    position = {team: size - 1 + k for k, team in enumerate(leaves) if team != EMPTY}
+    for node in range(size - 2, -1, -1):
+        left, right = occupant[2 * node + 1], occupant[2 * node + 2]
+        if left == EMPTY and right == EMPTY:
+            occupant[node] = EMPTY
+        elif left == EMPTY and right >= 0:
+            occupant[node] = right
+            position[right] = node
+        elif right == EMPTY and left >= 0:
+            occupant[node] = left
+            position[left] = node
+    return {
+        "size": size,
+        "rounds": size.bit_length() - 1,
+        "occupant": occupant,
+        "position": position,
+    }
+
+
+def node_round(bracket, node):
+    """1-based round in which the match at this node is played."""
+    return bracket["rounds"] - ((node + 1).bit_length() - 1)
+
+
+def round_nodes(bracket, round_num):
+    """Tree indices of every node at the given round, left to right."""
+    level = bracket["rounds"] - round_num
+    if level < 0:
+        return range(0)
+    return range((1 << level) - 1, (1 << (level + 1)) - 1)
+
+
+def is_playable(bracket, node):
+    occupant = bracket["occupant"]
+    return (node < bracket["size"] - 1 and occupant[node] == UNDECIDED
+            and occupant[2 * node + 1] >= 0 and occupant[2 * node + 2] >= 0)
+
+
+def round_matches(bracket, round_num):
+    """[(node, teamA, teamB)] for the playable matches of a round, in match order."""
+    occupant = bracket["occupant"]
+    return [(node, occupant[2 * node + 1], occupant[2 * node + 2])
+            for node in round_nodes(bracket, round_num) if is_playable(bracket, node)]
+
+
+def match_node_for(bracket, team_a, team_b):
+    """Node at which two teams meet next; raises ValueError if they are not paired."""
+    position = bracket["position"]
+    node = (position[team_a] - 1) // 2
+    if position[team_a] == 0 or node != (position[team_b] - 1) // 2 or not is_playable(bracket, node):
+        raise ValueError(f"Teams {team_a} and {team_b} are not due to meet")
+    return node
+
+
+def advance(bracket, node, winner):
+    """Record the winner of the match at node."""
+    occupant = bracket["occupant"]
+    if winner not in (occupant[2 * node + 1], occupant[2 * node + 2]):
+        raise ValueError(f"Team {winner} did not play at node {node}")
+    occupant[node] = winner
+    bracket["position"][winner] = node
+    return bracket
+
+
+def champion(bracket):
+    """Winning team index, or None while the final is undecided."""
+    winner = bracket["occupant"][0]
+    return winner if winner >= 0 else None
+
+
+def survivors(bracket):
+    """Teams that have not been eliminated, in bracket order."""
+    occupant = bracket["occupant"]
+    alive = []
+    for team, node in bracket["position"].items():
+        parent = (node - 1) // 2
+        if node == 0 or occupant[parent] == UNDECIDED:
+            alive.append((node, team))
+    return [team for _, team in sorted(alive)]
+
+
+def reseed(bracket, ranking):
+    """New bracket over the survivors, laid out by their order in ranking (best first)."""
+    alive = set(survivors(bracket))
+    return new_bracket(leaves_from_ranking([t for t in ranking if t in alive]))
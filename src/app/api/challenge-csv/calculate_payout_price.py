@@ -3,6 +3,10 @@ import argparse
 import os
 import random
 import json
+import numpy as np
+from columnar import FORMATS, arrow_schema, columnar_path, write_rows
+from records import Trade
+from leaderboard import Leaderboard, state_path
 
 def load_teams(prices_file):
     teams = {}
@@ -50,7 +54,13 @@ def load_round_prices(prices_file, round_num):
     return prices
 
 def load_portfolio_state(portfolio_file):
-    """Load portfolio state from JSON file"""
+    """Load portfolio state: the stored cents ledger (<portfolio>.cents.json) as floats"""
+    # imported here: fixed_point imports this module
+    from fixed_point import load_ledger
+    return load_ledger(portfolio_file).to_portfolio()
+
+def load_portfolio_json(portfolio_file):
+    """Load a float portfolio JSON (or legacy CSV) that has no cents ledger yet"""
     portfolio = {}  # player_id -> {cumulative_pnl, liquid_balance, total_invested}
     try:
         with open(portfolio_file, 'r') as f:
@@ -80,14 +90,12 @@ def load_portfolio_state(portfolio_file):
     return portfolio
 
 def save_portfolio_state(portfolio, portfolio_file):
-    """Save updated portfolio state to JSON file"""
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(portfolio_file), exist_ok=True)
-    with open(portfolio_file, 'w') as f:
-        json.dump(portfolio, f, indent=2)
+    """Save portfolio state in cents (<portfolio>.cents.json) and the JSON file derived from it"""
+    from fixed_point import CentsLedger, save_ledger
+    save_ledger(CentsLedger.from_portfolio(portfolio), portfolio_file)
 
 def load_trades(trades_file, round_prices):
-    """Load trades, supporting both asset 1 and asset 2. Prices are looked up from round_prices."""
+    """Load trades as Trade records, supporting both asset 1 and asset 2. Prices are looked up from round_prices."""
     trades = []
     with open(trades_file, newline='') as f:
         reader = csv.DictReader(f)
@@ -117,22 +125,20 @@ def load_trades(trades_file, round_prices):
             else:
                 price = 0.0
             
-            trades.append({
-                "player_id": player_id,
-                "team_id": team_id,
-                "action": action.lower(),
-                "quantity": quantity,
-                "price": price,
-                "asset": asset_type
-            })
+            trades.append(Trade(player_id, team_id, action.lower(), quantity, price, asset_type))
     return trades
 
-def calculate_round(teams, outcomes, trades, round_prices, portfolio=None):
+def calculate_round(teams, outcomes, trades, round_prices, portfolio=None, holdings=None, check_positions=True):
     """
     Calculate payouts with both realized and unrealized P&L.
     
     Asset 1: Expires after round. Payout = 100 if correct, 0 if incorrect.
     Asset 2: Carries forward. Track current position and P&L.
+    
+    If a holdings dict is passed it is filled with the validated
+    player_id -> {(team, asset): net_quantity} map.
+    check_positions=False skips the overselling check, for trades whose sells
+    were already checked against carried-forward holdings (order_book.py).
     """
     player_positions = {}  # player_id -> {"asset1": {...}, "asset2": {...}}
     player_realized_pnl = {}  # player_id -> realized P&L
@@ -142,7 +148,7 @@ def calculate_round(teams, outcomes, trades, round_prices, portfolio=None):
     
     # Initialize player records
     for trade in trades:
-        player_id = trade["player_id"]
+        player_id = trade.player_id
         if player_id not in player_positions:
             player_positions[player_id] = {"asset1": [], "asset2": []}
             player_realized_pnl[player_id] = 0.0
@@ -159,12 +165,12 @@ def calculate_round(teams, outcomes, trades, round_prices, portfolio=None):
     
     # Process trades and validate positions
     for trade in trades:
-        player_id = trade["player_id"]
-        team_id = trade["team_id"]
-        action = trade["action"]
-        quantity = trade["quantity"]
-        price = trade["price"]
-        asset = trade["asset"]
+        player_id = trade.player_id
+        team_id = trade.team_id
+        action = trade.action
+        quantity = trade.quantity
+        price = trade.price
+        asset = trade.asset
         
         # Create holding key
         holding_key = (team_id, asset)
@@ -172,7 +178,7 @@ def calculate_round(teams, outcomes, trades, round_prices, portfolio=None):
             player_holdings[player_id][holding_key] = 0.0
         
         # Check if sell would result in negative position (overselling)
-        if action == "sell":
+        if action == "sell" and check_positions:
             current_holding = player_holdings[player_id][holding_key]
             if current_holding < quantity:
                 print(f"POSITION_ERROR:Player {player_id} trying to sell {quantity} of {team_id} asset {asset}, but only owns {current_holding}")
@@ -218,6 +224,9 @@ def calculate_round(teams, outcomes, trades, round_prices, portfolio=None):
                     "type": "sell"
                 })
     
+    if holdings is not None:
+        holdings.update(player_holdings)
+    
     # Calculate Asset 1 realized P&L (expires at end of round)
     for player_id, positions in player_positions.items():
         for position in positions["asset1"]:
@@ -303,7 +312,8 @@ def calculate_round(teams, outcomes, trades, round_prices, portfolio=None):
     
     return player_payouts
 
-def save_player_payouts(player_payouts, output_file):
+def save_player_payouts(player_payouts, output_file, columnar=None):
+    """Write payouts CSV; columnar="arrow"/"parquet" also writes a typed copy next to it."""
     # Ensure directory exists before writing
     output_dir = os.path.dirname(output_file)
     if output_dir and not os.path.exists(output_dir):
@@ -319,69 +329,53 @@ def save_player_payouts(player_payouts, output_file):
                 round(payouts.get("asset2_pnl", 0), 2),
                 round(payouts.get("total", 0), 2)
             ])
-
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--round", type=int, required=True, help="Round number")
-    parser.add_argument("--trades", type=str, required=True, help="Path to trades CSV")
-    parser.add_argument("--prices", type=str, default="initial_prices.csv", help="Path to current prices CSV")
-    parser.add_argument("--outcomes", type=str, default="tournament_outcomes.csv", help="Path to tournament outcomes CSV")
-    parser.add_argument("--round-prices", type=str, help="Path to round_N_prices.csv for asset prices")
-    parser.add_argument("--password", type=str, required=False, help="Password for this round (optional)")
-    parser.add_argument("--portfolio", type=str, default="portfolio_state.json", help="Path to portfolio state JSON file")
-    parser.add_argument("--payouts-output", type=str, help="Path where payouts CSV should be saved (optional)")
-    args = parser.parse_args()
-
-    teams = load_teams(args.prices)
-    outcomes = load_outcomes(args.outcomes, args.round)
     
-    # Load round prices (required for price lookups)
-    round_prices = {}
-    if args.round_prices:
-        round_prices = load_round_prices(args.round_prices, args.round)
-    else:
-        print("Warning: No round prices file provided. Prices will default to 0.")
-    
-    trades = load_trades(args.trades, round_prices)
-    
-    # Load portfolio state
-    portfolio = load_portfolio_state(args.portfolio)
-    
-    # Initialize all players first
+    if columnar:
+        write_rows([
+            [player_id,
+             round(payouts.get("asset1_realized", 0), 2),
+             round(payouts.get("asset2_pnl", 0), 2),
+             round(payouts.get("total", 0), 2)]
+            for player_id, payouts in player_payouts.items()
+        ], arrow_schema("payouts"), columnar_path(output_file, columnar), columnar)
+
+def init_player_portfolios(portfolio, trades):
+    """Give every player who traded this round a starting portfolio record."""
     for trade in trades:
-        player_id = trade["player_id"]
+        player_id = trade.player_id
         if player_id not in portfolio:
             portfolio[player_id] = {
                 "cumulative_pnl": 0,
                 "liquid_balance": 500,
                 "total_invested": 0
             }
-    
-    # Check spending limits before processing trades (accumulate costs per player)
+    return portfolio
+
+def check_spending_limits(trades, portfolio):
+    """Return True if every player's total buy cost fits within their liquid balance."""
+    # Accumulate costs per player
     player_costs = {}  # player_id -> total buy cost
     for trade in trades:
-        player_id = trade["player_id"]
-        if trade["action"] == "buy":
-            cost = trade["quantity"] * trade["price"]
+        player_id = trade.player_id
+        if trade.action == "buy":
+            cost = trade.quantity * trade.price
             player_costs[player_id] = player_costs.get(player_id, 0) + cost
     
     # Check each player's total costs against their balance
     for player_id, total_cost in player_costs.items():
         available = portfolio[player_id]["liquid_balance"]
         if total_cost > available:
-            print(f"SPENDING_LIMIT_ERROR")
-            return
-    
-    player_payouts = calculate_round(teams, outcomes, trades, round_prices, portfolio)
-    
-    # Check if calculation failed due to position error
-    if player_payouts is None:
-        return
-    
+            return False
+    return True
+
+def apply_round_to_portfolio(portfolio, trades, player_payouts, leaderboard=None):
+    """Fold one round's trades and payouts into the portfolio state (in place).
+       If a Leaderboard is given, each changed player is re-ranked in O(log n).
+    """
     # Track which players have trades in this round
     players_in_round = set()
     for trade in trades:
-        players_in_round.add(trade["player_id"])
+        players_in_round.add(trade.player_id)
     
     # Update portfolio state with round results
     for player_id in players_in_round:
@@ -402,16 +396,97 @@ def main():
         # Update liquid balance and total invested based on trades
         # Note: We need to account for the cash flow from the round P&L
         for trade in trades:
-            if trade["player_id"] == player_id:
-                if trade["action"] == "buy":
-                    portfolio[player_id]["liquid_balance"] -= trade["quantity"] * trade["price"]
-                    portfolio[player_id]["total_invested"] += trade["quantity"] * trade["price"]
-                elif trade["action"] == "sell":
-                    portfolio[player_id]["liquid_balance"] += trade["quantity"] * trade["price"]
-                    portfolio[player_id]["total_invested"] -= trade["quantity"] * trade["price"]
+            if trade.player_id == player_id:
+                if trade.action == "buy":
+                    portfolio[player_id]["liquid_balance"] -= trade.quantity * trade.price
+                    portfolio[player_id]["total_invested"] += trade.quantity * trade.price
+                elif trade.action == "sell":
+                    portfolio[player_id]["liquid_balance"] += trade.quantity * trade.price
+                    portfolio[player_id]["total_invested"] -= trade.quantity * trade.price
         
         # Add round P&L to liquid balance (realized gains/losses)
         portfolio[player_id]["liquid_balance"] += round_total
+        
+        if leaderboard is not None:
+            leaderboard.update(player_id, portfolio[player_id]["cumulative_pnl"])
+    return portfolio
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--round", type=int, required=True, help="Round number")
+    parser.add_argument("--trades", type=str, required=True, help="Path to trades CSV")
+    parser.add_argument("--prices", type=str, default="initial_prices.csv", help="Path to current prices CSV (unused; kept for compatibility)")
+    parser.add_argument("--outcomes", type=str, default="tournament_outcomes.csv", help="Path to tournament outcomes CSV")
+    parser.add_argument("--round-prices", type=str, help="Path to round_N_prices.csv for asset prices")
+    parser.add_argument("--password", type=str, required=False, help="Password for this round (optional)")
+    parser.add_argument("--portfolio", type=str, default="portfolio_state.json", help="Path to portfolio state JSON file")
+    parser.add_argument("--payouts-output", type=str, help="Path where payouts CSV should be saved (optional)")
+    parser.add_argument("--leaderboard-output", type=str, help="Path where the leaderboard CSV should be saved (optional)")
+    parser.add_argument("--columnar", choices=FORMATS, help="Also write payouts in a columnar format (optional)")
+    parser.add_argument("--results", type=str, help="Settle through the integer-id index of this tournament_results.csv "
+                                                     "(outcomes come from the results, not --outcomes)")
+    args = parser.parse_args()
+
+    # imported here: fixed_point, results_index and fast_trades import this module
+    from fixed_point import (
+        PositionError, QuantityError, cents_trades, load_ledger, load_round_prices_cents, load_trades_cents,
+        payouts_from_cents, save_ledger, settle_into, settle_round_cents, to_cents
+    )
+
+    if not args.round_prices:
+        print("Warning: No round prices file provided. Prices will default to 0.")
+    
+    # Money is settled and stored in integer cents (fixed_point.py)
+    ledger = load_ledger(args.portfolio)
+    if args.results:
+        from fast_trades import load_trade_columns
+        from results_index import PriceError, ResultsIndex, settle_columns
+        index = ResultsIndex.load(args.results)
+        try:
+            table = index.price_table(args.round_prices, args.round) if args.round_prices else np.zeros((len(index.names), 2))
+        except PriceError as e:
+            print(e)
+            return
+        cols = load_trade_columns(args.trades, index.round_prices(table))
+        try:
+            trades = cents_trades(cols)
+        except QuantityError as e:
+            print(e)
+            return
+        if not ledger.check_spending(trades):
+            print(f"SPENDING_LIMIT_ERROR")
+            return
+        player_payouts = settle_columns(cols, index, index.outcome_array(args.round), table)
+        if player_payouts is None:
+            return
+        player_ids = trades.players
+        realized = np.array([to_cents(player_payouts[p]["asset1_realized"]) for p in player_ids], dtype=np.int64)
+        asset2 = np.array([to_cents(player_payouts[p]["asset2_pnl"]) for p in player_ids], dtype=np.int64)
+    else:
+        outcomes = load_outcomes(args.outcomes, args.round)
+        prices = load_round_prices_cents(args.round_prices) if args.round_prices else {}
+        try:
+            trades = load_trades_cents(args.trades, prices)
+        except QuantityError as e:
+            print(e)
+            return
+        # Check spending limits before processing trades
+        if not ledger.check_spending(trades):
+            print(f"SPENDING_LIMIT_ERROR")
+            return
+        try:
+            player_ids, realized, asset2 = settle_round_cents(trades, outcomes, prices)
+        except PositionError as e:
+            print(e)
+            return
+    
+    # Load the ranking kept from the previous round, then re-rank only the players who traded
+    leaderboard = Leaderboard.for_portfolio(state_path(args.portfolio), ledger.to_portfolio())
+    problems = settle_into(ledger, trades, realized, asset2, leaderboard)
+    if problems:
+        print("\n".join(problems))
+        return
+    player_payouts = payouts_from_cents(player_ids, realized, asset2)
     
     # Save outputs - use provided payouts output path or default to script directory
     if args.payouts_output:
@@ -420,11 +495,14 @@ def main():
         # Fallback to script directory
         payouts_output_path = os.path.join(os.path.dirname(args.portfolio) if args.portfolio and os.path.dirname(args.portfolio) else ".", f"payouts_round{args.round}.csv")
     
-    save_player_payouts(player_payouts, payouts_output_path)
-    save_portfolio_state(portfolio, args.portfolio)
+    save_player_payouts(player_payouts, payouts_output_path, args.columnar)
+    leaderboard_output_path = args.leaderboard_output or os.path.join(os.path.dirname(payouts_output_path), f"leaderboard_round{args.round}.csv")
+    leaderboard.save(leaderboard_output_path)
+    save_ledger(ledger, args.portfolio)
+    leaderboard.save(state_path(args.portfolio), precision=None)
     
     # Output portfolio state as JSON for API consumption
-    portfolio_json = json.dumps(portfolio, indent=2)
+    portfolio_json = json.dumps(ledger.to_portfolio(), indent=2)
     print(f"PORTFOLIO_JSON:{portfolio_json}")
     print(f"Round {args.round} calculations complete.")
     print(f"Player payouts saved to payouts_round{args.round}.csv")
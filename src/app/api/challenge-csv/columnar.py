@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+columnar.py
+
+Optional typed columnar copies of the challenge's CSV outputs.
+
+Every writer (write_csv_visible, write_csv_internal, write_tournament_csv,
+write_round_price_files, save_player_payouts) can also emit its tables in
+Arrow IPC (".arrow") or Parquet (".parquet") format. CSV stays the
+compatibility export; the columnar copy sits next to it with the same stem.
+Files that hold two tables in one CSV (the initial state files) are split into
+<stem>.teams.<ext> and <stem>.matchups.<ext>.
+
+Arrow files are read through a memory map, so numeric columns come back as
+numpy arrays that point straight into the file (no parsing, no copy).
+
+Requires:
+ - pyarrow and numpy (only when a columnar format is requested)
+"""
+
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # optional: columnar output is disabled without pyarrow
+    pa = None
+
+FORMATS = ("arrow", "parquet")
+
+# -------------------
+# SCHEMAS
+# -------------------
+# (column, type) pairs; types are resolved lazily so this module imports without pyarrow
+SCHEMAS = {
+    "teams_visible": [
+        ("team_id", "int32"), ("team_name", "string"), ("offense", "float64"),
+        ("defense", "float64"), ("chemistry", "float64"), ("injury_risk", "float64"),
+        ("variance", "float64"), ("strength", "float64"), ("tournament_price", "float64"),
+    ],
+    "matchups_visible": [
+        ("match_id", "int32"), ("round", "int32"), ("team_A", "string"), ("team_B", "string"),
+        ("team_A_price", "float64"), ("team_B_price", "float64"),
+    ],
+    "teams_internal": [
+        ("team_id", "int32"), ("team_name", "string"), ("true_strength", "float64"),
+        ("dist_name", "string"), ("dist_params", "string"), ("tournament_price", "float64"),
+    ],
+    "matchups_internal": [
+        ("match_id", "int32"), ("team_A_id", "int32"), ("team_B_id", "int32"),
+        ("team_A", "string"), ("team_B", "string"),
+        ("team_A_price", "float64"), ("team_B_price", "float64"),
+    ],
+    "tournament_results": [
+        ("round", "int32"), ("match_id", "int32"),
+        ("teamA_id", "int32"), ("teamB_id", "int32"), ("teamA", "string"), ("teamB", "string"),
+        ("probA", "float64"), ("probB", "float64"),
+        ("winner_id", "int32"), ("loser_id", "int32"), ("winner", "string"), ("loser", "string"),
+    ],
+    "round_prices": [
+        ("match_id", "int32"), ("round", "int32"), ("team_A", "string"), ("team_B", "string"),
+        ("team_A_price", "float64"), ("team_B_price", "float64"),
+        ("team_A_tournament_price", "float64"), ("team_B_tournament_price", "float64"),
+    ],
+    "round_prices_spread": [
+        ("team_A_bid", "float64"), ("team_A_ask", "float64"),
+        ("team_B_bid", "float64"), ("team_B_ask", "float64"),
+        ("team_A_tournament_bid", "float64"), ("team_A_tournament_ask", "float64"),
+        ("team_B_tournament_bid", "float64"), ("team_B_tournament_ask", "float64"),
+    ],
+    "payouts": [
+        ("player_id", "string"), ("asset1_realized", "float64"),
+        ("asset2_pnl", "float64"), ("total_payout", "float64"),
+    ],
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Columnar output needs pyarrow (pip install pyarrow)")
+
+
+def _check_format(fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown columnar format {fmt}; expected one of {FORMATS}")
+
+
+def arrow_schema(*names):
+    """Concatenate the named SCHEMAS entries into one pyarrow schema."""
+    _require_pyarrow()
+    fields = []
+    for name in names:
+        fields.extend(pa.field(col, getattr(pa, typ)()) for col, typ in SCHEMAS[name])
+    return pa.schema(fields)
+
+
+def columnar_path(csv_path, fmt, table=None):
+    """round_1_prices.csv -> round_1_prices.arrow (or initial_state_internal.teams.arrow)."""
+    _check_format(fmt)
+    stem, _ = os.path.splitext(csv_path)
+    if table:
+        stem = f"{stem}.{table}"
+    return f"{stem}.{fmt}"
+
+
+# -------------------
+# WRITE / READ
+# -------------------
+def write_table(columns, schema, path, fmt):
+    """Write {column: sequence} with the given schema as an Arrow IPC or Parquet file."""
+    _require_pyarrow()
+    _check_format(fmt)
+    table = pa.table({f.name: pa.array(columns[f.name], type=f.type) for f in schema}, schema=schema)
+    if fmt == "arrow":
+        with pa.OSFile(path, "wb") as sink:
+            with ipc.new_file(sink, schema) as writer:
+                writer.write_table(table)
+    else:
+        pq.write_table(table, path)
+    return path
+
+
+def write_rows(rows, schema, path, fmt):
+    """Write a list of row dicts/lists (in schema column order for lists)."""
+    names = schema.names
+    columns = {name: [] for name in names}
+    for row in rows:
+        values = row if isinstance(row, (list, tuple)) else [row[name] for name in names]
+        for name, value in zip(names, values):
+            columns[name].append(value)
+    return write_table(columns, schema, path, fmt)
+
+
+def read_table(path):
+    """
+    Load a columnar file as {column: numpy array}. Arrow files are memory-mapped
+    and numeric columns are returned zero-copy; string columns become object arrays.
+    """
+    _require_pyarrow()
+    if path.endswith(".parquet"):
+        table = pq.read_table(path)
+    else:
+        table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+    out = {}
+    for name in table.column_names:
+        col = table.column(name)
+        chunk = col.chunk(0) if col.num_chunks == 1 else col.combine_chunks()
+        numeric = pa.types.is_integer(chunk.type) or pa.types.is_floating(chunk.type)
+        out[name] = chunk.to_numpy(zero_copy_only=numeric and chunk.null_count == 0)
+    return out
@@ -1,10 +1,13 @@
 # distributions.py
-import math, random
-from typing import Callable, Dict, Any, Tuple
+import json, math, os, random, tempfile
+from typing import Callable, Dict, Any, Optional, Tuple
 
 # ----------------------------
 # Utility samplers (centered such that E[perf] = strength)
 # Strength is expected to be a float (recommended in [0,1])
+# Some raw samplers are not mean-centered (max_of_n, mixture_normal,
+# skew_normal_approx); the calibration section below removes their offset
+# before sampling, see calibrated_strength().
 # ----------------------------
 
 def sampler_normal(strength: float, params: Dict[str,Any]):
@@ -103,6 +106,114 @@ SAMPLERS = {
     'skew_normal_approx': sampler_skew_normal_approx
 }
 
+# ----------------------------
+# Mean calibration
+# Every sampler except lognormal and beta is a location family:
+# perf = strength + noise, so E[perf] - strength is a constant per spec.
+# mean_offset(spec) computes it once (closed form or numeric integration where
+# available, else one large simulation), memoizes it in-process and in
+# CALIBRATION_FILE, and calibrated_strength() subtracts it before sampling.
+# ----------------------------
+CALIBRATE = True
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sampler_calibration.json')
+CALIBRATION_DRAWS = 400000
+CALIBRATION_SEED = 2024
+EXACT_MEAN = {'lognormal', 'beta'}   # mean already equals strength (and not a location family)
+_OFFSETS = None                      # spec_key -> {'offset', 'method'}
+
+def spec_key(spec: Dict[str,Any]) -> str:
+    """Canonical key: sampler name plus its params with defaults left implicit."""
+    return json.dumps([spec.get('name', 'normal'), spec.get('params', {}) or {}], sort_keys=True)
+
+def expected_max_std_normal(n: int, steps: int = 4000, lim: float = 12.0) -> float:
+    # E[max of n iid N(0,1)] = integral of x * n * phi(x) * Phi(x)^(n-1) dx (Simpson's rule)
+    h = 2 * lim / steps
+    total = 0.0
+    for i in range(steps + 1):
+        x = -lim + i * h
+        phi = math.exp(-0.5 * x * x) / math.sqrt(2 * math.pi)
+        Phi = 0.5 * (1 + math.erf(x / math.sqrt(2)))
+        w = 1 if i in (0, steps) else (4 if i % 2 else 2)
+        total += w * x * n * phi * Phi ** (n - 1)
+    return total * h / 3
+
+def _analytic_offset(name: str, params: Dict[str,Any]) -> Optional[float]:
+    if name in ('normal', 'laplace', 'logistic') or name in EXACT_MEAN:
+        return 0.0
+    if name == 'student_t':
+        return 0.0   # symmetric; for df <= 1 the mean is undefined and this centers the median
+    if name == 'mixture_normal':
+        p = params.get('p', 0.3)
+        delta = params.get('delta', 0.07)
+        return p * delta - (1 - p) * delta
+    if name == 'max_of_n':
+        return -0.02 + params.get('sd', 0.05) * expected_max_std_normal(params.get('n', 3))
+    if name == 'skew_normal_approx':
+        return params.get('sd', 0.05) * params.get('rho', 0.6) * math.sqrt(2 / math.pi)
+    return None
+
+def _simulated_offset(name: str, params: Dict[str,Any], draws: int = CALIBRATION_DRAWS) -> float:
+    # one-time simulation at strength 0; leaves the global random stream untouched
+    state = random.getstate()
+    random.seed(CALIBRATION_SEED)
+    try:
+        sampler = SAMPLERS[name]
+        return math.fsum(sampler(0.0, params) for _ in range(draws)) / draws
+    finally:
+        random.setstate(state)
+
+def load_calibration(path: Optional[str] = None) -> Dict[str, Dict[str,Any]]:
+    try:
+        with open(path or CALIBRATION_FILE) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def save_calibration(table: Dict[str, Dict[str,Any]], path: Optional[str] = None) -> bool:
+    # temp file + replace so concurrent processes never read a partial table.
+    # Persisting is best effort: on a read-only or missing directory the
+    # offsets stay memoized in-process and False is returned.
+    path = path or CALIBRATION_FILE
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(table, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+def mean_offset(spec: Dict[str,Any]) -> float:
+    """E[perf] - strength for a spec, computed once and memoized (in-process and on disk)."""
+    global _OFFSETS
+    if _OFFSETS is None:
+        _OFFSETS = load_calibration()
+    key = spec_key(spec)
+    entry = _OFFSETS.get(key)
+    if entry is None:
+        name = spec.get('name', 'normal')
+        params = spec.get('params', {}) or {}
+        if name not in SAMPLERS:
+            raise ValueError(f"Unknown sampler {name}")
+        offset = _analytic_offset(name, params)
+        entry = {'offset': offset, 'method': 'analytic'} if offset is not None else \
+            {'offset': _simulated_offset(name, params), 'method': f'simulated_{CALIBRATION_DRAWS}'}
+        _OFFSETS[key] = entry
+        save_calibration(_OFFSETS)
+    return entry['offset']
+
+def calibrated_strength(strength: float, spec: Dict[str,Any]) -> float:
+    """Strength to pass to the raw sampler so that E[perf] = strength."""
+    if not CALIBRATE:
+        return strength
+    name = spec.get('name', 'normal')
+    if name in EXACT_MEAN or name in ('normal', 'laplace', 'logistic'):
+        return strength
+    return strength - mean_offset(spec)
+
 # ----------------------------
 # Probability estimation
 # ----------------------------
@@ -158,7 +269,8 @@ def get_sampler_from_spec(spec: Dict[str,Any]) -> Callable:
     func = SAMPLERS.get(name)
     if func is None:
         raise ValueError(f"Unknown sampler {name}")
-    return lambda s: func(s, params)
+    offset = calibrated_strength(0.0, spec)
+    return lambda s: func(s + offset, params)
 
 def probability_A_beats_B(teamA_strength: float, teamB_strength: float,
                           specA: Dict[str,Any], specB: Dict[str,Any],
@@ -171,6 +283,8 @@ def probability_A_beats_B(teamA_strength: float, teamB_strength: float,
     nameB = specB.get('name', 'normal')
     paramsA = specA.get('params', {})
     paramsB = specB.get('params', {})
+    teamA_strength = calibrated_strength(teamA_strength, specA)
+    teamB_strength = calibrated_strength(teamB_strength, specB)
 
     # # analytic normal-normal
     # if nameA == 'normal' and nameB == 'normal':
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+edge_report.py
+
+Line up published round prices with exact model fair values and report the
+mispricing available to players.
+
+Fair values come from price_generation.fair_value_table: Asset 1 is the model
+match probability (probA/probB * 100) and Asset 2 the bracket title probability
+at the start of the round. Published prices are joined to them on match_id
+through a sorted index (np.searchsorted), and every price set is handled as a
+row of a (n_scenarios, n_matches) array, so thousands of generated price sets
+are compared in one vectorized pass.
+
+Edge per contract is |published - fair|: the expected profit per contract from
+buying below fair or selling above it.
+
+Outputs:
+ - edge_report.csv  (per contract, first price set)
+ - edge_summary.csv (per price set, round and asset)
+
+Requires:
+ - initial_state_internal.csv, tournament_results.csv, round_N_prices.csv
+ - numpy
+"""
+
+import argparse
+import csv
+import glob
+import os
+import re
+import numpy as np
+from live_repricer import load_results
+from price_generation import fair_value_table
+from simulate_tournament import load_teams
+
+# -------------------
+# CONFIG
+# -------------------
+INPUT_INTERNAL = "initial_state_internal.csv"
+INPUT_RESULTS = "tournament_results.csv"
+OUTPUT_REPORT = "edge_report.csv"
+OUTPUT_SUMMARY = "edge_summary.csv"
+
+# (side, asset, published column, fair column)
+CONTRACTS = [
+    ("A", "1", "team_A_price", "asset1_A"),
+    ("B", "1", "team_B_price", "asset1_B"),
+    ("A", "2", "team_A_tournament_price", "asset2_A"),
+    ("B", "2", "team_B_tournament_price", "asset2_B"),
+]
+
+
+# -------------------
+# LOADING
+# -------------------
+def load_published(prices_dir="."):
+    """Read every round_N_prices.csv in a directory into column arrays (one row per match)."""
+    paths = []
+    for path in glob.glob(os.path.join(prices_dir, "round_*_prices.csv")):
+        m = re.search(r"round_(\d+)_prices\.csv$", path)
+        if m:
+            paths.append((int(m.group(1)), path))
+    columns = {"match_id": []}
+    columns.update({col: [] for _, _, col, _ in CONTRACTS})
+    for _, path in sorted(paths):
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                if not row.get("match_id"):
+                    continue
+                columns["match_id"].append(int(row["match_id"]))
+                for _, _, col, _ in CONTRACTS:
+                    columns[col].append(float(row.get(col) or 0.0))
+    out = {"match_id": np.array(columns["match_id"], dtype=np.int64)}
+    for _, _, col, _ in CONTRACTS:
+        out[col] = np.array(columns[col])
+    return out
+
+
+def stack_published(price_sets):
+    """Stack several load_published() results (same match_ids) into (n_sets, n_matches) arrays."""
+    first = price_sets[0]
+    for other in price_sets[1:]:
+        if not np.array_equal(other["match_id"], first["match_id"]):
+            raise ValueError("Price sets cover different matches")
+    out = {"match_id": first["match_id"]}
+    for _, _, col, _ in CONTRACTS:
+        out[col] = np.vstack([p[col] for p in price_sets])
+    return out
+
+
+# -------------------
+# JOIN & EDGE
+# -------------------
+def join_index(fair_ids, published_ids):
+    """Row in the fair table for every published match_id (sorted-index join)."""
+    order = np.argsort(fair_ids, kind="stable")
+    sorted_ids = fair_ids[order]
+    pos = np.clip(np.searchsorted(sorted_ids, published_ids), 0, len(sorted_ids) - 1)
+    idx = order[pos]
+    missing = fair_ids[idx] != published_ids
+    if missing.any():
+        raise ValueError(f"No fair value for match_id(s) {published_ids[missing].tolist()}")
+    return idx
+
+
+def mispricing(fair, published):
+    """
+    {published column: (n_sets, n_matches) published - fair}, plus the join index.
+    Published arrays may be 1-D (one price set) or 2-D (n_sets, n_matches).
+    """
+    idx = join_index(fair["match_id"], published["match_id"])
+    out = {}
+    for _, _, col, fair_col in CONTRACTS:
+        prices = np.atleast_2d(published[col])
+        out[col] = prices - fair[fair_col][idx]
+    return out, idx
+
+
+def round_summary(fair, mis, idx):
+    """
+    Aggregate edge per (price set, round, asset) with one matrix product per asset:
+    returns {asset: {"rounds", "contracts", "total_edge", "mean_abs", "max_abs"}}.
+    """
+    rounds = fair["round"][idx]
+    labels, round_pos = np.unique(rounds, return_inverse=True)
+    onehot = np.zeros((len(rounds), len(labels)))
+    onehot[np.arange(len(rounds)), round_pos] = 1.0
+    summary = {}
+    for asset in ("1", "2"):
+        cols = [col for _, a, col, _ in CONTRACTS if a == asset]
+        abs_err = np.abs(np.stack([mis[col] for col in cols]))          # (sides, sets, matches)
+        total = abs_err.sum(axis=0) @ onehot                             # (sets, rounds)
+        contracts = len(cols) * onehot.sum(axis=0)                       # (rounds,)
+        max_abs = np.full(total.shape, 0.0)
+        for r in range(len(labels)):
+            sel = round_pos == r
+            max_abs[:, r] = abs_err[:, :, sel].max(axis=(0, 2))
+        summary[asset] = {
+            "rounds": labels,
+            "contracts": contracts,
+            "total_edge": total,
+            "mean_abs": total / contracts,
+            "max_abs": max_abs,
+        }
+    return summary
+
+
+# -------------------
+# OUTPUT
+# -------------------
+def write_edge_report(fair, published, mis, idx, path=OUTPUT_REPORT, price_set=0):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["round", "match_id", "team", "asset", "published_price", "fair_price", "mispricing", "edge"])
+        for j, i in enumerate(idx):
+            for side, asset, col, fair_col in CONTRACTS:
+                price = float(np.atleast_2d(published[col])[price_set, j])
+                diff = float(mis[col][price_set, j])
+                writer.writerow([
+                    int(fair["round"][i]), int(fair["match_id"][i]),
+                    fair["team_A"][i] if side == "A" else fair["team_B"][i], asset,
+                    round(price, 2), round(float(fair[fair_col][i]), 2), round(diff, 2), round(abs(diff), 2),
+                ])
+
+
+def write_edge_summary(summary, path=OUTPUT_SUMMARY):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["price_set", "round", "asset", "contracts", "total_edge", "mean_abs_mispricing", "max_abs_mispricing"])
+        for asset, s in summary.items():
+            n_sets = s["total_edge"].shape[0]
+            for k in range(n_sets):
+                for r, label in enumerate(s["rounds"]):
+                    writer.writerow([
+                        k, int(label), asset, int(s["contracts"][r]),
+                        round(float(s["total_edge"][k, r]), 2),
+                        round(float(s["mean_abs"][k, r]), 4),
+                        round(float(s["max_abs"][k, r]), 2),
+                    ])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prices-dir", type=str, default=".", help="Directory with round_N_prices.csv")
+    parser.add_argument("--scenarios", action="store_true", help="Also include every scenario_K/ sub-directory")
+    parser.add_argument("--report", type=str, default=OUTPUT_REPORT, help="Per-contract output CSV")
+    parser.add_argument("--summary", type=str, default=OUTPUT_SUMMARY, help="Per-round summary output CSV")
+    args = parser.parse_args()
+
+    teams = load_teams(INPUT_INTERNAL)
+    matches = load_results(INPUT_RESULTS)
+    fair = fair_value_table(teams, matches)
+
+    dirs = [args.prices_dir]
+    if args.scenarios:
+        found = glob.glob(os.path.join(args.prices_dir, "scenario_*"))
+        dirs += sorted(found, key=lambda d: int(re.sub(r"\D", "", os.path.basename(d)) or 0))
+    published = stack_published([load_published(d) for d in dirs])
+
+    mis, idx = mispricing(fair, published)
+    summary = round_summary(fair, mis, idx)
+    write_edge_report(fair, published, mis, idx, args.report)
+    write_edge_summary(summary, args.summary)
+    for asset, s in summary.items():
+        per_round = ", ".join(f"R{int(r)}: {t:.1f}" for r, t in zip(s["rounds"], s["total_edge"].mean(axis=0)))
+        print(f"Asset {asset} total edge per round (mean over {len(dirs)} price sets): {per_round}")
+    print(f"Wrote {args.report} and {args.summary}")
+
+
+if __name__ == "__main__":
+    main()
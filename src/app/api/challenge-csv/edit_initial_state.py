@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+edit_initial_state.py
+
+Edit one team of an existing initial state and regenerate only what depends on it.
+
+generate_initial_state.py draws every pairwise probability from one global RNG
+stream, so changing a single team and re-running it reshuffles everything. This
+script instead keeps a pairwise win matrix next to the internal CSV
+(initial_state_internal.winmatrix.json). Every entry is estimated with its own
+seed derived from (RNG_SEED, lower team_id, higher team_id), so an entry only
+ever changes when one of its two teams does.
+
+Editing team k then:
+ - recomputes row/column k of the win matrix (n - 1 pair estimates),
+ - rescales team k's tournament price by its change in avg_p ** rounds (the
+   formula compute_tournament_prices uses), keeping its original noise factor,
+ - reprices team k's round-1 matchup the same way.
+Only team k's row and its matchup row are rewritten, in place, in both CSVs;
+every other byte of the files (other teams, other matchups, section layout)
+and every other matrix entry stays as it was. Other teams' title prices are
+deliberately left as published even though their odds against team k moved;
+regenerate with generate_initial_state.py for a fully consistent field.
+The first edit builds the matrix once (n * (n - 1) / 2 estimates).
+
+Usage:
+    python edit_initial_state.py --team-id 7 --set offense=0.81 --set dist_name=laplace
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+from bracket import bracket_rounds
+from distributions import CALIBRATE, probability_A_beats_B
+from generate_initial_state import (
+    DISTRIBUTION_POOL, OUTPUT_FILE_INTERNAL, OUTPUT_FILE_VISIBLE, RNG_SEED, attribute_weights
+)
+from simulate_tournament import load_initial_matchups, load_teams
+
+# -------------------
+# CONFIG
+# -------------------
+PAIR_TRIALS = 800       # same trial count as compute_tournament_prices
+PRICE_CAP = 0.995       # upper clamp used by compute_tournament_prices
+ATTRIBUTES = ["offense", "defense", "chemistry", "injury_risk", "variance"]
+EDITABLE = ATTRIBUTES + ["true_strength", "dist_name", "dist_params"]
+
+
+def matrix_path(internal_path):
+    stem, _ = os.path.splitext(internal_path)
+    return stem + ".winmatrix.json"
+
+
+# -------------------
+# LOADING
+# -------------------
+def load_visible_teams(path):
+    """Team overview rows of initial_state_visible.csv keyed by team_id."""
+    with open(path, newline="") as f:
+        text = f.read()
+    start = text.index("--- TEAM OVERVIEW ---")
+    end = text.find("--- ROUND 1 MATCHUPS ---")
+    section = text[start:end if end >= 0 else None].splitlines()[1:]
+    visible = {}
+    for row in csv.DictReader(io.StringIO("\n".join(section))):
+        if not (row.get("team_id") or "").strip().isdigit():
+            continue
+        visible[int(row["team_id"])] = {k: float(row[k]) for k in ATTRIBUTES + ["strength"]}
+    return visible
+
+
+def load_state(internal_path, visible_path):
+    """(teams, matchups) in the shape generate_initial_state writes them."""
+    visible = load_visible_teams(visible_path)
+    teams = []
+    for team in load_teams(internal_path):
+        teams.append({**team, **visible.get(team["team_id"], {})})
+    matchups = [{**m, "round": 1} for m in load_initial_matchups(internal_path) or []]
+    return teams, matchups
+
+
+# -------------------
+# WIN MATRIX
+# -------------------
+def pair_seed(seed, id_a, id_b):
+    lo, hi = min(id_a, id_b), max(id_a, id_b)
+    return (seed * 1_000_003 + lo) * 1_000_003 + hi
+
+
+def pair_probability(A, B, seed=RNG_SEED, trials_mc=PAIR_TRIALS):
+    """P(A beats B) from a dedicated seed: independent of every other pair."""
+    lo, hi = (A, B) if A["team_id"] < B["team_id"] else (B, A)
+    state = random.getstate()  # keep the caller's global stream untouched
+    try:
+        p = probability_A_beats_B(
+            lo["true_strength"], hi["true_strength"],
+            {'name': lo["dist_name"], 'params': lo["dist_params"]},
+            {'name': hi["dist_name"], 'params': hi["dist_params"]},
+            trials_mc=trials_mc, rng_seed=pair_seed(seed, lo["team_id"], hi["team_id"])
+        )
+    finally:
+        random.setstate(state)
+    return p if lo is A else 1.0 - p
+
+
+def build_matrix(teams, seed=RNG_SEED, trials_mc=PAIR_TRIALS):
+    n = len(teams)
+    win = [[0.5] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            win[i][j] = pair_probability(teams[i], teams[j], seed, trials_mc)
+            win[j][i] = 1.0 - win[i][j]
+    return win
+
+
+def update_matrix_row(win, teams, k, seed=RNG_SEED, trials_mc=PAIR_TRIALS):
+    """Recompute row and column k in place; every other entry is left untouched."""
+    for j in range(len(teams)):
+        if j != k:
+            win[k][j] = pair_probability(teams[k], teams[j], seed, trials_mc)
+            win[j][k] = 1.0 - win[k][j]
+    return win
+
+
+def load_matrix(path, teams, seed=RNG_SEED, trials_mc=PAIR_TRIALS):
+    """Cached matrix if it matches this field and seed, else a freshly built one."""
+    ids = [t["team_id"] for t in teams]
+    if os.path.exists(path):
+        with open(path) as f:
+            cached = json.load(f)
+        if cached.get("team_ids") == ids and cached.get("seed") == seed and cached.get("trials_mc") == trials_mc \
+                and cached.get("calibrated", False) == CALIBRATE:
+            return cached["win"]
+    return build_matrix(teams, seed, trials_mc)
+
+
+def save_matrix(path, teams, win, seed=RNG_SEED, trials_mc=PAIR_TRIALS):
+    with open(path, "w") as f:
+        json.dump({"seed": seed, "trials_mc": trials_mc, "calibrated": CALIBRATE,
+                   "team_ids": [t["team_id"] for t in teams], "win": win}, f)
+
+
+# -------------------
+# PRICES
+# -------------------
+def average_win_probs(win):
+    """Each team's mean probability of beating the rest of the field."""
+    n = len(win)
+    return [(sum(row) - row[i]) / (n - 1) for i, row in enumerate(win)]
+
+
+def reprice_tournament(teams, k, old_win, new_win):
+    """Scale team k's published price by its model change, keeping the original noise factor."""
+    rounds = bracket_rounds(len(teams))  # price ~ avg_p ** rounds_to_win
+    before = average_win_probs(old_win)[k]
+    after = average_win_probs(new_win)[k]
+    team = teams[k]
+    if after != before:
+        ratio = (after / before) ** rounds if before > 0 else 1.0
+        team["tournament_price"] = round(min(PRICE_CAP * 100, team["tournament_price"] * ratio), 2)
+    return team
+
+
+def reprice_matchup(m, index, old_win, new_win):
+    a, b = index[m["team_A_id"]], index[m["team_B_id"]]
+    before, after = old_win[a][b], new_win[a][b]
+    if before == after:
+        return m
+    noisy = m["team_A_price"] / 100.0 * (after / before if before > 0 else 1.0)
+    pA = max(0.005, min(0.995, noisy))
+    m["team_A_price"] = round(pA * 100, 2)
+    m["team_B_price"] = round((1.0 - pA) * 100, 2)
+    return m
+
+
+# -------------------
+# WRITING
+# -------------------
+def rewrite_rows(path, rows):
+    """
+    Rewrite only the lines of path whose key is in rows, in place.
+    rows maps ("team_id" | "match_id", id) -> {column: value}; a line's key
+    column is the first column of the nearest header above it. A rewritten
+    line keeps that header's column order and its own line ending; every
+    other line is written back byte for byte.
+    """
+    with open(path, newline="") as f:
+        lines = f.read().splitlines(keepends=True)
+    header = None
+    for n, line in enumerate(lines):
+        body = line.rstrip("\r\n")
+        fields = next(csv.reader([body]), [])
+        if fields and fields[0] in ("team_id", "match_id"):
+            header = fields
+            continue
+        if header is None or not fields or not fields[0].strip().isdigit():
+            continue
+        changes = rows.get((header[0], int(fields[0])))
+        if changes:
+            row = dict(zip(header, fields))
+            row.update((c, v) for c, v in changes.items() if c in row)
+            out = io.StringIO()
+            csv.writer(out, lineterminator="").writerow([row[c] for c in header])
+            lines[n] = out.getvalue() + line[len(body):]
+    with open(path, "w", newline="") as f:
+        f.write("".join(lines))
+
+
+def changed_rows(team, matchups):
+    """rewrite_rows entries for one team and the matchups it plays in."""
+    fields = ATTRIBUTES + ["strength", "true_strength", "dist_name", "tournament_price"]
+    rows = {("team_id", team["team_id"]): {**{c: team[c] for c in fields if c in team},
+                                           "dist_params": json.dumps(team["dist_params"])}}
+    for m in matchups:
+        if team["team_id"] in (m["team_A_id"], m["team_B_id"]):
+            rows[("match_id", m["match_id"])] = {"team_A_price": m["team_A_price"], "team_B_price": m["team_B_price"]}
+    return rows
+
+
+# -------------------
+# EDIT
+# -------------------
+def parse_changes(pairs):
+    changes = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        key = key.strip()
+        if not sep or key not in EDITABLE:
+            raise ValueError(f"Bad --set '{pair}' (editable: {', '.join(EDITABLE)})")
+        if key == "dist_name":
+            changes[key] = value.strip()
+        elif key == "dist_params":
+            changes[key] = json.loads(value)
+        else:
+            changes[key] = float(value)
+    return changes
+
+
+def apply_changes(team, changes):
+    """Update one team dict; strength and true_strength follow attribute edits as in generate_teams."""
+    team.update(changes)
+    if "dist_name" in changes and "dist_params" not in changes:
+        pool = {spec["name"]: spec["params"] for spec in DISTRIBUTION_POOL}
+        team["dist_params"] = pool.get(changes["dist_name"], {})
+    if any(k in changes for k in ATTRIBUTES):
+        weights = attribute_weights()   # same lookup as generate_initial_state.main
+        strength = (
+            weights["offense"] * team["offense"]
+            + weights["defense"] * team["defense"]
+            + weights["chemistry"] * team["chemistry"]
+            + weights["injury_risk"] * (1 - team["injury_risk"])
+        )
+        team["strength"] = round(strength, 3)
+        if "true_strength" not in changes:
+            team["true_strength"] = round(team["strength"] * (1 - team["variance"]), 3)
+    return team
+
+
+def edit_team(teams, matchups, win, team_id, changes, seed=RNG_SEED, trials_mc=PAIR_TRIALS):
+    """Apply changes to one team and regenerate only its dependents. Returns the new matrix."""
+    index = {t["team_id"]: i for i, t in enumerate(teams)}
+    if team_id not in index:
+        raise KeyError(f"Unknown team_id {team_id}")
+    k = index[team_id]
+    apply_changes(teams[k], changes)
+
+    new_win = update_matrix_row([row[:] for row in win], teams, k, seed, trials_mc)
+    reprice_tournament(teams, k, win, new_win)
+    for m in matchups:
+        if team_id in (m["team_A_id"], m["team_B_id"]):
+            reprice_matchup(m, index, win, new_win)
+    return new_win
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--team-id", type=int, required=True, help="Team to edit")
+    parser.add_argument("--set", dest="changes", action="append", default=[], metavar="FIELD=VALUE",
+                        help="Field to change (repeatable), e.g. offense=0.8 or dist_params='{\"sd\": 0.05}'")
+    parser.add_argument("--internal", type=str, default=OUTPUT_FILE_INTERNAL, help="Internal CSV to edit")
+    parser.add_argument("--visible", type=str, default=OUTPUT_FILE_VISIBLE, help="Visible CSV to edit")
+    parser.add_argument("--seed", type=int, default=RNG_SEED, help="Base seed for per-pair estimates")
+    args = parser.parse_args()
+
+    teams, matchups = load_state(args.internal, args.visible)
+    path = matrix_path(args.internal)
+    win = load_matrix(path, teams, args.seed)
+    win = edit_team(teams, matchups, win, args.team_id, parse_changes(args.changes), args.seed)
+
+    team = next(t for t in teams if t["team_id"] == args.team_id)
+    rows = changed_rows(team, matchups)
+    rewrite_rows(args.visible, rows)
+    rewrite_rows(args.internal, rows)
+    save_matrix(path, teams, win, args.seed)
+    print(f"Updated team {args.team_id}; wrote {args.visible}, {args.internal} and {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+event_registry.py
+
+Host several tournaments (practice and live events) from one process.
+
+Every other script assumes one tournament per working directory with fixed file
+names. Here each event is a directory under an events root holding those same
+files:
+
+    events/<event_id>/initial_prices.csv
+                      initial_state_internal.csv
+                      tournament_outcomes.csv
+                      round_N_prices.csv
+                      portfolio_state.json
+                      portfolio_state.leaderboard.csv
+                      leaderboard_roundN.csv
+
+An Event loads each table on first use only (teams, per-round outcomes and
+prices, the pairwise win matrix, the portfolio) and keeps it in memory.
+EventRegistry keeps the hot events in an LRU cache bounded by an estimate of
+their in-memory size: after every access the least recently used events are
+dropped until the total fits under max_bytes (the event just used always stays).
+Events are pinned while a call is running on them (use(), settle_file()) and
+pinned events are never evicted, so two threads working on the same event id
+always share one Event, with one lock and one in-memory portfolio. Portfolio
+changes are written through to portfolio_state.json, together with the
+persisted leaderboard and the round's leaderboard CSV, as each upload settles,
+so evicting an idle event never loses state; it simply reloads on its next
+request.
+
+Usage:
+    python event_registry.py --events-root events --list
+    python event_registry.py --events-root events --event practice-1 \
+        --round 1 --trades mock_trades_round1.csv
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from calculate_payout_price import (
+    load_teams, load_outcomes, load_round_prices, load_trades, load_portfolio_state, save_portfolio_state
+)
+from edit_initial_state import load_matrix, matrix_path, save_matrix
+from leaderboard import Leaderboard, state_path
+from settlement_queue import round_output_paths, settle_one
+from simulate_tournament import INPUT_INTERNAL, load_teams as load_internal_teams
+
+# -------------------
+# CONFIG
+# -------------------
+EVENTS_ROOT = "events"
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+PRICES_FILE = "initial_prices.csv"
+OUTCOMES_FILE = "tournament_outcomes.csv"
+PORTFOLIO_FILE = "portfolio_state.json"
+ROUND_PRICES_FILE = "round_{}_prices.csv"
+EVENT_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+def deep_size(obj, seen=None):
+    """Approximate in-memory size of nested dicts/lists/arrays, counting shared objects once."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    return size
+
+
+# -------------------
+# EVENT
+# -------------------
+class Event:
+    """One tournament's files, each loaded on first use and sized for the cache."""
+
+    def __init__(self, event_id, directory):
+        self.event_id = event_id
+        self.directory = directory
+        self.lock = threading.RLock()
+        self._tables = {}                 # cache key -> loaded table
+        self._sizes = {}                  # cache key -> deep_size of the table
+        self.pins = 0                     # calls running on this event (guarded by the registry lock)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _get(self, key, loader):
+        with self.lock:
+            if key not in self._tables:
+                table = loader()
+                self._tables[key] = table
+                self._sizes[key] = deep_size(table)
+            return self._tables[key]
+
+    @property
+    def nbytes(self):
+        return sum(self._sizes.values())
+
+    def loaded(self):
+        return sorted(str(k) for k in self._tables)
+
+    # reference tables
+    def teams(self):
+        """{team_id: {team_name, tournament_price}} from initial_prices.csv."""
+        return self._get("teams", lambda: load_teams(self.path(PRICES_FILE)))
+
+    def outcomes(self, round_num):
+        return self._get(("outcomes", round_num), lambda: load_outcomes(self.path(OUTCOMES_FILE), round_num))
+
+    def round_prices(self, round_num):
+        return self._get(("round_prices", round_num),
+                         lambda: load_round_prices(self.path(ROUND_PRICES_FILE.format(round_num)), round_num))
+
+    def internal_teams(self):
+        return self._get("internal_teams", lambda: load_internal_teams(self.path(INPUT_INTERNAL)))
+
+    def win_matrix(self):
+        """(team_ids, float64 win matrix) from the cached .winmatrix.json, built once if missing."""
+        def load():
+            teams = self.internal_teams()
+            path = matrix_path(self.path(INPUT_INTERNAL))
+            win = load_matrix(path, teams)
+            if not os.path.exists(path):
+                save_matrix(path, teams, win)     # so a reload after eviction is cheap
+            return [t["team_id"] for t in teams], np.asarray(win, dtype=np.float64)
+        return self._get("win_matrix", load)
+
+    # portfolio
+    def portfolio(self):
+        return self._get("portfolio", lambda: load_portfolio_state(self.path(PORTFOLIO_FILE)))
+
+    def leaderboard(self):
+        """The persisted Leaderboard for the portfolio (rebuilt if missing)."""
+        return self._get("leaderboard", lambda: Leaderboard.for_portfolio(
+            state_path(self.path(PORTFOLIO_FILE)), self.portfolio()))
+
+    def save_portfolio(self, round_num=None):
+        """Write the portfolio and its leaderboard through; given a round, also leaderboard_roundN.csv."""
+        with self.lock:
+            portfolio = self.portfolio()
+            leaderboard = self.leaderboard()
+            save_portfolio_state(portfolio, self.path(PORTFOLIO_FILE))
+            leaderboard.save(state_path(self.path(PORTFOLIO_FILE)), precision=None)
+            if round_num is not None:
+                leaderboard.save(round_output_paths(self.path(PORTFOLIO_FILE), round_num)[1])
+            self._sizes["portfolio"] = deep_size(portfolio)
+
+    def settle(self, round_num, trades):
+        """Settle one upload (all-or-nothing) and write the portfolio through. Returns the settle_one result."""
+        with self.lock:
+            result = settle_one(self.portfolio(), trades, self.outcomes(round_num), self.round_prices(round_num),
+                                self.leaderboard())
+            if result["status"] == "OK":
+                self.save_portfolio(round_num)
+            return result
+
+    def settle_file(self, round_num, trades_file):
+        return self.settle(round_num, load_trades(trades_file, self.round_prices(round_num)))
+
+
+# -------------------
+# REGISTRY
+# -------------------
+class EventRegistry:
+    """LRU cache of Events under one root directory, bounded by estimated memory."""
+
+    def __init__(self, root=EVENTS_ROOT, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._events = OrderedDict()      # event_id -> Event, least recently used first
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def event_ids(self):
+        """Every event directory under the root, loaded or not."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if EVENT_ID.match(name) and os.path.isdir(os.path.join(self.root, name)))
+
+    def get(self, event_id):
+        """
+        The cached Event, loading it if needed. Not pinned: use use() for work
+        that must not race with eviction.
+        """
+        if not EVENT_ID.match(event_id or ""):
+            raise ValueError(f"Invalid event id {event_id!r}")
+        with self._lock:
+            return self._get(event_id)
+
+    def _get(self, event_id):
+        event = self._events.get(event_id)
+        if event is not None:
+            self._events.move_to_end(event_id)
+            return event
+        directory = os.path.join(self.root, event_id)
+        if not os.path.isdir(directory):
+            raise KeyError(f"Unknown event {event_id}")
+        event = self._events[event_id] = Event(event_id, directory)
+        self.loads += 1
+        return event
+
+    def nbytes(self):
+        return sum(event.nbytes for event in self._events.values())
+
+    def evict(self, keep=None):
+        """Drop least recently used, unpinned events until the cache fits in max_bytes."""
+        with self._lock:
+            total = self.nbytes()
+            for event_id, event in list(self._events.items()):
+                if total <= self.max_bytes:
+                    break
+                if event_id == keep or event.pins:
+                    continue
+                total -= self._events.pop(event_id).nbytes
+                self.evictions += 1
+
+    def use(self, event_id, func, *args):
+        """Run func(event, *args) on a cached event pinned for the call, then enforce the memory bound."""
+        if not EVENT_ID.match(event_id or ""):
+            raise ValueError(f"Invalid event id {event_id!r}")
+        with self._lock:
+            event = self._get(event_id)
+            event.pins += 1
+        try:
+            return func(event, *args)
+        finally:
+            with self._lock:
+                event.pins -= 1
+            self.evict(keep=event_id)
+
+    def settle_file(self, event_id, round_num, trades_file):
+        return self.use(event_id, Event.settle_file, round_num, trades_file)
+
+    def stats(self):
+        return {
+            "events": list(self._events), "bytes": self.nbytes(), "max_bytes": self.max_bytes,
+            "loads": self.loads, "evictions": self.evictions,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events-root", type=str, default=EVENTS_ROOT, help="Directory of event directories")
+    parser.add_argument("--max-mb", type=float, default=MAX_CACHE_BYTES / 2**20, help="Cache memory bound in MB")
+    parser.add_argument("--list", action="store_true", help="List events under the root")
+    parser.add_argument("--event", type=str, help="Event id to settle against")
+    parser.add_argument("--round", type=int, help="Round number")
+    parser.add_argument("--trades", type=str, nargs="+", help="Trade CSVs to settle in order")
+    args = parser.parse_args()
+
+    registry = EventRegistry(args.events_root, int(args.max_mb * 2**20))
+    if args.list:
+        for event_id in registry.event_ids():
+            print(event_id)
+        return
+    if not (args.event and args.round and args.trades):
+        parser.error("--event, --round and --trades are required unless --list is given")
+
+    for trades_file in args.trades:
+        result = registry.settle_file(args.event, args.round, trades_file)
+        print(f"{trades_file}: {result['status']}" + "".join(f" ({e})" for e in result["errors"]))
+    portfolio = registry.get(args.event).portfolio()
+    print(f"PORTFOLIO_JSON:{json.dumps(portfolio, indent=2)}")
+    print(json.dumps(registry.stats()))
+
+
+if __name__ == "__main__":
+    main()
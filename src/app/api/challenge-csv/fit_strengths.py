@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+fit_strengths.py
+
+Estimate team strengths and attribute weights from observed results by maximum
+likelihood under a Bradley-Terry model:
+
+    P(i beats j) = sigmoid(theta_i - theta_j)
+
+Two fits share the same vectorized likelihood:
+ - strengths: one theta per team_id, pooled over every results file (e.g. many
+   simulated tournaments from the same initial state), with a small ridge
+   penalty to pin the scale;
+ - weights:   theta_i = x_i . w, where x_i are the attributes from the visible
+   CSV (offense, defense, chemistry, 1 - injury_risk, as in generate_teams).
+
+Both use Newton's method: the gradient is a pair of np.bincount calls over the
+game arrays and the Hessian a weighted graph Laplacian, so tens of thousands of
+games converge in a handful of iterations. A previous fit can be passed as a
+warm start.
+
+The output JSON can reparameterize future initial states: "attribute_weights"
+is normalized to the ATTRIBUTE_WEIGHTS layout (set
+generate_initial_state.ATTRIBUTE_WEIGHTS_FILE; edit_initial_state.py uses the
+same weights) and "true_strength" maps each fitted theta onto the current
+true_strength scale by team_id (set generate_initial_state.TRUE_STRENGTH_FILE).
+
+Usage:
+    python fit_strengths.py --results runs/*/tournament_results.csv --output fitted_strengths.json
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+from edit_initial_state import load_visible_teams
+from generate_initial_state import ATTRIBUTE_WEIGHTS, OUTPUT_FILE_VISIBLE
+from live_repricer import load_results
+from simulate_tournament import INPUT_INTERNAL, load_teams
+
+# -------------------
+# CONFIG
+# -------------------
+OUTPUT_FIT = "fitted_strengths.json"
+RIDGE = 1e-3
+MAX_ITER = 50
+TOL = 1e-9
+FEATURES = list(ATTRIBUTE_WEIGHTS)  # injury_risk enters as (1 - injury_risk)
+
+
+# -------------------
+# DATA
+# -------------------
+def load_games(results_paths):
+    """Winner and loser team_id arrays over every match in every results file."""
+    winners, losers = [], []
+    for path in results_paths:
+        for m in load_results(path):
+            loser = m["teamB_id"] if m["winner_id"] == m["teamA_id"] else m["teamA_id"]
+            winners.append(m["winner_id"])
+            losers.append(loser)
+    return np.array(winners, dtype=np.int64), np.array(losers, dtype=np.int64)
+
+
+def attribute_matrix(visible, team_ids):
+    """(n_teams, n_features) design matrix in FEATURES order."""
+    X = np.empty((len(team_ids), len(FEATURES)))
+    for i, tid in enumerate(team_ids):
+        row = visible[tid]
+        X[i] = [1.0 - row[f] if f == "injury_risk" else row[f] for f in FEATURES]
+    return X
+
+
+# -------------------
+# LIKELIHOOD
+# -------------------
+def _sigmoid(x):
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def log_likelihood(theta, w_idx, l_idx):
+    d = theta[w_idx] - theta[l_idx]
+    return float(-np.logaddexp(0.0, -d).sum())
+
+
+def theta_derivatives(theta, w_idx, l_idx):
+    """Gradient and Hessian of the log-likelihood with respect to theta."""
+    n = len(theta)
+    p = _sigmoid(theta[w_idx] - theta[l_idx])
+    r = 1.0 - p
+    grad = np.bincount(w_idx, r, minlength=n) - np.bincount(l_idx, r, minlength=n)
+    c = p * r
+    # weighted Laplacian: H = -(D - A)
+    flat = np.bincount(w_idx * n + l_idx, c, minlength=n * n).reshape(n, n)
+    A = flat + flat.T
+    H = A - np.diag(A.sum(axis=1))
+    return grad, H
+
+
+def _newton(params, to_theta, jac, w_idx, l_idx, ridge, max_iter, tol):
+    """Maximize loglik(to_theta(params)) - ridge/2 |params|^2; jac = d theta / d params."""
+    history = []
+    for _ in range(max_iter):
+        g_theta, H_theta = theta_derivatives(to_theta(params), w_idx, l_idx)
+        grad = jac.T @ g_theta - ridge * params
+        H = jac.T @ H_theta @ jac - ridge * np.eye(len(params))
+        step = np.linalg.solve(H, -grad)
+        params = params + step
+        history.append(float(np.abs(step).max()))
+        if history[-1] < tol:
+            break
+    return params, history
+
+
+def fit_strengths(w_idx, l_idx, n_teams, theta0=None, ridge=RIDGE, max_iter=MAX_ITER, tol=TOL):
+    """Per-team Bradley-Terry strengths (mean-zero). Returns (theta, step history)."""
+    theta = np.zeros(n_teams) if theta0 is None else np.asarray(theta0, dtype=float)
+    theta, history = _newton(theta, lambda t: t, np.eye(n_teams), w_idx, l_idx, ridge, max_iter, tol)
+    return theta - theta.mean(), history
+
+
+def fit_weights(w_idx, l_idx, X, w0=None, ridge=RIDGE, max_iter=MAX_ITER, tol=TOL):
+    """Attribute weights with theta = X @ w. Returns (w, step history)."""
+    w = np.zeros(X.shape[1]) if w0 is None else np.asarray(w0, dtype=float)
+    return _newton(w, lambda v: X @ v, X, w_idx, l_idx, ridge, max_iter, tol)
+
+
+# -------------------
+# REPARAMETERIZATION
+# -------------------
+def normalized_weights(w):
+    """Fitted weights in the ATTRIBUTE_WEIGHTS layout (non-negative, summing to 1)."""
+    w = np.clip(w, 0.0, None)
+    total = w.sum()
+    if total <= 0:
+        return dict(ATTRIBUTE_WEIGHTS)
+    return {f: round(float(v / total), 4) for f, v in zip(FEATURES, w)}
+
+
+def strength_scale(theta, current):
+    """Map theta onto the scale of the current true_strength values (same mean and spread)."""
+    theta = np.asarray(theta)
+    current = np.asarray(current, dtype=float)
+    spread = theta.std()
+    z = (theta - theta.mean()) / spread if spread > 0 else np.zeros_like(theta)
+    return np.round(current.mean() + current.std() * z, 3)
+
+
+def fit(results_paths, internal=INPUT_INTERNAL, visible=OUTPUT_FILE_VISIBLE, warm_start=None):
+    """Run both fits and return the JSON-ready result dict."""
+    teams = load_teams(internal)
+    team_ids = [t["team_id"] for t in teams]
+    index = {tid: i for i, tid in enumerate(team_ids)}
+    winners, losers = load_games(results_paths)
+    w_idx = np.array([index[t] for t in winners], dtype=np.int64)
+    l_idx = np.array([index[t] for t in losers], dtype=np.int64)
+
+    theta0 = w0 = None
+    if warm_start:
+        with open(warm_start) as f:
+            prev = json.load(f)
+        theta0 = [prev["theta"].get(str(tid), 0.0) for tid in team_ids]
+        w0 = [prev["raw_weights"].get(f, 0.0) for f in FEATURES]
+
+    theta, theta_steps = fit_strengths(w_idx, l_idx, len(team_ids), theta0)
+    X = attribute_matrix(load_visible_teams(visible), team_ids)
+    w, w_steps = fit_weights(w_idx, l_idx, X, w0)
+
+    true_strength = strength_scale(theta, [t["true_strength"] for t in teams])
+    return {
+        "files": len(results_paths),
+        "games": int(len(w_idx)),
+        "theta": {str(tid): round(float(v), 6) for tid, v in zip(team_ids, theta)},
+        "true_strength": {str(tid): float(v) for tid, v in zip(team_ids, true_strength)},
+        "raw_weights": {f: round(float(v), 6) for f, v in zip(FEATURES, w)},
+        "attribute_weights": normalized_weights(w),
+        "log_likelihood": {
+            "strengths": round(log_likelihood(theta, w_idx, l_idx), 4),
+            "weights": round(log_likelihood(X @ w, w_idx, l_idx), 4),
+        },
+        "iterations": {"strengths": len(theta_steps), "weights": len(w_steps)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=str, nargs="+", required=True, help="tournament_results.csv files")
+    parser.add_argument("--internal", type=str, default=INPUT_INTERNAL, help="Internal CSV (team ids, true_strength)")
+    parser.add_argument("--visible", type=str, default=OUTPUT_FILE_VISIBLE, help="Visible CSV (attributes)")
+    parser.add_argument("--warm-start", type=str, help="Previous fit JSON to start from")
+    parser.add_argument("--output", type=str, default=OUTPUT_FIT, help="Output JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = fit(args.results, args.internal, args.visible, args.warm_start)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Fitted {len(result['theta'])} strengths and {len(FEATURES)} weights from "
+          f"{result['games']} games in {time.perf_counter() - start:.2f}s "
+          f"(iterations {result['iterations']})")
+    print(f"Attribute weights: {result['attribute_weights']}")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
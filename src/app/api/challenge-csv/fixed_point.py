@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+fixed_point.py
+
+Round settlement in integer cents, from trade parsing to the stored portfolio.
+
+calculate_payout_price.py used to do its money math in floats and round only
+when writing CSVs, so balances drifted after many liquid_balance updates. It
+now settles every round through this module:
+ - prices are parsed to integer cents (2 decimals on the 0-100 scale) and
+   quantities to whole contracts,
+ - a round is settled with int64 numpy arrays (one pass for the overselling
+   check, one for P&L), using the same rules as calculate_round,
+ - the portfolio is a CentsLedger of integer cents. <portfolio>.cents.json is
+   the stored state; the float portfolio JSON the API reads is derived from it
+   on every save (exact to the cent). A portfolio with no .cents.json yet (a
+   legacy JSON/CSV) is converted once, on first load.
+
+Every writer goes through calculate_payout_price.save_portfolio_state, which
+stores the ledger, so scripts that still settle in floats (settlement_queue,
+event_registry, settlement) round to the cent at each save instead of
+carrying drift from round to round.
+
+The ledger keeps running book-wide totals. After each round they are audited
+incrementally, in O(players in the round) rather than by re-settling: the
+totals must have moved by exactly the round's deltas summed from the
+settlement arrays, and each player in the round must still hold the same
+balance + invested - pnl (trading and settlement only move cash between those
+fields). A mismatch is reported as LEDGER_ERROR and nothing is saved.
+
+Quantities must be whole contracts; a fractional one is rejected with
+QUANTITY_ERROR before anything is settled.
+"""
+
+import csv
+import json
+import os
+import numpy as np
+from calculate_payout_price import load_portfolio_json
+
+# -------------------
+# CONFIG
+# -------------------
+CENTS = 100
+STARTING_BALANCE = 500 * CENTS
+ASSET1_PAYOUT = 100 * CENTS
+FIELDS = ("cumulative_pnl", "liquid_balance", "total_invested")
+
+
+def to_cents(value):
+    """Price or money on the 0-100 scale (float or string) to integer cents."""
+    return int(round(float(value) * CENTS))
+
+
+def from_cents(cents):
+    return int(cents) / CENTS
+
+
+class PositionError(ValueError):
+    pass
+
+
+class QuantityError(ValueError):
+    pass
+
+
+# -------------------
+# LOADING
+# -------------------
+def load_round_prices_cents(prices_file):
+    """{team: (asset1_cents, asset2_cents)} from round_N_prices.csv."""
+    prices = {}
+    try:
+        with open(prices_file, newline="") as f:
+            for row in csv.DictReader(f):
+                for side in ("A", "B"):
+                    team = (row.get(f"team_{side}") or "").strip()
+                    if team:
+                        prices[team] = (to_cents(row.get(f"team_{side}_price") or 0),
+                                        to_cents(row.get(f"team_{side}_tournament_price") or 0))
+    except FileNotFoundError:
+        pass
+    return prices
+
+
+class CentsTrades:
+    """Trade columns as int64 arrays; ids interned to codes (row order = upload order)."""
+
+    def __init__(self, players, teams, player, team, side, asset, quantity, price):
+        self.players = players      # code -> player_id
+        self.teams = teams          # code -> team name
+        self.player = player
+        self.team = team
+        self.side = side            # +1 buy / -1 sell
+        self.asset = asset          # 1 or 2
+        self.quantity = quantity    # whole contracts
+        self.price = price          # cents
+
+    def __len__(self):
+        return len(self.player)
+
+
+def _cents_trades(rows):
+    """CentsTrades from (player_id, team_id, is_buy, asset, quantity, price_cents) rows."""
+    player_codes, team_codes = {}, {}
+    cols = ([], [], [], [], [], [])
+    for player_id, team_id, is_buy, asset, qty, price in rows:
+        if not float(qty).is_integer():
+            raise QuantityError(f"QUANTITY_ERROR:Player {player_id} trade of {qty} {team_id} asset {asset} "
+                                f"is not a whole number of contracts")
+        values = (player_codes.setdefault(player_id, len(player_codes)),
+                  team_codes.setdefault(team_id, len(team_codes)),
+                  1 if is_buy else -1, 1 if asset == "1" else 2, int(qty), price)
+        for col, value in zip(cols, values):
+            col.append(value)
+    arrays = [np.array(c, dtype=np.int64) for c in cols]
+    return CentsTrades(list(player_codes), list(team_codes), *arrays)
+
+
+def load_trades_cents(trades_file, prices):
+    """Parse a trades CSV like load_trades, into CentsTrades (prices from prices in cents)."""
+    def rows():
+        with open(trades_file, newline="") as f:
+            for row in csv.DictReader(f):
+                team_id = (row.get("team_id") or row.get("team") or "").strip()
+                action = (row.get("action") or "").strip().upper()
+                player_id = (row.get("player_id") or "").strip()
+                asset = (row.get("asset") or "1").strip()
+                if not team_id or not player_id or action not in ("BUY", "SELL"):
+                    continue
+                try:
+                    qty = float(row.get("quantity"))
+                except (TypeError, ValueError):
+                    qty = 0.0
+                a1, a2 = prices.get(team_id, (0, 0))
+                yield player_id, team_id, action == "BUY", asset, qty, a1 if asset == "1" else a2
+    return _cents_trades(rows())
+
+
+def cents_trades(trades):
+    """CentsTrades from Trade records (or TradeColumns) whose prices are already looked up."""
+    return _cents_trades((t.player_id, t.team_id, t.action == "buy", t.asset, t.quantity, to_cents(t.price))
+                         for t in trades)
+
+
+# -------------------
+# SETTLEMENT
+# -------------------
+def check_positions(trades):
+    """Raise PositionError at the first sell that exceeds the running holding (as calculate_round)."""
+    if not len(trades):
+        return
+    key = (trades.player * len(trades.teams) + trades.team) * 2 + (trades.asset - 1)
+    order = np.argsort(key, kind="stable")
+    signed = (trades.side * trades.quantity)[order]
+    running = np.cumsum(signed)
+    k = key[order]
+    starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+    offset = np.repeat(running[starts] - signed[starts], np.diff(np.r_[starts, len(k)]))
+    holding = running - offset
+    bad = order[holding < 0]
+    if bad.size:
+        # quantities print as floats, the way calculate_round reports them
+        i = int(bad.min())
+        before = float(holding[np.flatnonzero(order == i)[0]] + trades.quantity[i])
+        raise PositionError(
+            f"POSITION_ERROR:Player {trades.players[trades.player[i]]} trying to sell {float(trades.quantity[i])} "
+            f"of {trades.teams[trades.team[i]]} asset {int(trades.asset[i])}, but only owns {before}")
+
+
+def settle_round_cents(trades, outcomes, prices):
+    """
+    Integer version of calculate_round. Returns (player_ids, realized, asset2_pnl)
+    as int64 cents per player in first-trade order; raises PositionError.
+    """
+    check_positions(trades)
+    won = np.array([bool(outcomes.get(t, False)) for t in trades.teams], dtype=bool)
+    asset2_price = np.array([prices.get(t, (0, 0))[1] for t in trades.teams], dtype=np.int64)
+    team_won = won[trades.team]
+    is_asset1 = trades.asset == 1
+    settle = np.where(is_asset1, ASSET1_PAYOUT, asset2_price[trades.team]) * team_won
+    pnl = trades.side * trades.quantity * (settle - trades.price)
+
+    n = len(trades.players)
+    realized = np.zeros(n, dtype=np.int64)
+    asset2 = np.zeros(n, dtype=np.int64)
+    # asset 1 and asset 2 positions in eliminated teams are realized this round
+    realized_mask = is_asset1 | ~team_won
+    np.add.at(realized, trades.player[realized_mask], pnl[realized_mask])
+    np.add.at(asset2, trades.player[~realized_mask], pnl[~realized_mask])
+    return trades.players, realized, asset2
+
+
+def payouts_from_cents(player_ids, realized, asset2):
+    """The float payout dict save_player_payouts expects (exact to the cent)."""
+    return {
+        pid: {"asset1_realized": from_cents(r), "asset2_pnl": from_cents(a), "total": from_cents(r + a)}
+        for pid, r, a in zip(player_ids, realized, asset2)
+    }
+
+
+# -------------------
+# LEDGER
+# -------------------
+class CentsLedger:
+    """Portfolio state in integer cents, with running book-wide totals."""
+
+    def __init__(self):
+        self.accounts = {}                      # player_id -> [cumulative_pnl, liquid_balance, total_invested]
+        self.totals = [0, 0, 0]
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def _add(self, player_id, d_pnl, d_balance, d_invested):
+        acct = self.accounts[player_id]
+        for k, d in enumerate((d_pnl, d_balance, d_invested)):
+            acct[k] += d
+            self.totals[k] += d
+
+    def open(self, player_id, values=(0, STARTING_BALANCE, 0)):
+        if player_id not in self.accounts:
+            self.accounts[player_id] = [0, 0, 0]
+            self._add(player_id, *values)
+
+    def check_spending(self, trades):
+        """True if every player's total buy cost fits in their liquid balance."""
+        cost = np.zeros(len(trades.players), dtype=np.int64)
+        buys = trades.side > 0
+        np.add.at(cost, trades.player[buys], (trades.quantity * trades.price)[buys])
+        for code, player_id in enumerate(trades.players):
+            acct = self.accounts.get(player_id)
+            balance = acct[1] if acct else STARTING_BALANCE
+            if cost[code] > balance:
+                return False
+        return True
+
+    def held(self, player_id):
+        """balance + invested - pnl: the cash a player brought in, which no round changes."""
+        pnl, balance, invested = self.accounts.get(player_id, (0, STARTING_BALANCE, 0))
+        return balance + invested - pnl
+
+    def apply_round(self, trades, realized, asset2, leaderboard=None):
+        """
+        Integer version of apply_round_to_portfolio. Returns the round's
+        book-wide (pnl, balance, invested) deltas, summed straight from the
+        settlement arrays rather than from the accounts.
+        """
+        flow = np.zeros(len(trades.players), dtype=np.int64)   # net cash paid for contracts
+        np.add.at(flow, trades.player, trades.side * trades.quantity * trades.price)
+        opened = sum(player_id not in self.accounts for player_id in trades.players)
+        for code, player_id in enumerate(trades.players):
+            self.open(player_id)
+            total = int(realized[code] + asset2[code])
+            paid = int(flow[code])
+            self._add(player_id, total, total - paid, paid)
+            if leaderboard is not None:
+                leaderboard.update(player_id, from_cents(self.accounts[player_id][0]))
+        pnl = int(realized.sum() + asset2.sum())
+        paid = int(flow.sum())
+        return pnl, pnl - paid + opened * STARTING_BALANCE, paid
+
+    def audit(self, opening, deltas, held):
+        """
+        Check one round against the running totals: they must equal the
+        opening totals plus the round's deltas, and every player in held
+        (player_id -> held() before the round) must hold the same cash after
+        it. Returns LEDGER_ERROR messages (empty if clean).
+        """
+        problems = []
+        expected = [o + d for o, d in zip(opening, deltas)]
+        if expected != self.totals:
+            problems.append(f"LEDGER_ERROR:totals {self.totals} != opening {opening} + round {list(deltas)} (cents)")
+        for player_id, before in held.items():
+            after = self.held(player_id)
+            if after != before:
+                problems.append(f"LEDGER_ERROR:Player {player_id} cash moved from {before} to {after} (cents)")
+        return problems
+
+    # -------------------
+    # STORAGE
+    # -------------------
+    def to_portfolio(self):
+        return {pid: {f: from_cents(v) for f, v in zip(FIELDS, acct)} for pid, acct in self.accounts.items()}
+
+    @classmethod
+    def from_portfolio(cls, portfolio):
+        ledger = cls()
+        for pid, state in portfolio.items():
+            ledger.open(pid, tuple(to_cents(state.get(f, 500 if f == "liquid_balance" else 0)) for f in FIELDS))
+        return ledger
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"unit": "cents", "accounts": {pid: dict(zip(FIELDS, acct)) for pid, acct in self.accounts.items()}},
+                      f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        ledger = cls()
+        for pid, acct in data["accounts"].items():
+            ledger.open(pid, tuple(int(acct[f]) for f in FIELDS))
+        return ledger
+
+
+def ledger_path(portfolio_file):
+    stem, _ = os.path.splitext(portfolio_file)
+    return stem + ".cents.json"
+
+
+def load_ledger(portfolio_file):
+    """The stored cents ledger; a portfolio without one yet (legacy float JSON/CSV) is converted."""
+    path = ledger_path(portfolio_file)
+    if os.path.exists(path):
+        return CentsLedger.load(path)
+    return CentsLedger.from_portfolio(load_portfolio_json(portfolio_file))
+
+
+def save_ledger(ledger, portfolio_file):
+    """Store the ledger as <portfolio>.cents.json, then the float portfolio JSON derived from it."""
+    os.makedirs(os.path.dirname(os.path.abspath(portfolio_file)), exist_ok=True)
+    ledger.save(ledger_path(portfolio_file))
+    with open(portfolio_file, "w") as f:
+        json.dump(ledger.to_portfolio(), f, indent=2)
+
+
+def settle_into(ledger, trades, realized, asset2, leaderboard=None):
+    """Apply a settled round to the ledger and audit it; returns LEDGER_ERROR messages."""
+    opening = list(ledger.totals)
+    held = {player_id: ledger.held(player_id) for player_id in trades.players}
+    deltas = ledger.apply_round(trades, realized, asset2, leaderboard)
+    return ledger.audit(opening, deltas, held)
@@ -13,8 +13,9 @@ Requires a local `distributions.py` module with function:
 import csv
 import json
 import random
-import math
 from distributions import probability_A_beats_B
+from bracket import bracket_rounds, split_byes
+from columnar import SCHEMAS, arrow_schema, columnar_path, write_rows
 
 # -------------------
 # CONFIG
@@ -23,6 +24,9 @@ NUM_TEAMS = 32
 OUTPUT_FILE_VISIBLE = "initial_state_visible.csv"
 OUTPUT_FILE_INTERNAL = "initial_state_internal.csv"
 RNG_SEED = 42
+COLUMNAR_FORMAT = None  # "arrow" or "parquet" to also write typed columnar copies
+ATTRIBUTE_WEIGHTS_FILE = None  # fit_strengths.py output JSON to override ATTRIBUTE_WEIGHTS
+TRUE_STRENGTH_FILE = None  # fit_strengths.py output JSON whose true_strength map replaces the generated values
 
 DISTRIBUTION_POOL = [
     {'name': 'normal', 'params': {'sd': 0.04}},
@@ -45,7 +49,28 @@ ATTRIBUTE_WEIGHTS = {
 # -------------------
 # TEAM GENERATION
 # -------------------
-def generate_teams(num_teams):
+def load_attribute_weights(path):
+    """attribute_weights from a fit_strengths.py result file."""
+    with open(path) as f:
+        return json.load(f)["attribute_weights"]
+
+
+def attribute_weights():
+    """The weights in use: ATTRIBUTE_WEIGHTS_FILE's fitted weights if set, else ATTRIBUTE_WEIGHTS."""
+    return load_attribute_weights(ATTRIBUTE_WEIGHTS_FILE) if ATTRIBUTE_WEIGHTS_FILE else ATTRIBUTE_WEIGHTS
+
+
+def apply_true_strengths(teams, path):
+    """Replace each team's true_strength with the fitted value from a fit_strengths.py result
+       file (teams not in the fit are kept)."""
+    with open(path) as f:
+        fitted = json.load(f)["true_strength"]
+    for team in teams:
+        team["true_strength"] = fitted.get(str(team["team_id"]), team["true_strength"])
+    return teams
+
+
+def generate_teams(num_teams, pool=DISTRIBUTION_POOL, weights=ATTRIBUTE_WEIGHTS):
     teams = []
     for i in range(num_teams):
         offense = round(random.uniform(0.4, 0.9), 3)
@@ -55,14 +80,14 @@ def generate_teams(num_teams):
         variance = round(random.uniform(0.01, 0.2), 3)
 
         strength = (
-            ATTRIBUTE_WEIGHTS["offense"] * offense
-            + ATTRIBUTE_WEIGHTS["defense"] * defense
-            + ATTRIBUTE_WEIGHTS["chemistry"] * chemistry
-            + ATTRIBUTE_WEIGHTS["injury_risk"] * (1 - injury_risk)
+            weights["offense"] * offense
+            + weights["defense"] * defense
+            + weights["chemistry"] * chemistry
+            + weights["injury_risk"] * (1 - injury_risk)
         )
         strength = round(strength, 3)
 
-        dist_spec = random.choice(DISTRIBUTION_POOL)
+        dist_spec = random.choice(pool)
         true_strength = round(strength * (1 - variance), 3)
 
         team = {
@@ -86,7 +111,7 @@ def generate_teams(num_teams):
 # -------------------
 def compute_tournament_prices(teams):
     """Estimate each team's tournament win price using pairwise avg prob ** rounds_to_win."""
-    rounds_to_win = int(math.log2(len(teams)))
+    rounds_to_win = bracket_rounds(len(teams))
     for team in teams:
         total_prob = 0.0
         for other in teams:
@@ -112,8 +137,12 @@ def compute_tournament_prices(teams):
 # MATCHUPS (Round 1)
 # -------------------
 def compute_round_matchups(teams):
-    """Shuffle and pair teams into (team_A, team_B) matchups for round 1 and compute match prices."""
-    teams_copy = teams[:]  # don't mutate original order
+    """Shuffle and pair teams into (team_A, team_B) matchups for round 1 and compute match prices.
+       When the field is not a power of two the top seeds (by tournament_price) get byes
+       and have no round-1 matchup.
+    """
+    _, others = split_byes(teams)
+    teams_copy = [teams[i] for i in others]  # don't mutate original order
     random.shuffle(teams_copy)
     matchups = []
     for i in range(0, len(teams_copy), 2):
@@ -148,8 +177,10 @@ def compute_round_matchups(teams):
 # -------------------
 # CSV OUTPUT
 # -------------------
-def write_csv_visible(teams, matchups, filename):
-    """Public file: team overview and round-1 matchups (human readable)."""
+def write_csv_visible(teams, matchups, filename, columnar=None):
+    """Public file: team overview and round-1 matchups (human readable).
+       columnar="arrow"/"parquet" also writes <stem>.teams and <stem>.matchups tables.
+    """
     with open(filename, "w", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["--- TEAM OVERVIEW ---"])
@@ -173,9 +204,16 @@ def write_csv_visible(teams, matchups, filename):
                 m["team_A_price"], m["team_B_price"]
             ])
 
-def write_csv_internal(teams, matchups, filename):
+    if columnar:
+        team_cols = [c for c, _ in SCHEMAS["teams_visible"]]
+        write_rows([{c: t.get(c) for c in team_cols} for t in teams],
+                   arrow_schema("teams_visible"), columnar_path(filename, columnar, "teams"), columnar)
+        write_rows(matchups, arrow_schema("matchups_visible"), columnar_path(filename, columnar, "matchups"), columnar)
+
+def write_csv_internal(teams, matchups, filename, columnar=None):
     """Internal admin file: includes true_strength and distribution metadata.
        Ensure we only write the fields listed in fieldnames to avoid csv.DictWriter errors.
+       columnar="arrow"/"parquet" also writes <stem>.teams and <stem>.matchups tables.
     """
     fieldnames = [
         "team_id", "team_name", "true_strength", "dist_name", "dist_params", "tournament_price"
@@ -204,22 +242,32 @@ def write_csv_internal(teams, matchups, filename):
                 m["team_A_price"], m["team_B_price"]
             ])
 
+    if columnar:
+        write_rows([
+            [t["team_id"], t["team_name"], t["true_strength"], t["dist_name"],
+             json.dumps(t["dist_params"]), t.get("tournament_price")]
+            for t in teams
+        ], arrow_schema("teams_internal"), columnar_path(filename, columnar, "teams"), columnar)
+        write_rows(matchups, arrow_schema("matchups_internal"), columnar_path(filename, columnar, "matchups"), columnar)
+
 # -------------------
 # MAIN
 # -------------------
 def main():
     random.seed(RNG_SEED)
     print("Generating initial teams...")
-    teams = generate_teams(NUM_TEAMS)
+    teams = generate_teams(NUM_TEAMS, weights=attribute_weights())
+    if TRUE_STRENGTH_FILE:
+        teams = apply_true_strengths(teams, TRUE_STRENGTH_FILE)
     print("Computing tournament prices (approx)...")
     teams = compute_tournament_prices(teams)
     print("Building round 1 matchups...")
     matchups = compute_round_matchups(teams)
 
     print(f"Writing visible CSV to {OUTPUT_FILE_VISIBLE} ...")
-    write_csv_visible(teams, matchups, OUTPUT_FILE_VISIBLE)
+    write_csv_visible(teams, matchups, OUTPUT_FILE_VISIBLE, COLUMNAR_FORMAT)
     print(f"Writing internal CSV to {OUTPUT_FILE_INTERNAL} ...")
-    write_csv_internal(teams, matchups, OUTPUT_FILE_INTERNAL)
+    write_csv_internal(teams, matchups, OUTPUT_FILE_INTERNAL, COLUMNAR_FORMAT)
 
     print("Done.")
     print(f"Public file: {OUTPUT_FILE_VISIBLE}")
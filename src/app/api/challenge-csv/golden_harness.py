@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+golden_harness.py
+
+Run the reference (scalar) implementations and their fast counterparts side by
+side on generated inputs, check that they agree and record the speedup.
+
+Each case returns a result dict; Monte Carlo outputs are compared with a
+statistical tolerance (|fast - ref| within Z_TOL standard errors of the two
+estimates, plus a small absolute slack), settlement outputs must be exactly
+equal. Cases:
+
+ - win_probability: distributions.probability_A_beats_B per pair vs
+   vector_samplers.probability_matrix
+ - title_odds:      repeated simulate_tournament runs vs the bracket DP in
+   live_repricer over a vectorized win matrix
+ - settlement:      calculate_round + apply_round_to_portfolio per upload (the
+   calculate_payout_price.main flow) vs settlement_queue.settle_batch
+ - fixed_point:     calculate_round payouts vs the int64 cents path in
+   fixed_point.py, compared to the cent
+ - results_index:   calculate_round vs results_index.settle_columns (array lookups
+   by integer team id), equal up to float summation order
+ - sensitivity:     bump-and-reprice of every team's strength vs the one-pass
+   Jacobian in sensitivity.py, on the same common random numbers, compared
+   relative to the largest delta (the two differ by the O(step ** 2) error of
+   central differences)
+
+New fast paths register a function with @case("name"). Everything runs
+in-process with local files only.
+
+Outputs:
+ - golden_report.csv (case, metric, max_deviation, tolerance, passed, ref_seconds, fast_seconds, speedup)
+
+Usage:
+    python golden_harness.py [--quick] [--cases win_probability,settlement]
+"""
+
+import argparse
+import copy
+import csv
+import math
+import random
+import sys
+import time
+import numpy as np
+from calculate_payout_price import (
+    load_outcomes, load_round_prices, calculate_round, init_player_portfolios,
+    check_spending_limits, apply_round_to_portfolio
+)
+from distributions import probability_A_beats_B
+from fixed_point import CentsTrades, settle_round_cents, to_cents
+from generate_initial_state import generate_teams, compute_tournament_prices, compute_round_matchups
+from live_repricer import build_bracket, title_probabilities
+from records import Trade, TradeColumns
+from results_index import ResultsIndex, settle_columns
+from sensitivity import bump_and_reprice, sensitivities
+from settlement_queue import settle_batch
+from simulate_tournament import initial_leaves, simulate_tournament
+from vector_samplers import probability_matrix
+
+# -------------------
+# CONFIG
+# -------------------
+OUTPUT_REPORT = "golden_report.csv"
+RNG_SEED = 2025
+Z_TOL = 4.5           # standard errors allowed for Monte Carlo comparisons
+ABS_SLACK = 0.005     # absolute slack on probabilities (model noise in the reference)
+FLOAT_TOL = 1e-6      # payouts summed in a different order
+SENS_STEP = 0.002     # strength bump for the sensitivity case
+SENS_TOL = 0.01       # max |bump - jacobian| relative to max |jacobian|
+SIZES = {
+    "full":  {"teams": 16, "trials": 3000, "tournaments": 400, "uploads": 400},
+    "quick": {"teams": 8, "trials": 1500, "tournaments": 150, "uploads": 100},
+}
+
+CASES = {}
+
+
+def case(name):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    out = func(*args)
+    return out, time.perf_counter() - start
+
+
+def _result(name, metric, deviation, tolerance, passed, ref_s, fast_s):
+    return {
+        "case": name, "metric": metric,
+        "max_deviation": round(float(deviation), 6), "tolerance": round(float(tolerance), 6),
+        "passed": bool(passed),
+        "ref_seconds": round(ref_s, 4), "fast_seconds": round(fast_s, 4),
+        "speedup": round(ref_s / fast_s, 1) if fast_s > 0 else float("inf"),
+    }
+
+
+def _teams(n, seed=RNG_SEED):
+    random.seed(seed)
+    return generate_teams(n)
+
+
+# -------------------
+# CASES
+# -------------------
+@case("win_probability")
+def check_win_probability(size):
+    teams = _teams(size["teams"])
+    trials = size["trials"]
+    n = len(teams)
+
+    def reference():
+        random.seed(RNG_SEED)
+        win = np.full((n, n), 0.5)
+        for i in range(n):
+            for j in range(i + 1, n):
+                A, B = teams[i], teams[j]
+                win[i, j] = probability_A_beats_B(
+                    A["true_strength"], B["true_strength"],
+                    {'name': A["dist_name"], 'params': A["dist_params"]},
+                    {'name': B["dist_name"], 'params': B["dist_params"]},
+                    trials_mc=trials)
+        return win
+
+    ref, ref_s = _timed(reference)
+    fast, fast_s = _timed(lambda: probability_matrix(teams, trials, np.random.default_rng(RNG_SEED)))
+    iu = np.triu_indices(n, 1)
+    p = (ref[iu] + fast[iu]) / 2
+    se = np.sqrt(np.maximum(p * (1 - p), 1.0 / trials) * 2.0 / trials)
+    z = np.abs(ref[iu] - fast[iu]) / se
+    return _result("win_probability", "z-score", z.max(), Z_TOL, (z <= Z_TOL).all(), ref_s, fast_s)
+
+
+@case("title_odds")
+def check_title_odds(size):
+    teams = _teams(size["teams"])
+    random.seed(RNG_SEED)
+    teams = compute_tournament_prices(teams)
+    matchups = compute_round_matchups(teams)
+    runs = size["tournaments"]
+
+    def reference():
+        random.seed(RNG_SEED)
+        counts = {t["team_id"]: 0 for t in teams}
+        for _ in range(runs):
+            counts[simulate_tournament(teams, matchups)[-1]["winner_id"]] += 1
+        return {tid: c / runs for tid, c in counts.items()}
+
+    def fast():
+        win = probability_matrix(teams, 1200, np.random.default_rng(RNG_SEED))
+        return title_probabilities(build_bracket(teams, initial_leaves(teams, matchups), win))
+
+    ref, ref_s = _timed(reference)
+    dp, fast_s = _timed(fast)
+    worst, passed = 0.0, True
+    for tid, freq in ref.items():
+        p = dp.get(tid, 0.0)
+        se = math.sqrt(max(p * (1 - p), 1.0 / runs) / runs)
+        z = max(0.0, abs(freq - p) - ABS_SLACK) / se
+        worst = max(worst, z)
+        passed &= z <= Z_TOL
+    return _result("title_odds", "z-score", worst, Z_TOL, passed, ref_s, fast_s)
+
+
+def synthetic_uploads(round_prices, n_uploads, seed=RNG_SEED):
+    """Random uploads of 1-3 players each, mostly buys, some sells (which may oversell)."""
+    rng = random.Random(seed)
+    names = sorted(round_prices)
+    uploads = []
+    for _ in range(n_uploads):
+        trades = []
+        for _ in range(rng.randint(1, 3)):
+            player = f"p{rng.randint(1, n_uploads // 2 + 1):04d}"
+            for _ in range(rng.randint(1, 4)):
+                team = rng.choice(names)
+                asset = rng.choice("12")
+                action = "sell" if rng.random() < 0.2 else "buy"
+                price = round_prices[team]["asset1" if asset == "1" else "asset2"]
+                trades.append(Trade(player, team, action, float(rng.randint(1, 3)), price, asset))
+        uploads.append(trades)
+    return uploads
+
+
+@case("settlement")
+def check_settlement(size, round_num=1, outcomes_file="tournament_outcomes.csv",
+                     prices_file="round_1_prices.csv"):
+    outcomes = load_outcomes(outcomes_file, round_num)
+    round_prices = load_round_prices(prices_file, round_num)
+    uploads = synthetic_uploads(round_prices, size["uploads"])
+
+    def reference():
+        portfolio, results = {}, []
+        for trades in uploads:
+            trial = copy.deepcopy(portfolio)
+            init_player_portfolios(trial, trades)
+            if not check_spending_limits(trades, trial):
+                results.append(("SPENDING_LIMIT_ERROR", {}))
+                continue
+            payouts = calculate_round(None, outcomes, trades, round_prices, trial)
+            if payouts is None:
+                results.append(("POSITION_ERROR", {}))
+                continue
+            apply_round_to_portfolio(trial, trades, payouts)
+            portfolio = trial
+            results.append(("OK", payouts))
+        return portfolio, results
+
+    def fast():
+        portfolio = {}
+        results = settle_batch(portfolio, uploads, outcomes, round_prices)
+        return portfolio, [(r["status"], r["payouts"]) for r in results]
+
+    (ref_portfolio, ref_results), ref_s = _timed(reference)
+    (fast_portfolio, fast_results), fast_s = _timed(fast)
+    mismatches = sum(a != b for a, b in zip(ref_results, fast_results)) + (ref_portfolio != fast_portfolio)
+    return _result("settlement", "mismatches", mismatches, 0, mismatches == 0, ref_s, fast_s)
+
+
+def _cents_trades(trades, round_prices):
+    players, teams = {}, {}
+    rows = [(players.setdefault(t.player_id, len(players)), teams.setdefault(t.team_id, len(teams)),
+             1 if t.action == "buy" else -1, int(t.asset), int(t.quantity), to_cents(t.price)) for t in trades]
+    cols = [np.array(c, dtype=np.int64) for c in zip(*rows)]
+    return CentsTrades(list(players), list(teams), *cols)
+
+
+@case("fixed_point")
+def check_fixed_point(size, round_num=1, outcomes_file="tournament_outcomes.csv",
+                      prices_file="round_1_prices.csv"):
+    outcomes = load_outcomes(outcomes_file, round_num)
+    round_prices = load_round_prices(prices_file, round_num)
+    prices_cents = {t: (to_cents(p["asset1"]), to_cents(p["asset2"])) for t, p in round_prices.items()}
+    # one large upload of buys only, so neither path stops on a position error
+    trades = [t for trades in synthetic_uploads(round_prices, size["uploads"] * 10) for t in trades
+              if t.action == "buy"]
+    cols = _cents_trades(trades, round_prices)
+
+    ref, ref_s = _timed(lambda: calculate_round(None, outcomes, trades, round_prices))
+    (players, realized, asset2), fast_s = _timed(lambda: settle_round_cents(cols, outcomes, prices_cents))
+    mismatches = 0
+    for pid, r, a in zip(players, realized, asset2):
+        p = ref[pid]
+        mismatches += (to_cents(p["asset1_realized"]) != r) + (to_cents(p["asset2_pnl"]) != a)
+    mismatches += len(ref) != len(players)
+    return _result("fixed_point", "mismatches", mismatches, 0, mismatches == 0, ref_s, fast_s)
+
+
+@case("results_index")
+def check_results_index(size, round_num=2, outcomes_file="tournament_outcomes.csv",
+                        prices_file="round_2_prices.csv", results_file="tournament_results.csv"):
+    outcomes = load_outcomes(outcomes_file, round_num)
+    round_prices = load_round_prices(prices_file, round_num)
+    trades = [t for trades in synthetic_uploads(round_prices, size["uploads"] * 10) for t in trades
+              if t.action == "buy"]
+    cols = TradeColumns.from_trades(trades)
+    index = ResultsIndex.from_results(results_file)
+    won, table = index.outcome_array(round_num), index.price_table(prices_file, round_num)
+
+    ref, ref_s = _timed(lambda: calculate_round(None, outcomes, trades, round_prices))
+    fast, fast_s = _timed(lambda: settle_columns(cols, index, won, table))
+    worst = max((abs(ref[pid][k] - fast[pid][k]) for pid in ref for k in ref[pid]), default=0.0)
+    passed = ref.keys() == fast.keys() and worst <= FLOAT_TOL
+    return _result("results_index", "max_abs_diff", worst, FLOAT_TOL, passed, ref_s, fast_s)
+
+
+@case("sensitivity")
+def check_sensitivity(size):
+    teams = _teams(size["teams"])
+    random.seed(RNG_SEED)
+    teams = compute_tournament_prices(teams)
+    leaves = initial_leaves(teams, compute_round_matchups(teams))
+    trials = size["trials"]
+
+    ref, ref_s = _timed(lambda: np.column_stack([
+        bump_and_reprice(teams, leaves, i, step=SENS_STEP, trials_mc=trials, seed=RNG_SEED)
+        for i in range(len(teams))]))
+    fast, fast_s = _timed(lambda: sensitivities(teams, leaves, step=SENS_STEP, trials_mc=trials,
+                                                seed=RNG_SEED)["jacobian"])
+    worst = np.abs(ref - fast).max() / max(np.abs(ref).max(), 1e-12)
+    return _result("sensitivity", "rel_diff", worst, SENS_TOL, worst <= SENS_TOL, ref_s, fast_s)
+
+
+# -------------------
+# RUN
+# -------------------
+def run(names=None, quick=False):
+    size = SIZES["quick" if quick else "full"]
+    return [CASES[name](size) for name in (names or list(CASES))]
+
+
+def write_report(results, path=OUTPUT_REPORT):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=str, help=f"Comma-separated subset of {sorted(CASES)}")
+    parser.add_argument("--quick", action="store_true", help="Smaller inputs")
+    parser.add_argument("--report", type=str, default=OUTPUT_REPORT, help="Output CSV")
+    args = parser.parse_args()
+
+    names = [c for c in (args.cases or "").split(",") if c] or None
+    for name in names or []:
+        if name not in CASES:
+            parser.error(f"Unknown case {name}")
+    results = run(names, args.quick)
+    write_report(results, args.report)
+    for r in results:
+        status = "PASS" if r["passed"] else "FAIL"
+        print(f"{status} {r['case']:<16} {r['metric']} {r['max_deviation']} (tol {r['tolerance']}), "
+              f"speedup {r['speedup']}x")
+    print(f"Wrote {args.report}")
+    sys.exit(0 if all(r["passed"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+leaderboard.py
+
+Player ranking by cumulative_pnl, maintained incrementally during settlement.
+
+The leaderboard is an order-statistics treap keyed by (-cumulative_pnl,
+player_id): every node stores its subtree size, so updating one player's P&L,
+"rank of player X" and top-k all cost O(log n) (top-k is O(log n + k)) instead
+of re-sorting the whole portfolio after each round. calculate_payout_price.py
+keeps the board between runs next to the portfolio file
+(portfolio_state.leaderboard.csv, see state_path), loads it in O(n), re-ranks
+only the players whose balance changed and writes the round's ranking next to
+the payouts CSV.
+
+Output format (leaderboard CSV):
+    rank,player_id,cumulative_pnl
+"""
+
+import csv
+import os
+import random
+
+
+class _Node:
+    __slots__ = ("key", "prio", "left", "right", "size")
+
+    def __init__(self, key, prio):
+        self.key = key
+        self.prio = prio
+        self.left = None
+        self.right = None
+        self.size = 1
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _fix(node):
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+
+def _split(node, key):
+    """Split into (keys < key, keys >= key)."""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        return _fix(node), right
+    left, right = _split(node.left, key)
+    node.left = right
+    return left, _fix(node)
+
+
+def _merge(left, right):
+    """Merge two treaps where every key in left < every key in right."""
+    if left is None or right is None:
+        return left or right
+    if left.prio > right.prio:
+        left.right = _merge(left.right, right)
+        return _fix(left)
+    right.left = _merge(left, right.left)
+    return _fix(right)
+
+
+def _build(keys, rng):
+    """Treap over already sorted, distinct keys in O(n) (Cartesian tree on the priorities)."""
+    stack = []
+    for key in keys:
+        node, last = _Node(key, rng.random()), None
+        while stack and stack[-1].prio < node.prio:
+            last = stack.pop()
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+    root = stack[0] if stack else None
+    # subtree sizes, children before parents
+    order, todo = [], [root] if root else []
+    while todo:
+        node = todo.pop()
+        order.append(node)
+        todo.extend(child for child in (node.left, node.right) if child)
+    for node in reversed(order):
+        _fix(node)
+    return root
+
+
+def state_path(portfolio_file):
+    """Where the persistent leaderboard for a portfolio JSON lives."""
+    return os.path.splitext(portfolio_file)[0] + ".leaderboard.csv"
+
+
+def _delete(node, key):
+    if node is None:
+        return None
+    if key == node.key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    else:
+        node.right = _delete(node.right, key)
+    return _fix(node)
+
+
+class Leaderboard:
+    """Order-statistics tree of players ranked by cumulative P&L (highest first)."""
+
+    def __init__(self):
+        self._root = None
+        self._pnl = {}  # player_id -> cumulative_pnl currently in the tree
+        self._rng = random.Random(0)  # private RNG: never disturbs the global seed
+
+    def __len__(self):
+        return len(self._pnl)
+
+    def __contains__(self, player_id):
+        return player_id in self._pnl
+
+    @staticmethod
+    def _key(player_id, pnl):
+        return (-pnl, player_id)
+
+    def update(self, player_id, cumulative_pnl):
+        """Insert or move one player: O(log n)."""
+        old = self._pnl.get(player_id)
+        if old is not None:
+            if old == cumulative_pnl:
+                return
+            self._root = _delete(self._root, self._key(player_id, old))
+        key = self._key(player_id, cumulative_pnl)
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _Node(key, self._rng.random())), right)
+        self._pnl[player_id] = cumulative_pnl
+
+    def remove(self, player_id):
+        old = self._pnl.pop(player_id, None)
+        if old is not None:
+            self._root = _delete(self._root, self._key(player_id, old))
+
+    def pnl(self, player_id):
+        return self._pnl.get(player_id)
+
+    def rank(self, player_id):
+        """1-based rank (1 = highest P&L; ties broken by player_id), or None if unknown."""
+        pnl = self._pnl.get(player_id)
+        if pnl is None:
+            return None
+        key = self._key(player_id, pnl)
+        node, before = self._root, 0
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                before += _size(node.left) + 1
+                node = node.right
+            else:
+                return before + _size(node.left) + 1
+        return None
+
+    def top(self, k):
+        """[(rank, player_id, cumulative_pnl)] for the k best players: O(log n + k)."""
+        out = []
+        stack, node = [], self._root
+        while (stack or node) and len(out) < k:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            out.append((len(out) + 1, node.key[1], -node.key[0]))
+            node = node.right
+        return out
+
+    def items(self):
+        return self.top(len(self))
+
+    # -------------------
+    # BUILD / EXPORT
+    # -------------------
+    @classmethod
+    def from_portfolio(cls, portfolio):
+        board = cls()
+        for player_id, state in portfolio.items():
+            board.update(player_id, float(state.get("cumulative_pnl", 0)))
+        return board
+
+    def sync(self, portfolio):
+        """Re-rank players whose cumulative_pnl differs from the portfolio; returns how many moved."""
+        moved = 0
+        for player_id in [p for p in self._pnl if p not in portfolio]:
+            self.remove(player_id)
+            moved += 1
+        for player_id, state in portfolio.items():
+            pnl = float(state.get("cumulative_pnl", 0))
+            if self._pnl.get(player_id) != pnl:
+                self.update(player_id, pnl)
+                moved += 1
+        return moved
+
+    @classmethod
+    def for_portfolio(cls, path, portfolio):
+        """The board saved at path (rebuilt if missing), brought in line with the portfolio."""
+        try:
+            board = cls.load(path)
+        except FileNotFoundError:
+            return cls.from_portfolio(portfolio)
+        board.sync(portfolio)
+        return board
+
+    def save(self, path, precision=2):
+        """Write rank,player_id,cumulative_pnl (highest first); precision=None keeps exact values."""
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["rank", "player_id", "cumulative_pnl"])
+            for rank, player_id, pnl in self.items():
+                writer.writerow([rank, player_id, pnl if precision is None else round(pnl, precision)])
+
+    @classmethod
+    def load(cls, path):
+        """Read a saved board: O(n) when it is in rank order, as save() writes it."""
+        board = cls()
+        with open(path, newline="") as f:
+            rows = [(row["player_id"], float(row["cumulative_pnl"])) for row in csv.DictReader(f)]
+        keys = [cls._key(player_id, pnl) for player_id, pnl in rows]
+        if all(a < b for a, b in zip(keys, keys[1:])):
+            board._root = _build(keys, board._rng)
+            board._pnl = dict(rows)
+        else:
+            # rounded values can reorder ties; fall back to inserting one by one
+            for player_id, pnl in rows:
+                board.update(player_id, pnl)
+        return board
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+live_repricer.py
+
+Reprice Asset 2 (tournament winner) conditioned on the results played so far.
+
+The bracket is the flat heap-layout tree from bracket.py (any field size, byes
+included): the leaves hold the round-1 layout and every internal node is one
+match. Each node keeps the probability distribution of which team comes out of
+its subtree. Recording a match result collapses that node onto its winner and
+recomputes only its ancestors, so a fresh set of title prices can be published
+after every match.
+
+Outputs:
+ - live_prices.csv (title price of every surviving team after each match)
+
+Requires:
+ - initial_state_internal.csv (teams table)
+ - tournament_results.csv
+ - distributions.py (with probability_A_beats_B function)
+"""
+
+import csv
+from distributions import probability_A_beats_B
+from bracket import EMPTY, new_bracket, leaves_from_pairs, seed_ranking, match_node_for, advance
+from simulate_tournament import load_teams
+from records import MatchRecord
+
+INPUT_INTERNAL = "initial_state_internal.csv"
+INPUT_RESULTS = "tournament_results.csv"
+OUTPUT_LIVE_PRICES = "live_prices.csv"
+WIN_MATRIX_TRIALS = 1200
+
+
+# -------------------
+# WIN MATRIX
+# -------------------
+def build_win_matrix(teams, trials_mc=WIN_MATRIX_TRIALS):
+    """Return win[i][j] = P(teams[i] beats teams[j]); only the upper triangle is sampled."""
+    n = len(teams)
+    win = [[0.5] * n for _ in range(n)]
+    for i in range(n):
+        A = teams[i]
+        specA = {"name": A.get("dist_name") or "normal", "params": A.get("dist_params") or {}}
+        for j in range(i + 1, n):
+            B = teams[j]
+            specB = {"name": B.get("dist_name") or "normal", "params": B.get("dist_params") or {}}
+            p = probability_A_beats_B(A["true_strength"], B["true_strength"], specA, specB, trials_mc=trials_mc)
+            win[i][j] = p
+            win[j][i] = 1.0 - p
+    return win
+
+
+def apply_result_probs(win, index, matches):
+    """Overwrite matrix entries with the probA/probB recorded for matches already played."""
+    for m in matches:
+        a = index[m["teamA_id"]]
+        b = index[m["teamB_id"]]
+        win[a][b] = m["probA"]
+        win[b][a] = m["probB"]
+    return win
+
+
+# -------------------
+# BRACKET TREE
+# -------------------
+def _combine(left, right, win):
+    """Distribution of the winner of a match between the winners of two subtrees."""
+    if not left or not right:
+        # bye: whoever comes out of the non-empty side advances unopposed
+        return dict(left or right)
+    out = {}
+    for a, pa in left.items():
+        row = win[a]
+        out[a] = pa * sum(pb * row[b] for b, pb in right.items())
+    for b, pb in right.items():
+        row = win[b]
+        out[b] = pb * sum(pa * row[a] for a, pa in left.items())
+    return out
+
+
+def build_bracket(teams, leaves, win):
+    """
+    Build the priced bracket over a round-1 leaf layout of team indices
+    (EMPTY for byes), as produced by bracket.leaves_from_pairs.
+    """
+    bracket = new_bracket(leaves)
+    size = bracket["size"]
+    dist = [None] * (2 * size - 1)
+    for k, idx in enumerate(leaves):
+        dist[size - 1 + k] = {} if idx == EMPTY else {idx: 1.0}
+    for node in range(size - 2, -1, -1):
+        dist[node] = _combine(dist[2 * node + 1], dist[2 * node + 2], win)
+    bracket.update({
+        "teams": teams,
+        "index": {t["team_id"]: i for i, t in enumerate(teams)},
+        "win": win,
+        "dist": dist,
+    })
+    return bracket
+
+
+def record_result(bracket, teamA_id, teamB_id, winner_id):
+    """Collapse one match onto its winner and recompute only the path to the root."""
+    index = bracket["index"]
+    node = match_node_for(bracket, index[teamA_id], index[teamB_id])
+    winner = index[winner_id]
+    advance(bracket, node, winner)
+    dist = bracket["dist"]
+    dist[node] = {winner: 1.0}
+    while node:
+        node = (node - 1) // 2
+        dist[node] = _combine(dist[2 * node + 1], dist[2 * node + 2], bracket["win"])
+    return bracket
+
+
+def title_probabilities(bracket):
+    """Return {team_id: probability of winning the tournament} for surviving teams."""
+    teams = bracket["teams"]
+    return {teams[i]["team_id"]: p for i, p in bracket["dist"][0].items()}
+
+
+def title_prices(bracket):
+    """Title probabilities on the 0-100 price scale; eliminated teams are omitted."""
+    return {tid: round(p * 100, 2) for tid, p in title_probabilities(bracket).items()}
+
+
+# -------------------
+# RESULTS
+# -------------------
+def load_results(path=INPUT_RESULTS):
+    """Load tournament_results.csv as MatchRecords sorted by (round, match_id)."""
+    with open(path, newline="") as f:
+        matches = [MatchRecord.from_row(row) for row in csv.DictReader(f) if row.get("round")]
+    matches.sort(key=lambda m: (m.round, m.match_id))
+    return matches
+
+
+def bracket_from_results(teams, matches, trials_mc=WIN_MATRIX_TRIALS, round_num=1):
+    """
+    Build the unconditioned bracket whose round-1 layout is taken from the results
+    file; teams with no round-1 match are the seeded byes. Only the recorded
+    probabilities of matches before round_num go into the win matrix: later
+    rows are matchups nobody knew of yet, so using them would price in the
+    future bracket. With the default round_num=1 the matrix is the model's alone.
+    """
+    index = {t["team_id"]: i for i, t in enumerate(teams)}
+    pairs = [(index[m["teamA_id"]], index[m["teamB_id"]]) for m in matches if m["round"] == 1]
+    paired = {i for pair in pairs for i in pair}
+    byes = [i for i in seed_ranking(teams) if i not in paired]
+    played = [m for m in matches if m["round"] < round_num]
+    win = apply_result_probs(build_win_matrix(teams, trials_mc), index, played)
+    return build_bracket(teams, leaves_from_pairs(pairs, byes), win)
+
+
+def reprice_stream(bracket, matches):
+    """Record matches one at a time, yielding (match, title_prices) after each result."""
+    for m in matches:
+        record_result(bracket, m["teamA_id"], m["teamB_id"], m["winner_id"])
+        yield m, title_prices(bracket)
+
+
+def write_live_prices(bracket, matches, path=OUTPUT_LIVE_PRICES):
+    """Write the pre-tournament prices (match_id 0) and the prices after every match."""
+    names = {t["team_id"]: t["team_name"] for t in bracket["teams"]}
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["after_match_id", "round", "team_id", "team_name", "tournament_price"])
+        for tid, price in sorted(title_prices(bracket).items()):
+            writer.writerow([0, 0, tid, names[tid], price])
+        for m, prices in reprice_stream(bracket, matches):
+            for tid, price in sorted(prices.items()):
+                writer.writerow([m["match_id"], m["round"], tid, names[tid], price])
+    print(f"Wrote live prices to {path}")
+
+
+def main():
+    teams = load_teams(INPUT_INTERNAL)
+    matches = load_results(INPUT_RESULTS)
+    print(f"Loaded {len(teams)} teams and {len(matches)} results; building win matrix...")
+    bracket = bracket_from_results(teams, matches)
+    write_live_prices(bracket, matches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+load_generator.py
+
+Synthetic trading agents for settlement stress tests.
+
+A population of agents trades one round against the published
+round_N_prices.csv and the result is written as ordinary upload files plus an
+arrival schedule, so the payout engine (calculate_payout_price.py,
+settlement.py, settlement_queue.py) can be benchmarked at production scale.
+
+Strategies (mix set by STRATEGY_MIX / --mix):
+ - random:      uniform teams and assets, random sizes
+ - momentum:    buys the teams whose tournament price rose most since the
+                previous round (initial_prices.csv before round 1), favourites
+                for Asset 1
+ - fair_value:  buys contracts priced at least FAIR_EDGE points under the model
+                fair value (price_generation.fair_value_table)
+
+Every agent follows the settlement rules, so generated uploads settle OK in
+arrival order whatever the round's outcomes:
+ - no overselling: holdings start at zero in every upload (calculate_round), so
+   a sell only ever unwinds part of a buy earlier in the same upload,
+ - spending limit: an upload's buy cost never exceeds the agent's worst-case
+   liquid balance. The balance starts at STARTING_BALANCE (or the portfolio's
+   liquid_balance) and each upload lowers it by twice its net cost: the cost
+   itself plus a total loss on the positions.
+
+Outputs (under --out-dir):
+ - uploads/upload_NNNNNN.csv    one file per upload, header as empty_trades.csv
+ - schedule.csv                 upload_id, player_id, strategy, arrival_s, path, rows, buy_cost
+ - trades_roundN.csv            every row in arrival order, for parser benchmarks
+                                (one file for all agents, so it is not itself a valid single upload)
+
+Requires:
+ - round_N_prices.csv; initial_state_internal.csv and tournament_results.csv for fair_value agents
+ - numpy
+
+Usage:
+    python load_generator.py --round 1 --round-prices round_1_prices.csv --agents 5000 --out-dir load_round1
+"""
+
+import argparse
+import csv
+import math
+import os
+import random
+import numpy as np
+from calculate_payout_price import load_teams, load_round_prices, load_portfolio_state
+from live_repricer import load_results
+from price_generation import INPUT_INTERNAL, INPUT_RESULTS, fair_value_table
+from simulate_tournament import load_teams as load_internal_teams
+
+# -------------------
+# CONFIG
+# -------------------
+STARTING_BALANCE = 500.0
+STRATEGY_MIX = {"random": 0.5, "momentum": 0.25, "fair_value": 0.25}
+UPLOADS_PER_AGENT = (1, 3)
+ORDERS_PER_UPLOAD = (1, 6)
+MAX_QUANTITY = 5
+SELL_RATE = 0.15          # chance an order unwinds part of an earlier buy instead
+FAIR_EDGE = 3.0           # price points of mispricing a fair_value agent needs
+ROUND_SECONDS = 60.0      # upload window; arrivals bunch up towards the close
+CLOSE_SKEW = 3.0          # arrival times ~ ROUND_SECONDS * Beta(CLOSE_SKEW, 1)
+RNG_SEED = 11
+HEADER = ["player_id", "team_id", "action", "quantity", "asset"]
+
+
+# -------------------
+# MARKET
+# -------------------
+def load_market(round_num, prices_file, previous_prices_file=None, internal=INPUT_INTERNAL, results=INPUT_RESULTS):
+    """
+    Published prices plus the signals the strategies use:
+    {"prices": {team: {"asset1", "asset2"}}, "momentum": {team: change}, "fair": {team: {"asset1", "asset2"}}}
+    """
+    prices = load_round_prices(prices_file, round_num)
+    if previous_prices_file is None:
+        previous_prices_file = "initial_prices.csv" if round_num == 1 else f"round_{round_num - 1}_prices.csv"
+    if round_num == 1:
+        before = {t: v["tournament_price"] for t, v in load_teams(previous_prices_file).items()}
+    else:
+        before = {t: v["asset2"] for t, v in load_round_prices(previous_prices_file, round_num - 1).items()}
+    momentum = {t: p["asset2"] - before.get(t, p["asset2"]) for t, p in prices.items()}
+
+    fair = {}
+    if os.path.exists(internal) and os.path.exists(results):
+        table = fair_value_table(load_internal_teams(internal), load_results(results))
+        for k in np.flatnonzero(table["round"] == round_num):
+            fair[table["team_A"][k]] = {"asset1": table["asset1_A"][k], "asset2": table["asset2_A"][k]}
+            fair[table["team_B"][k]] = {"asset1": table["asset1_B"][k], "asset2": table["asset2_B"][k]}
+    return {"prices": prices, "momentum": momentum, "fair": fair}
+
+
+# -------------------
+# AGENTS
+# -------------------
+class Agent:
+    """Base agent: candidate contracts come from pick(); sizing and rule-keeping live here."""
+
+    strategy = "random"
+
+    def __init__(self, player_id, rng, balance=STARTING_BALANCE):
+        self.player_id = player_id
+        self.rng = rng
+        self.balance = balance            # worst-case liquid balance after earlier uploads
+
+    def pick(self, market):
+        """(team, asset) contracts this agent wants to buy, best first."""
+        contracts = [(t, a) for t in market["prices"] for a in "12"]
+        self.rng.shuffle(contracts)
+        return contracts
+
+    def upload(self, market):
+        """One upload's rows [(player_id, team, action, quantity, asset)]; updates the balance."""
+        rng, prices = self.rng, market["prices"]
+        candidates = [c for c in self.pick(market) if prices[c[0]][f"asset{c[1]}"] > 0]
+        rows, bought, buy_cost, net_cost = [], [], 0.0, 0.0
+        for _ in range(rng.randint(*ORDERS_PER_UPLOAD)):
+            if bought and rng.random() < SELL_RATE:
+                k = rng.randrange(len(bought))
+                team, asset, held = bought[k]
+                qty = rng.randint(1, held)
+                price = prices[team][f"asset{asset}"]
+                rows.append((self.player_id, team, "SELL", qty, asset))
+                net_cost -= qty * price
+                bought[k] = (team, asset, held - qty)
+                if held == qty:
+                    bought.pop(k)
+                continue
+            if not candidates:
+                break
+            team, asset = candidates[min(len(candidates) - 1, int(rng.expovariate(0.7)))]
+            price = prices[team][f"asset{asset}"]
+            qty = min(rng.randint(1, MAX_QUANTITY), math.floor((self.balance - buy_cost) / price))
+            if qty < 1:
+                continue
+            rows.append((self.player_id, team, "BUY", qty, asset))
+            bought.append((team, asset, qty))
+            buy_cost += qty * price
+            net_cost += qty * price
+        self.balance -= 2 * net_cost
+        return rows, buy_cost
+
+
+class MomentumAgent(Agent):
+    strategy = "momentum"
+
+    def pick(self, market):
+        prices, momentum = market["prices"], market["momentum"]
+        rising = sorted(prices, key=lambda t: -momentum.get(t, 0.0))
+        favourites = sorted(prices, key=lambda t: -prices[t]["asset1"])
+        picks = [(t, "2") for t in rising[:8]] + [(t, "1") for t in favourites[:8]]
+        self.rng.shuffle(picks)
+        return picks
+
+
+class FairValueAgent(Agent):
+    strategy = "fair_value"
+
+    def pick(self, market):
+        prices, fair = market["prices"], market["fair"]
+        edges = []
+        for team, fv in fair.items():
+            for asset in "12":
+                key = f"asset{asset}"
+                # each agent sees the fair value with its own model error
+                edge = fv[key] * self.rng.uniform(0.9, 1.1) - prices.get(team, {}).get(key, 0.0)
+                if team in prices and edge >= FAIR_EDGE:
+                    edges.append((edge, team, asset))
+        edges.sort(reverse=True)
+        return [(team, asset) for _, team, asset in edges] or super().pick(market)
+
+
+AGENTS = {cls.strategy: cls for cls in (Agent, MomentumAgent, FairValueAgent)}
+
+
+# -------------------
+# GENERATION
+# -------------------
+def make_agents(n_agents, rng, mix=STRATEGY_MIX, portfolio=None):
+    portfolio = portfolio or {}
+    names, weights = list(mix), list(mix.values())
+    agents = []
+    for i in range(n_agents):
+        player_id = f"agent{i + 1:06d}"
+        balance = float(portfolio.get(player_id, {}).get("liquid_balance", STARTING_BALANCE))
+        agents.append(AGENTS[rng.choices(names, weights)[0]](player_id, random.Random(rng.random()), balance))
+    return agents
+
+
+def generate_uploads(market, agents, rng, round_seconds=ROUND_SECONDS):
+    """[{player_id, strategy, arrival_s, rows, buy_cost}] sorted by arrival time."""
+    uploads = []
+    for agent in agents:
+        n = rng.randint(*UPLOADS_PER_AGENT)
+        # an agent's uploads arrive in order, so its balance bookkeeping matches settlement order
+        for arrival in sorted(round_seconds * rng.betavariate(CLOSE_SKEW, 1.0) for _ in range(n)):
+            rows, buy_cost = agent.upload(market)
+            if rows:
+                uploads.append({"player_id": agent.player_id, "strategy": agent.strategy,
+                                "arrival_s": round(arrival, 4), "rows": rows, "buy_cost": buy_cost})
+    uploads.sort(key=lambda u: u["arrival_s"])
+    return uploads
+
+
+def write_uploads(uploads, out_dir, round_num):
+    """Write the upload files, schedule.csv and the combined trades file. Returns the schedule path."""
+    upload_dir = os.path.join(out_dir, "uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    schedule_path = os.path.join(out_dir, "schedule.csv")
+    with open(schedule_path, "w", newline="") as sf, \
+            open(os.path.join(out_dir, f"trades_round{round_num}.csv"), "w", newline="") as af:
+        schedule, combined = csv.writer(sf), csv.writer(af)
+        schedule.writerow(["upload_id", "player_id", "strategy", "arrival_s", "path", "rows", "buy_cost"])
+        combined.writerow(HEADER)
+        for i, u in enumerate(uploads, 1):
+            path = os.path.join(upload_dir, f"upload_{i:06d}.csv")
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(HEADER)
+                writer.writerows(u["rows"])
+            combined.writerows(u["rows"])
+            schedule.writerow([i, u["player_id"], u["strategy"], u["arrival_s"], path, len(u["rows"]),
+                               round(u["buy_cost"], 2)])
+    return schedule_path
+
+
+def load_schedule(path):
+    """Schedule rows with arrival_s as float, in arrival order."""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        row["arrival_s"] = float(row["arrival_s"])
+    return rows
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in AGENTS:
+            raise ValueError(f"Unknown strategy {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--round", type=int, required=True, help="Round number")
+    parser.add_argument("--round-prices", type=str, required=True, help="Path to round_N_prices.csv")
+    parser.add_argument("--previous-prices", type=str, help="Prices the momentum signal compares against")
+    parser.add_argument("--agents", type=int, default=1000, help="Number of agents")
+    parser.add_argument("--mix", type=str, help="Strategy weights, e.g. random=0.5,momentum=0.25,fair_value=0.25")
+    parser.add_argument("--round-seconds", type=float, default=ROUND_SECONDS, help="Length of the upload window")
+    parser.add_argument("--portfolio", type=str, help="Portfolio JSON to take starting balances from (read only)")
+    parser.add_argument("--seed", type=int, default=RNG_SEED, help="RNG seed")
+    parser.add_argument("--out-dir", type=str, default="load_test", help="Output directory")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    market = load_market(args.round, args.round_prices, args.previous_prices)
+    portfolio = load_portfolio_state(args.portfolio) if args.portfolio else {}
+    agents = make_agents(args.agents, rng, parse_mix(args.mix) if args.mix else STRATEGY_MIX, portfolio)
+    uploads = generate_uploads(market, agents, rng, args.round_seconds)
+    schedule_path = write_uploads(uploads, args.out_dir, args.round)
+    n_rows = sum(len(u["rows"]) for u in uploads)
+    print(f"Wrote {len(uploads)} uploads ({n_rows} trades) from {len(agents)} agents; schedule in {schedule_path}")
+
+
+if __name__ == "__main__":
+    main()
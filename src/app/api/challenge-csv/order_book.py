@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+order_book.py
+
+In-process limit order book matching engine: one book per (team, asset).
+
+Prices are held as integer ticks (cents on the 0-100 price scale). Each side of a
+book is a heap of price levels plus a FIFO queue of orders per level, giving
+price-time priority:
+ - insert is O(log n) (O(1) when the level already exists),
+ - cancel is O(1): the order is marked dead and skipped when it reaches the
+   front of its level; empty levels are dropped lazily from the heap.
+
+A round has three phases:
+ 1. opening auction: orders accumulate without matching, then uncross() fills
+    everything that crosses at one clearing price (maximum executed volume,
+    then minimum imbalance, then closest to the reference price),
+ 2. continuous trading: incoming orders match immediately against the best
+    resting levels at the resting order's price,
+ 3. closing auction: same as the opening one.
+
+Orders are checked against each player's account when submitted, not at
+settlement:
+ - a sell needs the quantity in the player's holdings (carried forward from
+   earlier rounds plus fills so far), less what their resting sells already
+   commit (POSITION_ERROR),
+ - a buy's cost at its limit price, plus filled buys and resting buys, must fit
+   the player's liquid balance (SPENDING_LIMIT_ERROR), as check_spending_limits
+   does for uploads.
+Rejected orders raise ValueError and never reach the book; a cancel releases
+what the order committed.
+
+Fills convert to Trade records in execution order (a buy for the buyer and a
+sell for the seller at the fill price). calculate_round starts holdings at zero
+every round, so settle() runs it with check_positions=False: the sells were
+already covered by carried-forward holdings when they were submitted.
+
+Run directly for a throughput benchmark on synthetic order flow:
+    python order_book.py --orders 200000
+"""
+
+import argparse
+import heapq
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from calculate_payout_price import calculate_round
+from records import Trade
+
+# -------------------
+# CONFIG
+# -------------------
+TICKS_PER_POINT = 100   # 0.01 price increments
+MIN_PRICE_TICKS = 1
+MAX_PRICE_TICKS = 100 * TICKS_PER_POINT - 1
+STARTING_BALANCE = 500.0
+
+BUY, SELL = 1, -1
+AUCTION, CONTINUOUS, CLOSED = "auction", "continuous", "closed"
+
+
+def to_ticks(price):
+    return int(round(price * TICKS_PER_POINT))
+
+
+def from_ticks(ticks):
+    return ticks / TICKS_PER_POINT
+
+
+@dataclass(slots=True)
+class Order:
+    order_id: int
+    player_id: str
+    team_id: str
+    asset: str
+    side: int        # BUY or SELL
+    price: int       # ticks
+    quantity: int
+    seq: int
+    live: bool = True
+
+
+@dataclass(slots=True)
+class Fill:
+    team_id: str
+    asset: str
+    buyer: str
+    seller: str
+    price: int       # ticks
+    quantity: int
+    buy_order: int
+    sell_order: int
+
+    def trades(self):
+        """The buy and sell Trade records for calculate_round."""
+        price = from_ticks(self.price)
+        return (Trade(self.buyer, self.team_id, "buy", float(self.quantity), price, self.asset),
+                Trade(self.seller, self.team_id, "sell", float(self.quantity), price, self.asset))
+
+
+# -------------------
+# BOOK SIDE
+# -------------------
+class _Side:
+    """Price levels of one side: heap of keys (-price for bids) + FIFO per level."""
+
+    __slots__ = ("sign", "heap", "levels")
+
+    def __init__(self, side):
+        self.sign = -1 if side == BUY else 1   # heap pops the best price first
+        self.heap = []
+        self.levels = {}                       # price -> deque[Order]
+
+    def add(self, order):
+        level = self.levels.get(order.price)
+        if level is None:
+            level = self.levels[order.price] = deque()
+            heapq.heappush(self.heap, self.sign * order.price)
+        level.append(order)
+
+    def best(self):
+        """Best live level as (price, deque), dropping dead orders and empty levels."""
+        heap, levels = self.heap, self.levels
+        while heap:
+            price = self.sign * heap[0]
+            level = levels[price]
+            while level and not level[0].live:
+                level.popleft()
+            if level:
+                return price, level
+            heapq.heappop(heap)
+            del levels[price]
+        return None, None
+
+    def depth(self):
+        """{price: live quantity} over all levels."""
+        out = {}
+        for p, level in self.levels.items():
+            qty = sum(o.quantity for o in level if o.live)
+            if qty:
+                out[p] = qty
+        return out
+
+
+class OrderBook:
+    """Limit order book for one (team, asset)."""
+
+    def __init__(self, team_id, asset):
+        self.team_id = team_id
+        self.asset = asset
+        self.bids = _Side(BUY)
+        self.asks = _Side(SELL)
+
+    def rest(self, order):
+        (self.bids if order.side == BUY else self.asks).add(order)
+
+    def match(self, order, fills):
+        """Match an incoming order against resting liquidity; return the unfilled remainder."""
+        opposite = self.asks if order.side == BUY else self.bids
+        while order.quantity:
+            price, level = opposite.best()
+            if price is None or (price > order.price if order.side == BUY else price < order.price):
+                break
+            resting = level[0]
+            qty = min(order.quantity, resting.quantity)
+            fills.append(self._fill(order, resting, price, qty))
+            order.quantity -= qty
+            resting.quantity -= qty
+            if not resting.quantity:
+                resting.live = False
+                level.popleft()
+        return order.quantity
+
+    def _fill(self, a, b, price, qty):
+        buy, sell = (a, b) if a.side == BUY else (b, a)
+        return Fill(self.team_id, self.asset, buy.player_id, sell.player_id, price, qty, buy.order_id, sell.order_id)
+
+    def clearing_price(self, reference=None):
+        """Auction price maximizing executed volume, then minimizing imbalance, then nearest reference."""
+        bid_depth, ask_depth = self.bids.depth(), self.asks.depth()
+        prices = sorted(set(bid_depth) | set(ask_depth))
+        # cumulative demand (bids at or above p) and supply (asks at or below p)
+        demand_at, total = {}, 0
+        for p in reversed(prices):
+            total += bid_depth.get(p, 0)
+            demand_at[p] = total
+        best, best_key, supply = None, None, 0
+        for p in prices:
+            supply += ask_depth.get(p, 0)
+            demand = demand_at[p]
+            volume = min(demand, supply)
+            if not volume:
+                continue
+            key = (-volume, abs(demand - supply), abs(p - reference) if reference is not None else 0, p)
+            if best_key is None or key < best_key:
+                best, best_key = p, key
+        return best
+
+    def uncross(self, reference=None):
+        """Run the call auction: all crossing orders trade at one price in price-time priority."""
+        price = self.clearing_price(reference)
+        fills = []
+        if price is None:
+            return fills
+        while True:
+            bid_price, bids = self.bids.best()
+            ask_price, asks = self.asks.best()
+            if bid_price is None or ask_price is None or bid_price < price or ask_price > price:
+                break
+            buy, sell = bids[0], asks[0]
+            qty = min(buy.quantity, sell.quantity)
+            fills.append(Fill(self.team_id, self.asset, buy.player_id, sell.player_id, price, qty,
+                              buy.order_id, sell.order_id))
+            for order, level in ((buy, bids), (sell, asks)):
+                order.quantity -= qty
+                if not order.quantity:
+                    order.live = False
+                    level.popleft()
+        return fills
+
+
+# -------------------
+# ENGINE
+# -------------------
+class MatchingEngine:
+    """
+    All books for one round plus the order index used for cancels and the
+    per-player accounts orders are checked against.
+
+    holdings:  {player_id: {(team_id, asset): quantity}} carried forward into the
+               round; updated in place as fills happen
+    portfolio: portfolio state for liquid balances (STARTING_BALANCE if absent)
+    """
+
+    def __init__(self, reference_prices=None, holdings=None, portfolio=None):
+        self.books = {}
+        self.orders = {}
+        self.fills = []
+        self.phase = CLOSED
+        self.reference = reference_prices or {}  # {team_id: {"asset1": p, "asset2": p}}
+        self.holdings = holdings if holdings is not None else {}
+        self.portfolio = portfolio or {}
+        self._committed_qty = {}    # (player_id, team_id, asset) -> quantity in resting sells
+        self._committed_cash = {}   # player_id -> limit cost of resting buys
+        self._spent = {}            # player_id -> cost of filled buys
+        self._next_id = 0
+        self._seq = 0
+
+    def book(self, team_id, asset):
+        key = (team_id, asset)
+        book = self.books.get(key)
+        if book is None:
+            book = self.books[key] = OrderBook(team_id, asset)
+        return book
+
+    def start_auction(self):
+        self.phase = AUCTION
+
+    def uncross(self):
+        """Clear every book's auction and switch to continuous trading. Returns the auction fills."""
+        fills = []
+        for (team_id, asset), book in self.books.items():
+            ref = self.reference.get(team_id, {}).get("asset1" if asset == "1" else "asset2")
+            fills.extend(book.uncross(to_ticks(ref) if ref is not None else None))
+        self._record(fills)
+        self.phase = CONTINUOUS
+        return fills
+
+    def close(self):
+        """Closing auction, then stop accepting orders."""
+        self.start_auction()
+        fills = self.uncross()
+        self.phase = CLOSED
+        return fills
+
+    def submit(self, player_id, team_id, asset, side, price, quantity):
+        """Add a limit order (price on the 0-100 scale). Returns (order_id, fills from this order)."""
+        if self.phase == CLOSED:
+            raise RuntimeError("Market is closed")
+        if side not in (BUY, SELL):
+            raise ValueError(f"Invalid side {side}")
+        ticks = to_ticks(price)
+        if not MIN_PRICE_TICKS <= ticks <= MAX_PRICE_TICKS or quantity <= 0:
+            raise ValueError(f"Invalid order {price} x {quantity}")
+        quantity = int(quantity)
+        self._check(player_id, team_id, asset, side, ticks, quantity)
+        self._next_id += 1
+        self._seq += 1
+        order = Order(self._next_id, player_id, team_id, asset, side, ticks, quantity, self._seq)
+        self.orders[order.order_id] = order
+        self._commit(order, quantity)
+        book = self.book(team_id, asset)
+        fills = []
+        if self.phase == CONTINUOUS:
+            book.match(order, fills)
+            self._record(fills)
+        if order.quantity:
+            book.rest(order)
+        else:
+            order.live = False
+            del self.orders[order.order_id]
+        return order.order_id, fills
+
+    def cancel(self, order_id):
+        """O(1): mark dead; the book drops it when it reaches the front of its level."""
+        order = self.orders.pop(order_id, None)
+        if order is None or not order.live:
+            return False
+        order.live = False
+        self._commit(order, -order.quantity)
+        return True
+
+    # accounts
+    def balance(self, player_id):
+        return float(self.portfolio.get(player_id, {}).get("liquid_balance", STARTING_BALANCE))
+
+    def available(self, player_id, team_id, asset):
+        """Quantity the player can still offer: holdings less resting sells."""
+        held = self.holdings.get(player_id, {}).get((team_id, asset), 0)
+        return held - self._committed_qty.get((player_id, team_id, asset), 0)
+
+    def _check(self, player_id, team_id, asset, side, ticks, quantity):
+        if side == SELL:
+            available = self.available(player_id, team_id, asset)
+            if available < quantity:
+                raise ValueError(f"POSITION_ERROR:Player {player_id} trying to sell {quantity} of {team_id} "
+                                 f"asset {asset}, but only has {available} available")
+            return
+        cost = self._spent.get(player_id, 0.0) + self._committed_cash.get(player_id, 0.0) \
+            + quantity * from_ticks(ticks)
+        if cost > self.balance(player_id):
+            raise ValueError(f"SPENDING_LIMIT_ERROR:Player {player_id} buy cost would reach {cost:.2f}, "
+                             f"liquid balance is {self.balance(player_id):.2f}")
+
+    def _commit(self, order, quantity):
+        """Reserve (quantity > 0) or release (< 0) what a resting order ties up."""
+        if order.side == SELL:
+            key = (order.player_id, order.team_id, order.asset)
+            self._committed_qty[key] = self._committed_qty.get(key, 0) + quantity
+        else:
+            pid = order.player_id
+            self._committed_cash[pid] = self._committed_cash.get(pid, 0.0) + quantity * from_ticks(order.price)
+
+    def _record(self, fills):
+        """Move filled quantity out of the commitments and into holdings and spent cash."""
+        for fill in fills:
+            key = (fill.team_id, fill.asset)
+            self._commit(self.orders[fill.buy_order], -fill.quantity)
+            self._commit(self.orders[fill.sell_order], -fill.quantity)
+            self._spent[fill.buyer] = self._spent.get(fill.buyer, 0.0) + fill.quantity * from_ticks(fill.price)
+            buyer = self.holdings.setdefault(fill.buyer, {})
+            seller = self.holdings.setdefault(fill.seller, {})
+            buyer[key] = buyer.get(key, 0) + fill.quantity
+            seller[key] = seller.get(key, 0) - fill.quantity
+        self.fills.extend(fills)
+
+    def trades(self):
+        """All fills so far as Trade records, in execution order."""
+        return [trade for fill in self.fills for trade in fill.trades()]
+
+    def settle(self, outcomes, round_prices, portfolio=None):
+        """
+        Payouts for the round's fills from calculate_round. Sells were checked
+        against carried-forward holdings on submit, so its per-round check is skipped.
+        """
+        return calculate_round(None, outcomes, self.trades(), round_prices, portfolio, check_positions=False)
+
+
+# -------------------
+# BENCHMARK
+# -------------------
+def synthetic_flow(n_orders, n_teams=32, n_players=1000, cancel_rate=0.2, seed=0):
+    """Random limit orders around a per-book mid price, with some cancels."""
+    rng = random.Random(seed)
+    mids = {(f"Team_{t + 1}", a): rng.uniform(5, 95) for t in range(n_teams) for a in "12"}
+    keys = list(mids)
+    flow = []
+    for _ in range(n_orders):
+        if flow and rng.random() < cancel_rate:
+            flow.append(("cancel", rng.randint(1, len(flow))))
+            continue
+        team_id, asset = rng.choice(keys)
+        side = BUY if rng.random() < 0.5 else SELL
+        price = round(min(99.99, max(0.01, mids[(team_id, asset)] + rng.gauss(0, 1.5))), 2)
+        flow.append(("order", (f"p{rng.randrange(n_players)}", team_id, asset, side, price, rng.randint(1, 10))))
+    return flow
+
+
+def benchmark(n_orders, seed=0, n_teams=32, n_players=1000):
+    flow = synthetic_flow(n_orders, n_teams, n_players, seed=seed)
+    # every player starts deep in every contract, so the benchmark measures matching
+    inventory = {(f"Team_{t + 1}", a): 10 ** 9 for t in range(n_teams) for a in "12"}
+    players = [f"p{i}" for i in range(n_players)]
+    engine = MatchingEngine(holdings={p: dict(inventory) for p in players},
+                            portfolio={p: {"liquid_balance": 1e12} for p in players})
+    engine.start_auction()
+    opening = max(1, len(flow) // 20)
+    start = time.perf_counter()
+    for i, (kind, payload) in enumerate(flow):
+        if i == opening:
+            engine.uncross()
+        if kind == "order":
+            engine.submit(*payload)
+        else:
+            engine.cancel(payload)
+    engine.close()
+    elapsed = time.perf_counter() - start
+    return len(flow) / elapsed, len(engine.fills)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=200000, help="Synthetic orders/cancels to process")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed for the order flow")
+    args = parser.parse_args()
+    rate, n_fills = benchmark(args.orders, args.seed)
+    print(f"{args.orders:,} messages, {n_fills:,} fills: {rate:,.0f} orders/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+price_generation.py
+
+Configurable market-noise generator for the published round prices.
+
+Fair values for every round are built once (Asset 1 from the match
+probabilities, Asset 2 from the bracket repriced after each round), then noise
+is drawn for all matches, all rounds and any number of scenarios in one
+vectorized pass. Scenario 0 is written as the usual round_N_prices.csv files;
+extra scenarios go to scenario_K/ sub-directories for practice rounds.
+
+Noise models (spec format mirrors DISTRIBUTION_POOL):
+ - {'name': 'multiplicative', 'params': {'sd': 0.12}}
+     price * N(1, sd), clamped to [1, 99]; matchup prices are renormalized.
+ - {'name': 'logit', 'params': {'sd': 0.4}}
+     N(0, sd) added in log-odds space, so prices stay strictly inside (0, 100)
+     and the two sides of a matchup always sum to 100 without renormalizing.
+
+A non-zero 'spread' (price points) adds bid/ask columns around each mid price.
+
+In-process callers that settle the generated prices (sweep_runner.py) take them
+as integer-id tables from id_price_tables() instead of name-keyed dicts.
+
+Requires:
+ - initial_state_internal.csv, tournament_results.csv
+ - numpy
+"""
+
+import argparse
+import csv
+import os
+import numpy as np
+from columnar import FORMATS, arrow_schema, columnar_path, write_table
+from live_repricer import load_results, bracket_from_results, record_result, title_probabilities
+from simulate_tournament import load_teams
+
+# -------------------
+# CONFIG
+# -------------------
+INPUT_INTERNAL = "initial_state_internal.csv"
+INPUT_RESULTS = "tournament_results.csv"
+RNG_SEED = 42
+
+NOISE_CONFIG = {
+    "asset1": {'name': 'multiplicative', 'params': {'sd': 0.12}},
+    "asset2": {'name': 'multiplicative', 'params': {'sd': 0.2}},
+    "spread": 0.0,
+}
+
+PRICE_FLOOR = 1.0
+PRICE_CAP = 99.0
+LOGIT_EPS = 1e-4
+MIN_TICK = 0.01
+
+BASE_COLUMNS = ['match_id', 'round', 'team_A', 'team_B', 'team_A_price', 'team_B_price',
+                'team_A_tournament_price', 'team_B_tournament_price']
+SPREAD_COLUMNS = ['team_A_bid', 'team_A_ask', 'team_B_bid', 'team_B_ask',
+                  'team_A_tournament_bid', 'team_A_tournament_ask',
+                  'team_B_tournament_bid', 'team_B_tournament_ask']
+
+
+# -------------------
+# FAIR VALUES
+# -------------------
+def fair_value_table(teams, matches, bracket=None):
+    """
+    Return column arrays (one entry per match, all rounds) of fair prices on the
+    0-100 scale. Asset 2 fair values are taken from the bracket conditioned on
+    every earlier round, so eliminated teams never appear and survivors are repriced.
+    """
+    matches = sorted(matches, key=lambda m: (m["round"], m["match_id"]))
+    if bracket is None:
+        bracket = bracket_from_results(teams, matches)
+    title_A, title_B = [], []
+    current_round = None
+    pending = []
+    for m in matches:
+        if m["round"] != current_round:
+            for p in pending:
+                record_result(bracket, p["teamA_id"], p["teamB_id"], p["winner_id"])
+            pending = []
+            current_round = m["round"]
+            title = title_probabilities(bracket)
+        title_A.append(title.get(m["teamA_id"], 0.0) * 100)
+        title_B.append(title.get(m["teamB_id"], 0.0) * 100)
+        pending.append(m)
+    return {
+        "match_id": np.array([m["match_id"] for m in matches], dtype=np.int64),
+        "round": np.array([m["round"] for m in matches], dtype=np.int64),
+        "team_A": np.array([m["teamA"] for m in matches], dtype=object),
+        "team_B": np.array([m["teamB"] for m in matches], dtype=object),
+        "asset1_A": np.array([m["probA"] * 100 for m in matches]),
+        "asset1_B": np.array([m["probB"] * 100 for m in matches]),
+        "asset2_A": np.array(title_A),
+        "asset2_B": np.array(title_B),
+    }
+
+
+# -------------------
+# NOISE MODELS
+# -------------------
+def _logit(price):
+    p = np.clip(price / 100.0, LOGIT_EPS, 1.0 - LOGIT_EPS)
+    return np.log(p / (1.0 - p))
+
+
+def _from_logit(x):
+    return 100.0 / (1.0 + np.exp(-x))
+
+
+def noisy_matchup_prices(fair_A, fair_B, spec, rng, n_scenarios):
+    """Asset 1 prices for both sides, shape (n_scenarios, n_matches); sides sum to 100."""
+    name = spec.get('name', 'multiplicative')
+    params = spec.get('params', {})
+    sd = params.get('sd', 0.12)
+    shape = (n_scenarios, len(fair_A))
+    if name == 'multiplicative':
+        a = np.clip(fair_A * rng.normal(1.0, sd, shape), PRICE_FLOOR, PRICE_CAP)
+        b = np.clip(fair_B * rng.normal(1.0, sd, shape), PRICE_FLOOR, PRICE_CAP)
+        price_A = np.round(a / (a + b) * 100, 2)
+    elif name == 'logit':
+        price_A = np.round(_from_logit(_logit(fair_A) + rng.normal(0.0, sd, shape)), 2)
+        price_A = np.clip(price_A, MIN_TICK, 100 - MIN_TICK)
+    else:
+        raise ValueError(f"Unknown noise model {name}")
+    return price_A, np.round(100 - price_A, 2)
+
+
+def noisy_tournament_prices(fair, spec, rng, n_scenarios):
+    """Asset 2 prices, shape (n_scenarios, n_matches); eliminated teams (fair 0) stay at 0."""
+    name = spec.get('name', 'multiplicative')
+    params = spec.get('params', {})
+    sd = params.get('sd', 0.2)
+    shape = (n_scenarios, len(fair))
+    if name == 'multiplicative':
+        noisy = np.clip(fair * rng.normal(1.0, sd, shape), PRICE_FLOOR, PRICE_CAP)
+    elif name == 'logit':
+        noisy = _from_logit(_logit(fair) + rng.normal(0.0, sd, shape))
+    else:
+        raise ValueError(f"Unknown noise model {name}")
+    # Surviving teams never round down to 0, which would read as eliminated
+    return np.where(fair > 0, np.maximum(np.round(noisy, 2), MIN_TICK), 0.0)
+
+
+def bid_ask(mid, spread):
+    """Symmetric bid/ask around mid prices, kept inside [0, 100]."""
+    half = spread / 2.0
+    return np.round(np.clip(mid - half, 0.0, 100.0), 2), np.round(np.clip(mid + half, 0.0, 100.0), 2)
+
+
+def generate_price_scenarios(fair, config=NOISE_CONFIG, n_scenarios=1, seed=RNG_SEED):
+    """Draw every round's prices for n_scenarios at once. Returns (n_scenarios, n_matches) arrays."""
+    rng = np.random.default_rng(seed)
+    prices = {}
+    prices["team_A_price"], prices["team_B_price"] = noisy_matchup_prices(
+        fair["asset1_A"], fair["asset1_B"], config["asset1"], rng, n_scenarios)
+    prices["team_A_tournament_price"] = noisy_tournament_prices(fair["asset2_A"], config["asset2"], rng, n_scenarios)
+    prices["team_B_tournament_price"] = noisy_tournament_prices(fair["asset2_B"], config["asset2"], rng, n_scenarios)
+    spread = config.get("spread", 0.0)
+    if spread > 0:
+        for side in ("team_A", "team_B", "team_A_tournament", "team_B_tournament"):
+            prices[f"{side}_bid"], prices[f"{side}_ask"] = bid_ask(prices[f"{side}_price"], spread)
+    return prices
+
+
+def id_price_tables(index, fair, prices, scenario=0):
+    """
+    {round: (n_ids, 2) Asset 1 / Asset 2 price table keyed by integer team id}
+    for one scenario, built through a results_index.ResultsIndex over the same
+    matches, for settle_columns.
+    """
+    tables = {}
+    for round_num in np.unique(fair["round"]):
+        sel = fair["round"] == round_num
+        tables[int(round_num)] = index.table_from_columns(
+            fair["team_A"][sel], fair["team_B"][sel],
+            prices["team_A_price"][scenario][sel], prices["team_B_price"][scenario][sel],
+            prices["team_A_tournament_price"][scenario][sel], prices["team_B_tournament_price"][scenario][sel])
+    return tables
+
+
+# -------------------
+# CSV OUTPUT
+# -------------------
+def write_round_price_files(fair, prices, scenario=0, out_dir=".", columnar=None):
+    """
+    Write one scenario's round_N_prices.csv files in a single pass over the match
+    table. columnar="arrow"/"parquet" also writes a typed round_N_prices.<ext> per round.
+    """
+    columns = BASE_COLUMNS + (SPREAD_COLUMNS if "team_A_bid" in prices else [])
+    os.makedirs(out_dir, exist_ok=True)
+    rows = {col: prices[col][scenario] for col in columns if col in prices}
+    written = []
+    handle, writer, current_round = None, None, None
+    try:
+        for i in range(len(fair["match_id"])):
+            round_num = int(fair["round"][i])
+            if round_num != current_round:
+                if handle:
+                    handle.close()
+                filename = os.path.join(out_dir, f"round_{round_num}_prices.csv")
+                handle = open(filename, "w", newline="")
+                writer = csv.writer(handle)
+                writer.writerow(columns)
+                written.append(filename)
+                current_round = round_num
+            writer.writerow(
+                [int(fair["match_id"][i]), round_num, fair["team_A"][i], fair["team_B"][i]]
+                + [float(rows[col][i]) for col in columns[4:]]
+            )
+    finally:
+        if handle:
+            handle.close()
+
+    if columnar:
+        schema = arrow_schema("round_prices", "round_prices_spread") if "team_A_bid" in prices else arrow_schema("round_prices")
+        for round_num in np.unique(fair["round"]):
+            sel = fair["round"] == round_num
+            columns = {"match_id": fair["match_id"][sel], "round": fair["round"][sel],
+                       "team_A": fair["team_A"][sel], "team_B": fair["team_B"][sel]}
+            for col in schema.names[4:]:
+                columns[col] = rows[col][sel]
+            csv_name = os.path.join(out_dir, f"round_{round_num}_prices.csv")
+            written.append(write_table(columns, schema, columnar_path(csv_name, columnar), columnar))
+    return written
+
+
+def write_scenarios(fair, prices, out_dir=".", columnar=None):
+    """Scenario 0 goes to out_dir itself; scenario K > 0 goes to out_dir/scenario_K/."""
+    n_scenarios = prices["team_A_price"].shape[0]
+    for k in range(n_scenarios):
+        target = out_dir if k == 0 else os.path.join(out_dir, f"scenario_{k}")
+        for filename in write_round_price_files(fair, prices, scenario=k, out_dir=target, columnar=columnar):
+            print(f"Generated {filename}")
+
+
+def config_from_args(args):
+    return {
+        "asset1": {'name': args.model, 'params': {'sd': args.asset1_sd}},
+        "asset2": {'name': args.model, 'params': {'sd': args.asset2_sd}},
+        "spread": args.spread,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=["multiplicative", "logit"], default="multiplicative", help="Noise model for both assets")
+    parser.add_argument("--asset1-sd", type=float, default=NOISE_CONFIG["asset1"]["params"]["sd"], help="Noise level for matchup prices")
+    parser.add_argument("--asset2-sd", type=float, default=NOISE_CONFIG["asset2"]["params"]["sd"], help="Noise level for tournament prices")
+    parser.add_argument("--spread", type=float, default=0.0, help="Bid/ask spread in price points (0 = mid only)")
+    parser.add_argument("--scenarios", type=int, default=1, help="Number of price scenarios to generate")
+    parser.add_argument("--seed", type=int, default=RNG_SEED, help="RNG seed for the noise draws")
+    parser.add_argument("--out-dir", type=str, default=".", help="Directory for round_N_prices.csv files")
+    parser.add_argument("--columnar", choices=FORMATS, help="Also write each round in a columnar format")
+    args = parser.parse_args()
+
+    teams = load_teams(INPUT_INTERNAL)
+    matches = load_results(INPUT_RESULTS)
+    fair = fair_value_table(teams, matches)
+    prices = generate_price_scenarios(fair, config_from_args(args), n_scenarios=args.scenarios, seed=args.seed)
+    write_scenarios(fair, prices, args.out_dir, args.columnar)
+    print(f"\nDone! Generated {args.scenarios} price scenario(s) for {len(np.unique(fair['round']))} rounds.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+records.py
+
+Compact record types shared by the challenge scripts.
+
+ - Team, Matchup, MatchResult, MatchRecord, Trade: slots dataclasses (no
+   per-instance __dict__, attribute access instead of string-keyed dict
+   lookups). Each converts from and to the CSV row it is read from or written
+   to (from_row / to_row):
+     Team        simulate_tournament.load_teams (initial_state_internal.csv teams)
+     Matchup     simulate_tournament.load_initial_matchups (its round-1 table)
+     MatchResult simulate_tournament.simulate_match
+     MatchRecord simulate_tournament.simulate_tournament, live_repricer.load_results
+                 (tournament_results.csv)
+     Trade       calculate_payout_price.load_trades (trade uploads)
+   Team, Matchup and MatchRecord also answer record["field"], .get() and
+   .keys(), so code written against the old row dicts reads them unchanged;
+   hot loops use the attributes.
+ - TradeColumns: struct-of-arrays container for bulk trade data, with player
+   and team ids interned to integer codes and one typed array per column.
+
+Run directly for a memory benchmark of the per-trade footprint:
+    python records.py --rows 1000000
+"""
+
+import argparse
+import json
+import tracemalloc
+from array import array
+from dataclasses import dataclass, field
+
+
+# -------------------
+# RECORDS
+# -------------------
+class _Row:
+    """Dict-style read/write by column name on top of a slots dataclass."""
+
+    __slots__ = ()
+
+    def keys(self):
+        return self.__slots__
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def to_row(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+def _parse_params(raw):
+    """Parse a dist_params cell, tolerating CSV double-quote escaping."""
+    raw = (raw or "").strip()
+    if raw.startswith('"') and raw.endswith('"'):
+        raw = raw[1:-1]
+    raw = raw.replace('""', '"')
+    try:
+        return json.loads(raw) if raw else {}
+    except Exception:
+        return {}
+
+
+@dataclass(slots=True)
+class Team(_Row):
+    team_id: int
+    team_name: str
+    true_strength: float = 0.0
+    dist_name: str = ""
+    dist_params: dict = field(default_factory=dict)
+    tournament_price: float = 0.0
+
+    @classmethod
+    def from_row(cls, row):
+        """From an initial_state_internal.csv teams row."""
+        team_id = int((row.get("team_id") or "").strip())
+        return cls(
+            team_id,
+            (row.get("team_name") or f"Team_{team_id}").strip(),
+            float(row.get("true_strength") or 0.0),
+            (row.get("dist_name") or "").strip(),
+            _parse_params(row.get("dist_params")),
+            float(row.get("tournament_price") or 0.0),
+        )
+
+    @classmethod
+    def from_dict(cls, team):
+        """From a team dict as generate_teams builds it (extra attribute columns are dropped)."""
+        if isinstance(team, cls):
+            return team
+        return cls(team["team_id"], team["team_name"], team["true_strength"], team.get("dist_name") or "",
+                   team.get("dist_params") or {}, team.get("tournament_price") or 0.0)
+
+    def to_row(self):
+        """Back to the initial_state_internal.csv teams row."""
+        return {
+            "team_id": self.team_id,
+            "team_name": self.team_name,
+            "true_strength": self.true_strength,
+            "dist_name": self.dist_name,
+            "dist_params": json.dumps(self.dist_params),
+            "tournament_price": self.tournament_price,
+        }
+
+
+@dataclass(slots=True)
+class Matchup(_Row):
+    match_id: int
+    team_A_id: int
+    team_B_id: int
+    team_A: str
+    team_B: str
+    team_A_price: float
+    team_B_price: float
+
+    @classmethod
+    def from_row(cls, row):
+        """From a round-1 matchups row of initial_state_internal.csv."""
+        return cls(
+            int((row.get("match_id") or "").strip()),
+            int((row.get("team_A_id") or "").strip()),
+            int((row.get("team_B_id") or "").strip()),
+            row.get("team_A") or "",
+            row.get("team_B") or "",
+            float(row.get("team_A_price") or 0.0),
+            float(row.get("team_B_price") or 0.0),
+        )
+
+
+@dataclass(slots=True)
+class MatchResult:
+    """One simulated game: the win probabilities and the winning / losing team."""
+    probA: float
+    probB: float
+    winner: object
+    loser: object
+
+
+@dataclass(slots=True)
+class MatchRecord(_Row):
+    round: int
+    match_id: int
+    teamA_id: int
+    teamB_id: int
+    teamA: str
+    teamB: str
+    probA: float
+    probB: float
+    winner_id: int
+    loser_id: int
+    winner: str
+    loser: str
+
+    @classmethod
+    def from_row(cls, row):
+        """From a tournament_results.csv row (loser_id is derived if the column is missing)."""
+        team_a, team_b, winner_id = int(row["teamA_id"]), int(row["teamB_id"]), int(row["winner_id"])
+        loser_id = row.get("loser_id")
+        return cls(
+            int(row["round"]), int(row["match_id"]), team_a, team_b, row["teamA"], row["teamB"],
+            float(row["probA"]), float(row["probB"]), winner_id,
+            int(loser_id) if loser_id else (team_b if winner_id == team_a else team_a),
+            row["winner"], row["loser"],
+        )
+
+
+@dataclass(slots=True)
+class Trade:
+    player_id: str
+    team_id: str
+    action: str      # "buy" or "sell"
+    quantity: float
+    price: float
+    asset: str       # "1" or "2"
+
+    def to_row(self):
+        """Back to the upload format (player_id,team_id,action,quantity,asset)."""
+        qty = int(self.quantity) if float(self.quantity).is_integer() else self.quantity
+        return {
+            "player_id": self.player_id,
+            "team_id": self.team_id,
+            "action": self.action.upper(),
+            "quantity": qty,
+            "asset": self.asset,
+        }
+
+
+# -------------------
+# STRUCT OF ARRAYS
+# -------------------
+class TradeColumns:
+    """
+    Column-oriented trade storage: ids are interned to int codes, actions are
+    stored as +1 (buy) / -1 (sell) and each column is one typed array, so a
+    trade costs ~30 bytes instead of a dict or object per row.
+    """
+
+    __slots__ = ("players", "teams", "player_codes", "team_codes",
+                 "player", "team", "side", "asset", "quantity", "price")
+
+    def __init__(self):
+        self.players = []          # code -> player_id
+        self.teams = []            # code -> team_id
+        self.player_codes = {}     # player_id -> code
+        self.team_codes = {}       # team_id -> code
+        self.player = array("i")
+        self.team = array("i")
+        self.side = array("b")
+        self.asset = array("b")
+        self.quantity = array("d")
+        self.price = array("d")
+
+    def __len__(self):
+        return len(self.player)
+
+    @staticmethod
+    def _intern(value, codes, values):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def append(self, player_id, team_id, action, quantity, price, asset):
+        self.player.append(self._intern(player_id, self.player_codes, self.players))
+        self.team.append(self._intern(team_id, self.team_codes, self.teams))
+        self.side.append(1 if action == "buy" else -1)
+        self.asset.append(1 if str(asset) == "1" else 2)   # anything else is Asset 2, as in load_trades
+        self.quantity.append(quantity)
+        self.price.append(price)
+
+    @classmethod
+    def from_trades(cls, trades):
+        cols = cls()
+        for t in trades:
+            cols.append(t.player_id, t.team_id, t.action, t.quantity, t.price, t.asset)
+        return cols
+
+    def trade(self, i):
+        """Materialize row i as a Trade record."""
+        return Trade(self.players[self.player[i]], self.teams[self.team[i]],
+                     "buy" if self.side[i] > 0 else "sell",
+                     self.quantity[i], self.price[i], str(self.asset[i]))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.trade(i)
+
+
+# -------------------
+# MEMORY BENCHMARK
+# -------------------
+def _synthetic_fields(i):
+    return f"p{i % 5000:04d}", f"Team_{i % 32 + 1}", "buy" if i % 3 else "sell", float(i % 10 + 1), 12.5 + i % 50, "1" if i % 2 else "2"
+
+
+def _measure(build):
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current
+
+
+def benchmark(rows):
+    """Return {layout: bytes per trade} for dict rows, Trade records and TradeColumns."""
+    def dicts():
+        return [dict(zip(("player_id", "team_id", "action", "quantity", "price", "asset"), _synthetic_fields(i)))
+                for i in range(rows)]
+
+    def records():
+        return [Trade(*_synthetic_fields(i)) for i in range(rows)]
+
+    def columns():
+        cols = TradeColumns()
+        for i in range(rows):
+            cols.append(*_synthetic_fields(i))
+        return cols
+
+    return {name: _measure(build) / rows for name, build in
+            (("dict", dicts), ("Trade (slots)", records), ("TradeColumns", columns))}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of synthetic trades")
+    args = parser.parse_args()
+    print(f"Per-trade memory at {args.rows:,} rows:")
+    for name, per_row in benchmark(args.rows).items():
+        print(f"  {name:<15} {per_row:8.1f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+results_index.py
+
+One derived index over tournament_results.csv that the outcome and price tables
+are produced from and checked against, keyed by integer team id.
+
+tournament_outcomes.csv, tournament_results.csv and round_N_prices.csv are
+written separately and only ever joined on team-name strings ("Team_13").
+The index is built once from the results file (and cached next to it as
+tournament_results.index.npz, rebuilt whenever the results file changes):
+
+    names     team id -> team name ("" for unused ids)
+    matches   round, match_id, team_A, team_B, winner as int64 arrays
+    won       int8 (n_rounds + 1, max_id + 1): 1 won, 0 lost, -1 did not play
+
+From it:
+ - outcome_array(round) / outcomes(round): the round's results, as an id-indexed
+   array or in the load_outcomes dict format
+ - price_table(prices_file, round): (max_id + 1, 2) float64 Asset 1 / Asset 2
+   prices by team id (0 where unpriced, as settlement defaults);
+   table_from_columns builds the same table straight from generated price
+   arrays (price_generation.id_price_tables), with no CSV round trip
+ - check(outcomes_file, prices_files): every disagreement between the tables
+ - settle_columns(cols, ...): calculate_round over TradeColumns with one
+   name -> id mapping per distinct team, then array indexing per trade. This is
+   the settlement path of calculate_payout_price.py --results and of
+   sweep_runner.py.
+
+The cache file is a build artifact (*.index.npz is git-ignored).
+
+Usage:
+    python results_index.py --check                       # index + integrity check
+    python results_index.py --write-outcomes tournament_outcomes.csv
+"""
+
+import argparse
+import csv
+import glob
+import os
+import re
+
+import numpy as np
+from fixed_point import PositionError, check_positions
+from live_repricer import INPUT_RESULTS, load_results
+
+# -------------------
+# CONFIG
+# -------------------
+OUTCOMES_FILE = "tournament_outcomes.csv"
+ROUND_PRICES_GLOB = "round_*_prices.csv"
+NOT_PLAYED = -1
+
+
+class PriceError(ValueError):
+    pass
+
+
+def index_path(results_path):
+    stem, _ = os.path.splitext(results_path)
+    return stem + ".index.npz"
+
+
+def _source_key(path):
+    st = os.stat(path)
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+# -------------------
+# INDEX
+# -------------------
+class ResultsIndex:
+    """Integer-keyed view of one tournament_results.csv."""
+
+    def __init__(self, names, round_num, match_id, team_a, team_b, winner):
+        self.names = list(names)
+        self.code = {name: i for i, name in enumerate(self.names) if name}
+        self.round = round_num
+        self.match_id = match_id
+        self.team_a = team_a
+        self.team_b = team_b
+        self.winner = winner
+        self.n_rounds = int(round_num.max()) if len(round_num) else 0
+        self.won = np.full((self.n_rounds + 1, len(self.names)), NOT_PLAYED, dtype=np.int8)
+        self.won[round_num, team_a] = winner == team_a
+        self.won[round_num, team_b] = winner == team_b
+
+    @classmethod
+    def from_results(cls, path=INPUT_RESULTS):
+        return cls.from_matches(load_results(path))
+
+    @classmethod
+    def from_matches(cls, matches):
+        """From match dicts as load_results or simulate_tournament produce them."""
+        size = 1 + max([max(m["teamA_id"], m["teamB_id"]) for m in matches], default=0)
+        names = [""] * size
+        conflicts = []
+        for m in matches:
+            for team_id, name in ((m["teamA_id"], m["teamA"]), (m["teamB_id"], m["teamB"])):
+                if names[team_id] and names[team_id] != name:
+                    conflicts.append(f"team id {team_id} is both {names[team_id]} and {name}")
+                names[team_id] = name
+        if conflicts:
+            raise ValueError("; ".join(conflicts))
+        column = lambda key: np.array([m[key] for m in matches], dtype=np.int64)
+        return cls(names, column("round"), column("match_id"), column("teamA_id"), column("teamB_id"),
+                   column("winner_id"))
+
+    @classmethod
+    def load(cls, path=INPUT_RESULTS):
+        """Cached index if it was built from this exact results file, else a fresh one (and cache it)."""
+        cache = index_path(path)
+        key = _source_key(path)
+        if os.path.exists(cache):
+            with np.load(cache) as data:
+                if np.array_equal(data["source"], key):
+                    return cls(data["names"].tolist(), data["round"], data["match_id"], data["team_a"],
+                               data["team_b"], data["winner"])
+        index = cls.from_results(path)
+        index.save(cache, key)
+        return index
+
+    def save(self, cache, source_key):
+        with open(cache, "wb") as f:
+            np.savez(f, source=source_key, names=np.array(self.names, dtype=str), round=self.round,
+                     match_id=self.match_id, team_a=self.team_a, team_b=self.team_b, winner=self.winner)
+
+    # lookups
+    def ids(self, names):
+        """int64 team ids for team names (-1 for names the results never mention)."""
+        return np.array([self.code.get(name, -1) for name in names], dtype=np.int64)
+
+    def round_mask(self, round_num):
+        return self.round == round_num
+
+    # derived tables
+    def outcome_array(self, round_num):
+        """int8 by team id: 1 won, 0 lost, -1 did not play this round."""
+        if not 0 < round_num <= self.n_rounds:
+            return np.full(len(self.names), NOT_PLAYED, dtype=np.int8)
+        return self.won[round_num]
+
+    def outcomes(self, round_num):
+        """{team_name: won} for the round, as load_outcomes returns it."""
+        row = self.outcome_array(round_num)
+        return {self.names[i]: bool(row[i]) for i in np.flatnonzero(row != NOT_PLAYED)}
+
+    def write_outcomes(self, path=OUTCOMES_FILE):
+        """tournament_outcomes.csv (team_id,round,winner) for every round, in match order."""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["team_id", "round", "winner"])
+            for r, a, b, w in zip(self.round, self.team_a, self.team_b, self.winner):
+                writer.writerow([self.names[a], int(r), int(w == a)])
+                writer.writerow([self.names[b], int(r), int(w == b)])
+
+    def price_rows(self, prices_file):
+        """[(line, round, match_id, team_A, team_B, a1_A, a1_B, a2_A, a2_B)] from a round_N_prices.csv."""
+        rows = []
+        with open(prices_file, newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                rows.append((reader.line_num, int(row["round"]), int(row["match_id"]),
+                             row["team_A"].strip(), row["team_B"].strip(),
+                             float(row.get("team_A_price") or 0), float(row.get("team_B_price") or 0),
+                             float(row.get("team_A_tournament_price") or 0),
+                             float(row.get("team_B_tournament_price") or 0)))
+        return rows
+
+    def price_table(self, prices_file, round_num):
+        """(len(names), 2) float64 of Asset 1 / Asset 2 prices by team id, from round_N_prices.csv."""
+        table = np.zeros((len(self.names), 2))
+        for _, r, _, a, b, a1_a, a1_b, a2_a, a2_b in self.price_rows(prices_file):
+            if r != round_num:
+                continue
+            for name, a1, a2 in ((a, a1_a, a2_a), (b, a1_b, a2_b)):
+                team_id = self.code.get(name)
+                if team_id is None:
+                    raise PriceError(f"PRICE_ERROR:{prices_file}: {name} is not in the results index")
+                table[team_id] = (a1, a2)
+        return table
+
+    def table_from_columns(self, names_A, names_B, a1_A, a1_B, a2_A, a2_B):
+        """price_table from per-match columns (price_generation arrays) instead of a CSV."""
+        table = np.zeros((len(self.names), 2))
+        for names, a1, a2 in ((names_A, a1_A, a2_A), (names_B, a1_B, a2_B)):
+            ids = self.ids(names)
+            if (ids < 0).any():
+                raise PriceError(f"PRICE_ERROR:{names[int(np.flatnonzero(ids < 0)[0])]} is not in the results index")
+            table[ids, 0], table[ids, 1] = a1, a2
+        return table
+
+    def round_prices(self, table):
+        """{team_name: {"asset1", "asset2"}} for the priced teams of a price_table."""
+        return {self.names[i]: {"asset1": float(table[i, 0]), "asset2": float(table[i, 1])}
+                for i in np.flatnonzero(table.any(axis=1))}
+
+
+# -------------------
+# INTEGRITY
+# -------------------
+def _round_of(path):
+    match = re.search(r"round_(\d+)_prices", os.path.basename(path))
+    return int(match.group(1)) if match else None
+
+
+def check(index, outcomes_file=OUTCOMES_FILE, prices_files=()):
+    """Every disagreement between the index, the outcomes file and the round price files."""
+    issues = []
+    # results themselves: one winner per match, nobody plays after losing or twice a round
+    bad_winner = (index.winner != index.team_a) & (index.winner != index.team_b)
+    issues += [f"results: match {m} winner is neither team" for m in index.match_id[bad_winner]]
+    played = np.zeros((index.n_rounds + 1, len(index.names)), dtype=np.int64)
+    np.add.at(played, (index.round, index.team_a), 1)
+    np.add.at(played, (index.round, index.team_b), 1)
+    for r, t in zip(*np.nonzero(played > 1)):
+        issues.append(f"results: {index.names[t]} plays {played[r, t]} matches in round {r}")
+    lost = np.maximum.accumulate(index.won == 0, axis=0)
+    for r, t in zip(*np.nonzero((index.won[1:] != NOT_PLAYED) & lost[:-1])):
+        issues.append(f"results: {index.names[t]} plays round {r + 1} after being eliminated")
+
+    # outcomes file against the index
+    if outcomes_file and os.path.exists(outcomes_file):
+        seen = np.zeros_like(index.won, dtype=bool)
+        with open(outcomes_file, newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                name, r = row["team_id"].strip(), int(row["round"])
+                team_id = index.code.get(name)
+                if team_id is None or not 0 < r <= index.n_rounds or index.won[r, team_id] == NOT_PLAYED:
+                    issues.append(f"{outcomes_file}:{reader.line_num}: {name} did not play round {r}")
+                    continue
+                seen[r, team_id] = True
+                if (row["winner"] == "1") != bool(index.won[r, team_id]):
+                    issues.append(f"{outcomes_file}:{reader.line_num}: {name} round {r} winner={row['winner']} "
+                                  f"but results say {int(index.won[r, team_id])}")
+        for r, t in zip(*np.nonzero((index.won != NOT_PLAYED) & ~seen)):
+            issues.append(f"{outcomes_file}: no outcome for {index.names[t]} in round {r}")
+
+    # round price files: same matches, same pairings, usable prices
+    by_match = {int(m): k for k, m in enumerate(index.match_id)}
+    for path in prices_files:
+        r = _round_of(path)
+        covered = set()
+        for line, row_round, match_id, a, b, a1_a, a1_b, a2_a, a2_b in index.price_rows(path):
+            where = f"{path}:{line}"
+            k = by_match.get(match_id)
+            if k is None:
+                issues.append(f"{where}: match {match_id} is not in the results")
+                continue
+            covered.add(k)
+            if row_round != index.round[k] or (r is not None and r != row_round):
+                issues.append(f"{where}: match {match_id} is round {index.round[k]}, file says {row_round}")
+            expected = (index.names[index.team_a[k]], index.names[index.team_b[k]])
+            if (a, b) != expected:
+                issues.append(f"{where}: match {match_id} is {expected[0]} vs {expected[1]}, file says {a} vs {b}")
+            if not (0 < a1_a < 100 and 0 < a1_b < 100) or min(a2_a, a2_b) < 0:
+                issues.append(f"{where}: match {match_id} has out-of-range prices")
+        if r is not None:
+            for k in np.flatnonzero(index.round_mask(r)):
+                if k not in covered:
+                    issues.append(f"{path}: no prices for match {index.match_id[k]}")
+    return issues
+
+
+# -------------------
+# SETTLEMENT
+# -------------------
+class _IdTrades:
+    """TradeColumns viewed as numpy arrays, in the shape fixed_point.check_positions reads."""
+
+    def __init__(self, cols):
+        self.players, self.teams = cols.players, cols.teams
+        self.player = np.frombuffer(cols.player, dtype=np.int32).astype(np.int64)
+        self.team = np.frombuffer(cols.team, dtype=np.int32).astype(np.int64)
+        self.side = np.frombuffer(cols.side, dtype=np.int8).astype(np.int64)
+        self.asset = np.frombuffer(cols.asset, dtype=np.int8).astype(np.int64)
+        self.quantity = np.frombuffer(cols.quantity, dtype=np.float64)
+        self.price = np.frombuffer(cols.price, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.player)
+
+
+def settle_columns(cols, index, outcome_array, price_table):
+    """
+    calculate_round for TradeColumns: {player_id: {asset1_realized, asset2_pnl, total}},
+    or None on a position error (printed in calculate_round's format). Team names
+    are mapped to ids once per distinct team; every per-trade lookup is an array index.
+    Sums match calculate_round up to floating-point summation order.
+    """
+    trades = _IdTrades(cols)
+    try:
+        check_positions(trades)
+    except PositionError as e:
+        print(e)
+        return None
+    ids = index.ids(trades.teams)
+    known = ids >= 0
+    team_won = np.where(known, outcome_array[np.where(known, ids, 0)] == 1, False)[trades.team]
+    asset2_price = np.where(known, price_table[np.where(known, ids, 0), 1], 0.0)[trades.team]
+    settle = np.where(trades.asset == 1, 100.0, asset2_price) * team_won
+    pnl = trades.side * trades.quantity * (settle - trades.price)
+    realized_mask = (trades.asset == 1) | ~team_won
+    n = len(trades.players)
+    realized = np.bincount(trades.player[realized_mask], pnl[realized_mask], minlength=n)
+    asset2 = np.bincount(trades.player[~realized_mask], pnl[~realized_mask], minlength=n)
+    return {pid: {"asset1_realized": float(r), "asset2_pnl": float(a), "total": float(r + a)}
+            for pid, r, a in zip(trades.players, realized, asset2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=str, default=INPUT_RESULTS, help="Path to tournament_results.csv")
+    parser.add_argument("--outcomes", type=str, default=OUTCOMES_FILE, help="Outcomes CSV to check")
+    parser.add_argument("--prices", type=str, nargs="*", help=f"Round price files to check (default {ROUND_PRICES_GLOB})")
+    parser.add_argument("--check", action="store_true", help="Run the integrity check")
+    parser.add_argument("--write-outcomes", type=str, help="Write the outcomes CSV derived from the index here")
+    args = parser.parse_args()
+
+    index = ResultsIndex.load(args.results)
+    print(f"Index: {len(index.code)} teams, {len(index.match_id)} matches, {index.n_rounds} rounds "
+          f"({index_path(args.results)})")
+    if args.write_outcomes:
+        index.write_outcomes(args.write_outcomes)
+        print(f"Wrote {args.write_outcomes}")
+    if args.check:
+        prices = args.prices if args.prices is not None else sorted(glob.glob(ROUND_PRICES_GLOB))
+        issues = check(index, args.outcomes, prices)
+        for issue in issues:
+            print(issue)
+        print(f"Integrity check: {len(issues)} issues across {args.outcomes} and {len(prices)} price files")
+        raise SystemExit(1 if issues else 0)
+
+
+if __name__ == "__main__":
+    main()
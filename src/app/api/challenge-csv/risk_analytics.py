@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+risk_analytics.py
+
+Distribution of every player's P&L under the simulated remainder of the bracket.
+
+The bracket is conditioned on the rounds already played, then the rest of the
+tournament is simulated n_sims times in one vectorized pass (one numpy step per
+remaining match). The simulated outcomes become a shared payoff matrix of shape
+(n_sims, 2 * n_teams): Asset 1 pays 100 if the team wins its current-round
+match, Asset 2 pays 100 if it wins the tournament. Players' net holdings form a
+(n_players, 2 * n_teams) matrix, so all players' P&L samples come from a single
+matrix product and the simulation cost is shared by everyone.
+
+Per player this reports expected P&L, standard deviation, Value-at-Risk and
+probability of profit.
+
+Outputs:
+ - risk_roundN.csv
+
+Requires:
+ - initial_state_internal.csv, tournament_results.csv, round_N_prices.csv
+ - numpy
+"""
+
+import argparse
+import csv
+import numpy as np
+from bracket import EMPTY, round_matches
+from calculate_payout_price import load_round_prices, load_trades, load_portfolio_state, calculate_round
+from live_repricer import load_results, bracket_from_results, record_result
+from simulate_tournament import load_teams
+
+# -------------------
+# CONFIG
+# -------------------
+INPUT_INTERNAL = "initial_state_internal.csv"
+INPUT_RESULTS = "tournament_results.csv"
+N_SIMS = 20000
+VAR_ALPHA = 0.05
+RNG_SEED = 7
+
+
+# -------------------
+# SIMULATION
+# -------------------
+def conditioned_bracket(teams, matches, round_num):
+    """Priced bracket with every result before round_num recorded."""
+    bracket = bracket_from_results(teams, matches)
+    for m in matches:
+        if m["round"] < round_num:
+            record_result(bracket, m["teamA_id"], m["teamB_id"], m["winner_id"])
+    return bracket
+
+
+def simulate_remaining(bracket, n_sims=N_SIMS, rng=None):
+    """
+    Simulate all undecided matches. Returns an (n_nodes, n_sims) int array with the
+    winner of every bracket node in every simulation (EMPTY for empty subtrees).
+    """
+    rng = rng or np.random.default_rng(RNG_SEED)
+    win = np.asarray(bracket["win"])
+    occupant = bracket["occupant"]
+    size = bracket["size"]
+    winners = np.empty((2 * size - 1, n_sims), dtype=np.int64)
+    for node in range(2 * size - 2, -1, -1):
+        if occupant[node] >= 0 or occupant[node] == EMPTY:
+            winners[node] = occupant[node]
+            continue
+        left, right = winners[2 * node + 1], winners[2 * node + 2]
+        p_left = win[left, right]
+        winners[node] = np.where(rng.random(n_sims) < p_left, left, right)
+    return winners
+
+
+def payoff_matrix(bracket, winners, round_num):
+    """(n_sims, 2 * n_teams) payoffs: columns [0, n) are Asset 1, [n, 2n) Asset 2."""
+    n_teams = len(bracket["teams"])
+    n_sims = winners.shape[1]
+    sims = np.arange(n_sims)
+    payoff = np.zeros((n_sims, 2 * n_teams))
+    for node, _, _ in round_matches(bracket, round_num):
+        payoff[sims, winners[node]] = 100.0
+    payoff[sims, n_teams + winners[0]] = 100.0
+    return payoff
+
+
+# -------------------
+# PORTFOLIOS
+# -------------------
+def holdings_matrix(teams, holdings, trades):
+    """
+    Return (player_ids, Q, cost): Q[p, k] is player p's net quantity of contract k
+    (same column layout as payoff_matrix) and cost[p] the net cash paid for it.
+    """
+    n_teams = len(teams)
+    col = {t["team_name"]: i for i, t in enumerate(teams)}
+    player_ids = sorted(holdings)
+    row = {pid: i for i, pid in enumerate(player_ids)}
+    Q = np.zeros((len(player_ids), 2 * n_teams))
+    for pid, positions in holdings.items():
+        for (team, asset), qty in positions.items():
+            if team in col and qty:
+                Q[row[pid], col[team] + (n_teams if asset == "2" else 0)] += qty
+    cost = np.zeros(len(player_ids))
+    for trade in trades:
+        signed = trade.quantity * trade.price
+        cost[row[trade.player_id]] += signed if trade.action == "buy" else -signed
+    return player_ids, Q, cost
+
+
+def pnl_distribution(Q, cost, payoff):
+    """(n_players, n_sims) P&L samples in one batched product."""
+    return Q @ payoff.T - cost[:, None]
+
+
+def risk_summary(pnl, alpha=VAR_ALPHA):
+    """Per-player expected P&L, std, VaR (loss at the alpha quantile) and P(profit)."""
+    return {
+        "expected_pnl": pnl.mean(axis=1),
+        "pnl_std": pnl.std(axis=1),
+        "var": -np.quantile(pnl, alpha, axis=1),
+        "prob_profit": (pnl > 0).mean(axis=1),
+    }
+
+
+def player_risk(teams, matches, trades, round_prices, round_num, n_sims=N_SIMS, alpha=VAR_ALPHA, seed=RNG_SEED):
+    """Full pipeline for one round. Returns (player_ids, summary) or None on a position error."""
+    holdings = {}
+    if calculate_round(None, {}, trades, round_prices, holdings=holdings) is None:
+        return None
+    bracket = conditioned_bracket(teams, matches, round_num)
+    winners = simulate_remaining(bracket, n_sims, np.random.default_rng(seed))
+    payoff = payoff_matrix(bracket, winners, round_num)
+    player_ids, Q, cost = holdings_matrix(teams, holdings, trades)
+    return player_ids, risk_summary(pnl_distribution(Q, cost, payoff), alpha)
+
+
+def write_risk_csv(player_ids, summary, portfolio, path, alpha=VAR_ALPHA):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        var_col = f"var_{int(round((1 - alpha) * 100))}"
+        writer.writerow(["player_id", "cumulative_pnl", "expected_pnl", "pnl_std", var_col,
+                         "prob_profit", "expected_final_pnl"])
+        for i, pid in enumerate(player_ids):
+            base = float(portfolio.get(pid, {}).get("cumulative_pnl", 0))
+            writer.writerow([
+                pid, round(base, 2),
+                round(float(summary["expected_pnl"][i]), 2),
+                round(float(summary["pnl_std"][i]), 2),
+                round(float(summary["var"][i]), 2),
+                round(float(summary["prob_profit"][i]), 4),
+                round(base + float(summary["expected_pnl"][i]), 2),
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--round", type=int, required=True, help="Current round number")
+    parser.add_argument("--trades", type=str, required=True, help="Path to trades CSV (current holdings)")
+    parser.add_argument("--round-prices", type=str, required=True, help="Path to round_N_prices.csv")
+    parser.add_argument("--portfolio", type=str, default="portfolio_state.json", help="Path to portfolio state JSON file")
+    parser.add_argument("--sims", type=int, default=N_SIMS, help="Number of simulated tournaments")
+    parser.add_argument("--alpha", type=float, default=VAR_ALPHA, help="VaR tail probability")
+    parser.add_argument("--seed", type=int, default=RNG_SEED, help="RNG seed for the simulations")
+    parser.add_argument("--output", type=str, help="Output CSV (default risk_roundN.csv)")
+    args = parser.parse_args()
+
+    teams = load_teams(INPUT_INTERNAL)
+    matches = load_results(INPUT_RESULTS)
+    round_prices = load_round_prices(args.round_prices, args.round)
+    trades = load_trades(args.trades, round_prices)
+    result = player_risk(teams, matches, trades, round_prices, args.round, args.sims, args.alpha, args.seed)
+    if result is None:
+        return
+    player_ids, summary = result
+    output = args.output or f"risk_round{args.round}.csv"
+    write_risk_csv(player_ids, summary, load_portfolio_state(args.portfolio), output, args.alpha)
+    print(f"Wrote risk analytics for {len(player_ids)} players ({args.sims} simulations) to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+sensitivity.py
+
+Strength Greeks: how every team's tournament price moves when one team's
+true_strength (or one of its distribution parameters) changes, for all teams in
+one pass instead of rerunning generate_initial_state.py per edit.
+
+Two pieces, chained:
+
+ - win matrix gradient by common random numbers. Each team draws its
+   performances from its own seeded generator, so redrawing a team at
+   theta +/- step reuses the same random stream (for location samplers the
+   bumped draws are exactly the base draws shifted by step). P(i beats j) is
+   the fraction of all trials_mc ** 2 draw pairs i wins, and
+       G[i, j] = dP(i beats j) / dtheta_i
+   is the central difference of that estimate. Since P(j beats i) =
+   1 - P(i beats j), dP(i beats j) / dtheta_j = -G[j, i], so G holds every
+   nonzero entry of dW. The base and both bumped draw matrices go through one
+   merged sort, so every pair costs O(trials_mc) rather than a sort per pair.
+
+ - bracket DP differentiated analytically. The live_repricer recursion
+       P(a out of node) = P(a out of left) * sum_b P(b out of right) * W[a, b]
+   is run in forward mode, carrying next to every probability its gradient
+   with respect to all n_teams parameters, so the root gives the full
+   (n_teams, n_teams) Jacobian of the title probabilities.
+
+The whole Jacobian costs about as much as pricing the bracket two or three
+times (three draw matrices instead of one, and gradient rows in the DP),
+against 2 * n_teams repricings for bumping teams one at a time; --check N
+runs that bump-and-reprice reference for the first N teams.
+
+Results before --round are recorded as in risk_analytics; their probabilities
+and outcomes are fixed, so they carry no sensitivity.
+
+Outputs:
+ - sensitivity.csv         team_id, team_name, title_price, own_delta (price points per
+                           unit of the parameter), cross_delta_min/max (largest effect of
+                           another team's parameter), most_affected_by
+ - sensitivity_matrix.csv  (with --matrix) full Jacobian, d price[row team] / d param[column team]
+
+Requires:
+ - initial_state_internal.csv; tournament_results.csv for --round > 1
+ - numpy
+
+Usage:
+    python sensitivity.py
+    python sensitivity.py --round 3 --trials 8000 --matrix
+    python sensitivity.py --param sd --step 0.05      # relative bump of a distribution parameter
+"""
+
+import argparse
+import csv
+import os
+import time
+import numpy as np
+from bracket import EMPTY, leaves_from_pairs, seed_ranking
+from live_repricer import apply_result_probs, build_bracket, load_results, record_result, title_probabilities
+from simulate_tournament import INPUT_INTERNAL, initial_leaves, load_initial_matchups, load_teams
+from vector_samplers import sample
+
+# -------------------
+# CONFIG
+# -------------------
+INPUT_RESULTS = "tournament_results.csv"
+OUTPUT_SENSITIVITY = "sensitivity.csv"
+OUTPUT_MATRIX = "sensitivity_matrix.csv"
+TRIALS_MC = 4000
+STRENGTH_STEP = 0.01      # absolute bump of true_strength
+PARAM_STEP = 0.05         # relative bump of a distribution parameter
+RNG_SEED = 2025
+
+
+def team_spec(team):
+    return {"name": team.get("dist_name") or "normal", "params": dict(team.get("dist_params") or {})}
+
+
+def bumped(team, param=None, step=0.0):
+    """(strength, spec) with true_strength moved by step, or dist param scaled by (1 + step)."""
+    strength, spec = team["true_strength"], team_spec(team)
+    if param is None:
+        return strength + step, spec
+    if param in spec["params"]:
+        spec["params"][param] = spec["params"][param] * (1.0 + step)
+    return strength, spec
+
+
+def has_param(team, param):
+    return param is None or param in (team.get("dist_params") or {})
+
+
+# -------------------
+# WIN MATRIX (CRN)
+# -------------------
+def crn_draws(teams, trials_mc, seed, param=None, step=0.0, only=None):
+    """
+    (n_teams, trials_mc) draws, team i from its own generator spawned from seed;
+    the bump is applied to every team, or to team `only` alone.
+    """
+    children = np.random.SeedSequence(seed).spawn(len(teams))
+    rows = []
+    for i, (team, child) in enumerate(zip(teams, children)):
+        strength, spec = bumped(team, param, step if only is None or only == i else 0.0)
+        rows.append(sample(strength, spec, trials_mc, np.random.default_rng(child)))
+    return np.stack(rows)
+
+
+def beat_fractions(draws, *others):
+    """
+    [fractions] with fractions[i, j] = share of all (x, y) pairs, x from row i of an
+    array, y from row j of draws, with x > y; first for draws itself, then for each
+    of others. One merged sort: a running count of each team's draws below every
+    position, summed per row with bincount.
+    """
+    n, trials = draws.shape
+    stacked = np.concatenate((draws,) + others)
+    values, labels = stacked.ravel(), np.repeat(np.arange(len(stacked)), trials)
+    order = np.argsort(values, kind="stable")
+    labels = labels[order]
+    counts = np.empty((len(stacked), n))
+    for j in range(n):
+        mine = labels == j
+        below = np.cumsum(mine) - mine
+        counts[:, j] = np.bincount(labels, weights=below, minlength=len(stacked))
+    counts /= trials * trials
+    return [counts[k * n:(k + 1) * n] for k in range(len(stacked) // n)]
+
+
+def pairwise_win_matrix(draws):
+    """win[i, j] = fraction of all draw pairs in which team i beats team j."""
+    win = beat_fractions(draws)[0]
+    upper = np.triu(win, 1)
+    return upper + (1.0 - upper.T) * np.tri(len(win), k=-1) + 0.5 * np.eye(len(win))
+
+
+def win_gradient(draws, plus, minus, step):
+    """G[i, j] = d win[i, j] / d theta_i by central differences over common random numbers."""
+    _, above, below = beat_fractions(draws, plus, minus)
+    grad = (above - below) / (2.0 * step)
+    np.fill_diagonal(grad, 0.0)
+    return grad
+
+
+# -------------------
+# BRACKET JACOBIAN
+# -------------------
+def _point(team, n):
+    return np.array([team]), np.ones(1), np.zeros((1, n))
+
+
+def _combine_jac(left, right, win, grad):
+    """_combine with gradients: (teams, probabilities, d probabilities / d theta)."""
+    if not len(left[0]) or not len(right[0]):
+        return left if len(left[0]) else right
+    out = []
+    for (a, pa, ja), (b, pb, jb) in ((left, right), (right, left)):
+        w = win[np.ix_(a, b)]
+        s = w @ pb
+        ds = w @ jb
+        ds[np.arange(len(a)), a] += grad[np.ix_(a, b)] @ pb     # W[a, b] moves with theta_a
+        ds[:, b] -= grad[np.ix_(b, a)].T * pb                   # ... and with theta_b
+        out.append((a, pa * s, ja * s[:, None] + pa[:, None] * ds))
+    return tuple(np.concatenate(parts) for parts in zip(*out))
+
+
+def title_jacobian(bracket, grad):
+    """
+    (title probabilities, Jacobian) over team indices: jac[k, i] = d P(team k wins) / d theta_i.
+    Decided nodes (byes, recorded results) are fixed and carry no gradient.
+    """
+    n = len(bracket["teams"])
+    win = np.asarray(bracket["win"], dtype=np.float64)
+    occupant, size = bracket["occupant"], bracket["size"]
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros((0, n)))
+    dist = [None] * (2 * size - 1)
+    for node in range(2 * size - 2, -1, -1):
+        if occupant[node] == EMPTY:
+            dist[node] = empty
+        elif occupant[node] >= 0:
+            dist[node] = _point(occupant[node], n)
+        else:
+            dist[node] = _combine_jac(dist[2 * node + 1], dist[2 * node + 2], win, grad)
+    teams, p, jac = dist[0]
+    prob, full = np.zeros(n), np.zeros((n, n))
+    prob[teams], full[teams] = p, jac
+    return prob, full
+
+
+# -------------------
+# ENGINE
+# -------------------
+def round1_leaves(teams, matches=None, internal=INPUT_INTERNAL):
+    """Round-1 layout from the results file when there is one, else from the internal matchups."""
+    if matches:
+        index = {t["team_id"]: i for i, t in enumerate(teams)}
+        pairs = [(index[m["teamA_id"]], index[m["teamB_id"]]) for m in matches if m["round"] == 1]
+        paired = {i for pair in pairs for i in pair}
+        return leaves_from_pairs(pairs, [i for i in seed_ranking(teams) if i not in paired])
+    return initial_leaves(teams, load_initial_matchups(internal))
+
+
+def played(matches, round_num):
+    """Matches before round_num: later rows are pairings not known yet (see bracket_from_results)."""
+    return [m for m in matches if m["round"] < round_num]
+
+
+def priced_bracket(teams, leaves, win, matches=(), round_num=1):
+    """Bracket over a numpy win matrix with every result before round_num recorded."""
+    index = {t["team_id"]: i for i, t in enumerate(teams)}
+    matches = played(matches, round_num)
+    bracket = build_bracket(teams, leaves, apply_result_probs(win, index, matches))
+    for m in matches:
+        record_result(bracket, m["teamA_id"], m["teamB_id"], m["winner_id"])
+    return bracket
+
+
+def fixed_pairs(teams, matches, round_num=1):
+    """Boolean mask of win matrix entries overwritten by the recorded probabilities of played matches."""
+    index = {t["team_id"]: i for i, t in enumerate(teams)}
+    mask = np.zeros((len(teams), len(teams)), dtype=bool)
+    for m in played(matches, round_num):
+        a, b = index[m["teamA_id"]], index[m["teamB_id"]]
+        mask[a, b] = mask[b, a] = True
+    return mask
+
+
+def sensitivities(teams, leaves, matches=(), round_num=1, param=None, step=None,
+                  trials_mc=TRIALS_MC, seed=RNG_SEED):
+    """
+    {"prob", "jacobian", "bracket"} for the bracket conditioned on results before
+    round_num. jacobian[k, i] = d P(team k wins) / d theta_i, theta_i being team i's
+    true_strength (param None) or its dist param `param` (per unit of the parameter).
+    """
+    step = step if step is not None else (STRENGTH_STEP if param is None else PARAM_STEP)
+    draws = crn_draws(teams, trials_mc, seed)
+    plus = crn_draws(teams, trials_mc, seed, param, step)
+    minus = crn_draws(teams, trials_mc, seed, param, -step)
+    grad = win_gradient(draws, plus, minus, step)
+    if param is not None:
+        # relative bump -> per unit of the parameter; teams without it have no sensitivity
+        scale = np.array([t["dist_params"][param] if has_param(t, param) else 0.0 for t in teams])
+        grad *= np.divide(1.0, scale, out=np.zeros_like(scale), where=scale != 0)[:, None]
+    grad[fixed_pairs(teams, matches, round_num)] = 0.0
+    bracket = priced_bracket(teams, leaves, pairwise_win_matrix(draws), matches, round_num)
+    prob, jac = title_jacobian(bracket, grad)
+    return {"prob": prob, "jacobian": jac, "bracket": bracket}
+
+
+def bump_and_reprice(teams, leaves, i, matches=(), round_num=1, param=None, step=None,
+                     trials_mc=TRIALS_MC, seed=RNG_SEED):
+    """Reference column: d P(win) / d theta_i by rebuilding the bracket at theta_i +/- step."""
+    step = step if step is not None else (STRENGTH_STEP if param is None else PARAM_STEP)
+    probs = []
+    for sign in (1.0, -1.0):
+        draws = crn_draws(teams, trials_mc, seed, param, sign * step, only=i)
+        bracket = priced_bracket(teams, leaves, pairwise_win_matrix(draws), matches, round_num)
+        index = bracket["index"]
+        p = np.zeros(len(teams))
+        for tid, prob in title_probabilities(bracket).items():
+            p[index[tid]] = prob
+        probs.append(p)
+    unit = step if param is None else step * teams[i]["dist_params"].get(param, 0.0)
+    return (probs[0] - probs[1]) / (2.0 * unit) if unit else np.zeros(len(teams))
+
+
+# -------------------
+# OUTPUT
+# -------------------
+def write_sensitivity_csv(teams, result, path=OUTPUT_SENSITIVITY):
+    """Per team: title price, own delta and the largest cross deltas, in price points."""
+    prices, deltas = 100.0 * result["prob"], 100.0 * result["jacobian"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["team_id", "team_name", "title_price", "own_delta",
+                         "cross_delta_min", "cross_delta_max", "most_affected_by"])
+        for k, t in enumerate(teams):
+            cross = np.delete(deltas[k], k)
+            others = [o for i, o in enumerate(teams) if i != k]
+            strongest = others[int(np.abs(cross).argmax())]["team_id"] if cross.any() else ""
+            writer.writerow([t["team_id"], t["team_name"], round(float(prices[k]), 2), round(float(deltas[k, k]), 4),
+                             round(float(cross.min()), 4), round(float(cross.max()), 4), strongest])
+
+
+def write_matrix_csv(teams, result, path=OUTPUT_MATRIX):
+    deltas = 100.0 * result["jacobian"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["team_id"] + [t["team_id"] for t in teams])
+        for k, t in enumerate(teams):
+            writer.writerow([t["team_id"]] + [round(float(d), 4) for d in deltas[k]])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--internal", type=str, default=INPUT_INTERNAL, help="Internal teams CSV")
+    parser.add_argument("--results", type=str, default=INPUT_RESULTS, help="Tournament results CSV")
+    parser.add_argument("--round", type=int, default=1, help="Price as of the start of this round")
+    parser.add_argument("--param", type=str, help="Distribution parameter to differentiate (default true_strength)")
+    parser.add_argument("--step", type=float, help="Bump size (absolute for strength, relative for --param)")
+    parser.add_argument("--trials", type=int, default=TRIALS_MC, help="Draws per team")
+    parser.add_argument("--seed", type=int, default=RNG_SEED, help="Seed of the common random numbers")
+    parser.add_argument("--matrix", action="store_true", help=f"Also write the full Jacobian to {OUTPUT_MATRIX}")
+    parser.add_argument("--check", type=int, default=0, help="Compare this many teams against bump-and-reprice")
+    parser.add_argument("--output", type=str, default=OUTPUT_SENSITIVITY, help="Output CSV")
+    args = parser.parse_args()
+
+    teams = load_teams(args.internal)
+    matches = load_results(args.results) if os.path.exists(args.results) else []
+    if args.round > 1 and not matches:
+        parser.error(f"--round {args.round} needs {args.results}")
+    leaves = round1_leaves(teams, matches, args.internal)
+
+    start = time.perf_counter()
+    result = sensitivities(teams, leaves, matches, args.round, args.param, args.step, args.trials, args.seed)
+    elapsed = time.perf_counter() - start
+    write_sensitivity_csv(teams, result, args.output)
+    if args.matrix:
+        write_matrix_csv(teams, result)
+    print(f"Sensitivities of {len(teams)} title prices to {args.param or 'true_strength'} "
+          f"in {elapsed:.2f}s; wrote {args.output}")
+
+    for i in range(min(args.check, len(teams))):
+        start = time.perf_counter()
+        ref = bump_and_reprice(teams, leaves, i, matches, args.round, args.param, args.step, args.trials, args.seed)
+        worst = float(np.abs(ref - result["jacobian"][:, i]).max())
+        print(f"check {teams[i]['team_name']}: max |bump - jacobian| = {100 * worst:.4f} price points per unit "
+              f"({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
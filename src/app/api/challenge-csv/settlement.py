@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+settlement.py
+
+Concurrent settlement of many trade uploads with per-player locking.
+
+Portfolio state is partitioned by player_id: each player's record lives in its
+own JSON file inside a store directory (portfolio_state.d/ by default). An
+upload locks only the players it touches (file locks, taken in sorted order so
+two uploads can never deadlock), settles with the same logic as
+calculate_payout_price.py, and commits each affected record atomically via a
+temp file + os.replace. Uploads from different players therefore settle in
+parallel across a process pool, while two uploads for the same player are
+serialized.
+
+An upload is all-or-nothing, as in calculate_payout_price.py: a spending-limit
+or position error leaves every record it touched unchanged. That also holds
+across a crash: an upload's new records are staged as temp files and listed in
+a journal (<name>.journal in the store) before any of them replaces a live
+record. A journal left behind by a crash is replayed by recover_journals(),
+which settle_uploads() runs at startup, so an upload is either fully applied
+or not applied at all.
+
+Usage:
+    python settlement.py --round 1 --round-prices round_1_prices.csv \
+        --trades uploads/*.csv --export portfolio_state.json
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+
+from calculate_payout_price import (
+    load_outcomes, load_round_prices, load_trades, load_portfolio_state, save_portfolio_state,
+    calculate_round, init_player_portfolios, check_spending_limits, apply_round_to_portfolio
+)
+
+PORTFOLIO_DIR = "portfolio_state.d"
+JOURNAL_EXT = ".journal"
+
+
+# -------------------
+# PER-PLAYER STORE
+# -------------------
+def _player_file(store_dir, player_id, ext):
+    return os.path.join(store_dir, quote(player_id, safe="") + ext)
+
+
+def load_player(store_dir, player_id):
+    """Return the player's portfolio record, or None if they have not traded yet."""
+    try:
+        with open(_player_file(store_dir, player_id, ".json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def commit_player(store_dir, player_id, state):
+    """Atomically replace one player's record (readers never see a partial file)."""
+    fd, tmp = tempfile.mkstemp(dir=store_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, _player_file(store_dir, player_id, ".json"))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _stage(store_dir, data):
+    """Write data to a durable temp file in the store and return its path."""
+    fd, tmp = tempfile.mkstemp(dir=store_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return tmp
+
+
+def _replay(store_dir, staged):
+    """Move each staged record over the live one; entries already moved are skipped."""
+    for player_id, name in staged.items():
+        tmp = os.path.join(store_dir, name)
+        if os.path.exists(tmp):
+            os.replace(tmp, _player_file(store_dir, player_id, ".json"))
+
+
+def commit_players(store_dir, states):
+    """
+    Commit one upload's records together. Every record is staged first, then a
+    journal naming them is written; only after that are the live records
+    replaced. A crash before the journal exists leaves nothing applied, a crash
+    after it is finished by recover_journals().
+    """
+    staged = {}
+    try:
+        for player_id, state in states.items():
+            staged[player_id] = os.path.basename(_stage(store_dir, state))
+        tmp = _stage(store_dir, staged)
+        journal = os.path.splitext(tmp)[0] + JOURNAL_EXT
+        os.replace(tmp, journal)
+    except BaseException:
+        for name in staged.values():
+            path = os.path.join(store_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    _replay(store_dir, staged)
+    os.remove(journal)
+
+
+def recover_journals(store_dir=PORTFOLIO_DIR):
+    """Finish every upload a crash left half-committed. Returns how many were replayed."""
+    if not os.path.isdir(store_dir):
+        return 0
+    replayed = 0
+    for name in sorted(os.listdir(store_dir)):
+        if not name.endswith(JOURNAL_EXT):
+            continue
+        journal = os.path.join(store_dir, name)
+        try:
+            with open(journal) as f:
+                staged = json.load(f)
+        except FileNotFoundError:
+            continue                      # its upload finished meanwhile
+        with player_locks(store_dir, staged):
+            if not os.path.exists(journal):
+                continue
+            _replay(store_dir, staged)
+            os.remove(journal)
+            replayed += 1
+    return replayed
+
+
+@contextmanager
+def player_locks(store_dir, player_ids):
+    """Hold exclusive locks on the given players; sorted order prevents deadlocks."""
+    os.makedirs(store_dir, exist_ok=True)
+    handles = []
+    try:
+        for player_id in sorted(set(player_ids)):
+            handle = open(_player_file(store_dir, player_id, ".lock"), "a")
+            handles.append(handle)
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+    finally:
+        for handle in reversed(handles):
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+
+def export_portfolio(store_dir=PORTFOLIO_DIR):
+    """Combine every player's record into the single dict calculate_payout_price uses."""
+    portfolio = {}
+    if not os.path.isdir(store_dir):
+        return portfolio
+    for name in sorted(os.listdir(store_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(store_dir, name)) as f:
+                # file names are quoted ids; map them back
+                portfolio[unquote(os.path.splitext(name)[0])] = json.load(f)
+    return portfolio
+
+
+def import_portfolio(portfolio_file, store_dir=PORTFOLIO_DIR):
+    """Split a legacy portfolio_state.json into per-player records."""
+    portfolio = load_portfolio_state(portfolio_file)
+    os.makedirs(store_dir, exist_ok=True)
+    for player_id, state in portfolio.items():
+        with player_locks(store_dir, [player_id]):
+            commit_player(store_dir, player_id, state)
+    return len(portfolio)
+
+
+# -------------------
+# SETTLEMENT
+# -------------------
+def settle_trades(trades, outcomes, round_prices, store_dir=PORTFOLIO_DIR):
+    """
+    Settle one upload's trades under its players' locks. Returns a result dict
+    with status "OK", "SPENDING_LIMIT_ERROR" or "POSITION_ERROR" and the payouts.
+    """
+    player_ids = {trade.player_id for trade in trades}
+    with player_locks(store_dir, player_ids):
+        portfolio = {}
+        for player_id in player_ids:
+            state = load_player(store_dir, player_id)
+            if state is not None:
+                portfolio[player_id] = state
+        init_player_portfolios(portfolio, trades)
+
+        if not check_spending_limits(trades, portfolio):
+            return {"status": "SPENDING_LIMIT_ERROR", "payouts": {}, "portfolio": {}}
+        payouts = calculate_round(None, outcomes, trades, round_prices, portfolio)
+        if payouts is None:
+            return {"status": "POSITION_ERROR", "payouts": {}, "portfolio": {}}
+
+        apply_round_to_portfolio(portfolio, trades, payouts)
+        commit_players(store_dir, {player_id: portfolio[player_id] for player_id in player_ids})
+    return {"status": "OK", "payouts": payouts, "portfolio": portfolio}
+
+
+def settle_upload(trades_file, outcomes, round_prices, store_dir=PORTFOLIO_DIR):
+    """Load and settle a single trades CSV (worker entry point)."""
+    result = settle_trades(load_trades(trades_file, round_prices), outcomes, round_prices, store_dir)
+    result["file"] = trades_file
+    return result
+
+
+def settle_uploads(trade_files, outcomes, round_prices, store_dir=PORTFOLIO_DIR, workers=None):
+    """
+    Settle many uploads concurrently. Reference tables are loaded once by the
+    caller and shipped to each worker; uploads touching disjoint players never wait
+    on each other. Uploads a previous crash left half-committed are finished
+    first. Yields results in upload order.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    recover_journals(store_dir)
+    n = len(trade_files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(settle_upload, trade_files, [outcomes] * n, [round_prices] * n, [store_dir] * n)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--round", type=int, required=True, help="Round number")
+    parser.add_argument("--trades", type=str, nargs="+", required=True, help="Trade CSV uploads to settle")
+    parser.add_argument("--outcomes", type=str, default="tournament_outcomes.csv", help="Path to tournament outcomes CSV")
+    parser.add_argument("--round-prices", type=str, required=True, help="Path to round_N_prices.csv")
+    parser.add_argument("--store", type=str, default=PORTFOLIO_DIR, help="Per-player portfolio directory")
+    parser.add_argument("--import-portfolio", type=str, help="Seed the store from a legacy portfolio JSON first")
+    parser.add_argument("--export", type=str, help="Write the combined portfolio JSON here afterwards")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    if args.import_portfolio:
+        print(f"Imported {import_portfolio(args.import_portfolio, args.store)} players into {args.store}")
+
+    outcomes = load_outcomes(args.outcomes, args.round)
+    round_prices = load_round_prices(args.round_prices, args.round)
+    counts = {}
+    for result in settle_uploads(args.trades, outcomes, round_prices, args.store, args.workers):
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        print(f"{result['file']}: {result['status']}")
+
+    if args.export:
+        save_portfolio_state(export_portfolio(args.store), os.path.abspath(args.export))
+        print(f"Exported combined portfolio to {args.export}")
+    print(f"Round {args.round}: settled {len(args.trades)} uploads {counts}")
+
+
+if __name__ == "__main__":
+    main()
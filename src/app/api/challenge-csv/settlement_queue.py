@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+settlement_queue.py
+
+Asyncio front end to the payout logic in calculate_payout_price.py.
+
+At round close many uploads arrive within seconds. Instead of one full
+settlement pass per upload (load reference data, load portfolio, settle, write
+portfolio), uploads are queued and coalesced: the first upload opens a short
+window, everything that arrives within it (up to a batch size) is settled in one
+pass against the in-memory portfolio, and the portfolio is written once per
+pass together with its persisted leaderboard (leaderboard.state_path) and, when
+the queue knows its round, payouts_roundN.csv (every upload settled so far this
+round) and leaderboard_roundN.csv next to it, as calculate_payout_price.py
+writes them. Reference tables (outcomes, round prices) are loaded once per queue.
+
+Each upload stays all-or-nothing, as in calculate_payout_price.py: uploads in a
+batch are applied in arrival order, and a spending-limit or position error
+restores the records that upload touched. Every caller awaits its own result:
+
+    {"status": "OK" | "SPENDING_LIMIT_ERROR" | "POSITION_ERROR" | "LOAD_ERROR",
+     "rows": [[player_id, asset1_realized, asset2_pnl, total_payout], ...],
+     "payouts": {player_id: {...}}, "errors": [...]}
+
+Usage:
+    python settlement_queue.py --round 1 --round-prices round_1_prices.csv \
+        --trades uploads/*.csv --window 0.05 --batch-size 64
+"""
+
+import argparse
+import asyncio
+import copy
+import os
+import time
+
+from calculate_payout_price import (
+    load_outcomes, load_round_prices, load_trades, load_portfolio_state, save_portfolio_state,
+    save_player_payouts, calculate_round, init_player_portfolios, check_spending_limits,
+    apply_round_to_portfolio
+)
+from leaderboard import Leaderboard, state_path
+
+# -------------------
+# CONFIG
+# -------------------
+WINDOW_SECONDS = 0.05
+BATCH_SIZE = 64
+
+
+def payout_rows(player_payouts):
+    """Rows in the payouts_roundN.csv layout."""
+    return [
+        [player_id,
+         round(p.get("asset1_realized", 0), 2),
+         round(p.get("asset2_pnl", 0), 2),
+         round(p.get("total", 0), 2)]
+        for player_id, p in player_payouts.items()
+    ]
+
+
+def _result(status, payouts=None, errors=None):
+    payouts = payouts or {}
+    return {"status": status, "rows": payout_rows(payouts), "payouts": payouts, "errors": errors or []}
+
+
+def settle_one(portfolio, trades, outcomes, round_prices, leaderboard=None):
+    """Settle one upload against the shared portfolio; roll back its players on error.
+       A given Leaderboard re-ranks the upload's players once it has settled."""
+    player_ids = {trade.player_id for trade in trades}
+    saved = {pid: copy.deepcopy(portfolio[pid]) for pid in player_ids if pid in portfolio}
+
+    def rollback(status, message):
+        for pid in player_ids:
+            if pid in saved:
+                portfolio[pid] = saved[pid]
+            else:
+                portfolio.pop(pid, None)
+        return _result(status, errors=[message])
+
+    init_player_portfolios(portfolio, trades)
+    if not check_spending_limits(trades, portfolio):
+        return rollback("SPENDING_LIMIT_ERROR", "Buy cost exceeds liquid balance")
+    payouts = calculate_round(None, outcomes, trades, round_prices, portfolio)
+    if payouts is None:
+        return rollback("POSITION_ERROR", "Sell quantity exceeds holdings")
+    apply_round_to_portfolio(portfolio, trades, payouts, leaderboard)
+    return _result("OK", payouts)
+
+
+def settle_batch(portfolio, batch, outcomes, round_prices, leaderboard=None):
+    """One settlement pass over a coalesced batch of trade lists, in arrival order."""
+    return [settle_one(portfolio, trades, outcomes, round_prices, leaderboard) for trades in batch]
+
+
+def round_output_paths(portfolio_file, round_num):
+    """(payouts_roundN.csv, leaderboard_roundN.csv) next to the portfolio, as calculate_payout_price.py names them."""
+    directory = os.path.dirname(portfolio_file)
+    return (os.path.join(directory, f"payouts_round{round_num}.csv"),
+            os.path.join(directory, f"leaderboard_round{round_num}.csv"))
+
+
+class SettlementQueue:
+    """
+    Coalescing settlement queue for one round. Use as an async context manager:
+
+        async with SettlementQueue(outcomes, round_prices, "portfolio_state.json") as queue:
+            result = await queue.submit_file("team_a.csv")
+    """
+
+    def __init__(self, outcomes, round_prices, portfolio_file, window=WINDOW_SECONDS, batch_size=BATCH_SIZE,
+                 round_num=None):
+        self.outcomes = outcomes
+        self.round_prices = round_prices
+        self.portfolio_file = os.path.abspath(portfolio_file)
+        self.window = window
+        self.batch_size = batch_size
+        self.round_num = round_num
+        self.passes = 0
+        self._queue = None
+        self._worker = None
+        self._portfolio = None
+        self._leaderboard = None
+        self._payouts = {}                # this round's payouts so far, by player_id
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._portfolio = await asyncio.to_thread(load_portfolio_state, self.portfolio_file)
+        self._leaderboard = await asyncio.to_thread(
+            Leaderboard.for_portfolio, state_path(self.portfolio_file), self._portfolio)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Settle whatever is still queued, then stop the worker."""
+        await self._queue.put(None)
+        await self._worker
+
+    async def submit(self, trades):
+        """Queue a list of Trade records; resolves with this upload's result dict."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((trades, future))
+        return await future
+
+    async def submit_file(self, trades_file):
+        try:
+            trades = await asyncio.to_thread(load_trades, trades_file, self.round_prices)
+        except (OSError, ValueError) as e:
+            return _result("LOAD_ERROR", errors=[str(e)])
+        return await self.submit(trades)
+
+    async def _collect(self, first):
+        """Gather uploads until the window closes or the batch is full."""
+        batch = [first]
+        deadline = asyncio.get_running_loop().time() + self.window
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            if item is None:
+                break
+        return batch
+
+    def _snapshot(self, uploads):
+        """{player_id: copy of their state, or None if new} for every player in the batch."""
+        player_ids = {trade.player_id for trades, _ in uploads for trade in trades}
+        return {pid: copy.deepcopy(self._portfolio[pid]) if pid in self._portfolio else None for pid in player_ids}
+
+    def _restore(self, saved):
+        for pid, state in saved.items():
+            if state is None:
+                self._portfolio.pop(pid, None)
+                if pid in self._leaderboard:
+                    self._leaderboard.remove(pid)
+            else:
+                self._portfolio[pid] = state
+                self._leaderboard.update(pid, float(state.get("cumulative_pnl", 0)))
+
+    def _write_through(self, results):
+        """Write the portfolio, the persisted leaderboard and (given a round) the round CSVs."""
+        save_portfolio_state(self._portfolio, self.portfolio_file)
+        self._leaderboard.save(state_path(self.portfolio_file), precision=None)
+        if self.round_num is None:
+            return
+        payouts = dict(self._payouts)
+        for result in results:
+            payouts.update(result["payouts"])
+        payouts_file, leaderboard_file = round_output_paths(self.portfolio_file, self.round_num)
+        save_player_payouts(payouts, payouts_file)
+        self._leaderboard.save(leaderboard_file)
+        self._payouts = payouts
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            batch = [first] if first is None else await self._collect(first)
+            stopping = batch[-1] is None
+            uploads = [item for item in batch if item is not None]
+            if not uploads:
+                continue
+            saved = self._snapshot(uploads)
+            try:
+                results = await asyncio.to_thread(
+                    settle_batch, self._portfolio, [trades for trades, _ in uploads],
+                    self.outcomes, self.round_prices, self._leaderboard)
+                await asyncio.to_thread(self._write_through, results)
+            except Exception as e:
+                # a failed pass (settlement or save) leaves none of its uploads applied
+                self._restore(saved)
+                for _, future in uploads:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.passes += 1
+            for (_, future), result in zip(uploads, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+async def settle_files(trade_files, outcomes, round_prices, portfolio_file, window=WINDOW_SECONDS, batch_size=BATCH_SIZE,
+                       round_num=None):
+    """Submit every file concurrently; returns ([(file, result)], number of settlement passes)."""
+    async with SettlementQueue(outcomes, round_prices, portfolio_file, window, batch_size, round_num) as queue:
+        results = await asyncio.gather(*(queue.submit_file(path) for path in trade_files))
+    return list(zip(trade_files, results)), queue.passes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--round", type=int, required=True, help="Round number")
+    parser.add_argument("--trades", type=str, nargs="+", required=True, help="Trade CSV uploads to settle")
+    parser.add_argument("--outcomes", type=str, default="tournament_outcomes.csv", help="Path to tournament outcomes CSV")
+    parser.add_argument("--round-prices", type=str, required=True, help="Path to round_N_prices.csv")
+    parser.add_argument("--portfolio", type=str, default="portfolio_state.json", help="Path to portfolio state JSON file")
+    parser.add_argument("--window", type=float, default=WINDOW_SECONDS, help="Coalescing window in seconds")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Maximum uploads per settlement pass")
+    args = parser.parse_args()
+
+    outcomes = load_outcomes(args.outcomes, args.round)
+    round_prices = load_round_prices(args.round_prices, args.round)
+    start = time.perf_counter()
+    results, passes = asyncio.run(settle_files(
+        args.trades, outcomes, round_prices, args.portfolio, args.window, args.batch_size, args.round))
+    for path, result in results:
+        print(f"{path}: {result['status']} ({len(result['rows'])} payout rows)")
+    print(f"Round {args.round}: {len(results)} uploads in {passes} settlement passes, "
+          f"{time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
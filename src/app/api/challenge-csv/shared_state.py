@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+shared_state.py
+
+Publish the pairwise win matrix and team arrays once and let worker processes
+attach to them zero-copy.
+
+The tables are laid out in one flat buffer:
+
+    win            float64 (n, n)   P(team i beats team j)
+    true_strength  float64 (n,)
+    team_id        int64   (n,)
+    dist_id        int64   (n,)     index into the handle's dist_specs
+
+The buffer lives either in a multiprocessing.shared_memory block (for the
+lifetime of one job) or in a memory-mapped file next to the internal CSV
+(initial_state_internal.shared.bin plus a .shared.json header). Either way the
+only thing sent to a worker is a small handle dict; np.ndarray views over the
+buffer replace per-worker pickled copies, so adding workers costs neither memory
+nor startup serialization.
+
+Usage:
+    python shared_state.py --publish             # write the memory-mapped file
+    python shared_state.py --sims 200000 --workers 8
+"""
+
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+from bracket import new_bracket
+from edit_initial_state import load_matrix, matrix_path
+from risk_analytics import simulate_remaining
+from simulate_tournament import INPUT_INTERNAL, initial_leaves, load_initial_matchups, load_teams
+
+# -------------------
+# CONFIG
+# -------------------
+N_SIMS = 100000
+RNG_SEED = 7
+
+_FIELDS = (("win", np.float64, 2), ("true_strength", np.float64, 1),
+           ("team_id", np.int64, 1), ("dist_id", np.int64, 1))
+
+
+def shared_paths(internal_path):
+    stem, _ = os.path.splitext(internal_path)
+    return stem + ".shared.bin", stem + ".shared.json"
+
+
+def _layout(n):
+    """[(field, dtype, shape, byte offset)] and the total buffer size."""
+    out, offset = [], 0
+    for name, dtype, ndim in _FIELDS:
+        shape = (n, n) if ndim == 2 else (n,)
+        out.append((name, dtype, shape, offset))
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return out, offset
+
+
+def _views(buf, n):
+    layout, _ = _layout(n)
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+            for name, dtype, shape, offset in layout}
+
+
+def _fill(arrays, teams, win, specs):
+    arrays["win"][:] = np.asarray(win, dtype=np.float64)
+    arrays["true_strength"][:] = [t["true_strength"] for t in teams]
+    arrays["team_id"][:] = [t["team_id"] for t in teams]
+    arrays["dist_id"][:] = [specs.index({"name": t["dist_name"], "params": t["dist_params"]}) for t in teams]
+
+
+def _dist_specs(teams):
+    specs = []
+    for t in teams:
+        spec = {"name": t["dist_name"], "params": t["dist_params"]}
+        if spec not in specs:
+            specs.append(spec)
+    return specs
+
+
+# -------------------
+# PUBLISH
+# -------------------
+class SharedTables:
+    """Attached views over a published buffer. Keep the object alive while the arrays are in use."""
+
+    def __init__(self, handle, arrays, owner=None):
+        self.handle = handle
+        self.win = arrays["win"]
+        self.true_strength = arrays["true_strength"]
+        self.team_id = arrays["team_id"]
+        self.dist_id = arrays["dist_id"]
+        self.dist_specs = handle["dist_specs"]
+        self._owner = owner  # SharedMemory or np.memmap backing the views
+
+    def __len__(self):
+        return len(self.team_id)
+
+    def close(self):
+        """Detach; the publisher additionally calls unlink() for shared memory blocks."""
+        self.win = self.true_strength = self.team_id = self.dist_id = None
+        if isinstance(self._owner, shared_memory.SharedMemory):
+            self._owner.close()
+        self._owner = None
+
+    def unlink(self):
+        if self.handle["kind"] == "shm":
+            shared_memory.SharedMemory(name=self.handle["name"]).unlink()
+
+
+def publish_shm(teams, win):
+    """Copy the tables into a new shared memory block. Returns the publisher's SharedTables."""
+    n = len(teams)
+    _, size = _layout(n)
+    specs = _dist_specs(teams)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    arrays = _views(shm.buf, n)
+    _fill(arrays, teams, win, specs)
+    handle = {"kind": "shm", "name": shm.name, "n_teams": n, "dist_specs": specs}
+    return SharedTables(handle, arrays, shm)
+
+
+def publish_file(teams, win, internal_path=INPUT_INTERNAL):
+    """Write the tables to a memory-mapped file next to the internal CSV. Returns the handle."""
+    n = len(teams)
+    _, size = _layout(n)
+    specs = _dist_specs(teams)
+    bin_path, header_path = shared_paths(internal_path)
+    mm = np.memmap(bin_path, dtype=np.uint8, mode="w+", shape=(size,))
+    _fill(_views(mm, n), teams, win, specs)
+    mm.flush()
+    del mm
+    handle = {"kind": "file", "name": os.path.abspath(bin_path), "n_teams": n, "dist_specs": specs}
+    with open(header_path, "w") as f:
+        json.dump(handle, f, indent=2)
+    return handle
+
+
+def load_handle(internal_path=INPUT_INTERNAL):
+    with open(shared_paths(internal_path)[1]) as f:
+        return json.load(f)
+
+
+def attach(handle):
+    """Zero-copy views over a published buffer (read-only for memory-mapped files)."""
+    n = handle["n_teams"]
+    if handle["kind"] == "shm":
+        owner = shared_memory.SharedMemory(name=handle["name"])
+        return SharedTables(handle, _views(owner.buf, n), owner)
+    _, size = _layout(n)
+    owner = np.memmap(handle["name"], dtype=np.uint8, mode="r", shape=(size,))
+    return SharedTables(handle, _views(owner, n), owner)
+
+
+# -------------------
+# WORKERS
+# -------------------
+_TABLES = None
+
+
+def _init_worker(handle):
+    global _TABLES
+    _TABLES = attach(handle)
+
+
+def _title_counts(job):
+    """Simulate n_sims full brackets against the shared matrix; return title counts per team index."""
+    leaves, n_sims, seed = job
+    bracket = new_bracket(leaves)
+    bracket["win"] = _TABLES.win
+    winners = simulate_remaining(bracket, n_sims, np.random.default_rng(seed))
+    return np.bincount(winners[0], minlength=len(_TABLES))
+
+
+def simulate_titles(handle, leaves, n_sims=N_SIMS, workers=None, seed=RNG_SEED):
+    """Monte Carlo title probabilities (by team index), split across workers attached to one buffer."""
+    workers = workers or os.cpu_count() or 1
+    chunks = np.array_split(np.arange(n_sims), workers)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    jobs = [(leaves, len(c), s) for c, s in zip(chunks, seeds) if len(c)]
+    with Pool(processes=workers, initializer=_init_worker, initargs=(handle,)) as pool:
+        counts = sum(pool.map(_title_counts, jobs))
+    return counts / n_sims
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--internal", type=str, default=INPUT_INTERNAL, help="Internal CSV")
+    parser.add_argument("--publish", action="store_true", help="Write the memory-mapped file and exit")
+    parser.add_argument("--shm", action="store_true", help="Use a shared memory block instead of the file")
+    parser.add_argument("--sims", type=int, default=N_SIMS, help="Simulated tournaments")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=RNG_SEED, help="RNG seed")
+    args = parser.parse_args()
+
+    teams = load_teams(args.internal)
+    win = load_matrix(matrix_path(args.internal), teams)
+    if args.publish:
+        handle = publish_file(teams, win, args.internal)
+        print(f"Published {handle['n_teams']} teams to {handle['name']}")
+        return
+
+    leaves = initial_leaves(teams, load_initial_matchups(args.internal))
+    start = time.perf_counter()
+    if args.shm:
+        tables = publish_shm(teams, win)
+        try:
+            probs = simulate_titles(tables.handle, leaves, args.sims, args.workers, args.seed)
+        finally:
+            tables.close()
+            tables.unlink()
+    else:
+        probs = simulate_titles(publish_file(teams, win, args.internal), leaves, args.sims, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+    for i in np.argsort(-probs)[:8]:
+        print(f"{teams[i]['team_name']:<10} {probs[i] * 100:6.2f}")
+    print(f"{args.sims} simulations in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,15 +14,21 @@ Requires:
 
 import csv
 import io
-import json
 import random
 import math
 from collections import defaultdict
 from distributions import probability_A_beats_B
+from bracket import (
+    new_bracket, leaves_from_pairs, seed_ranking, split_byes,
+    round_matches, advance, champion, reseed
+)
+from columnar import arrow_schema, columnar_path, write_rows
+from records import Matchup, MatchRecord, MatchResult, Team
 
 INPUT_INTERNAL = "initial_state_internal.csv"
 OUTPUT_RESULTS = "tournament_results.csv"
 RNG_SEED = 12345
+COLUMNAR_FORMAT = None  # "arrow" or "parquet" to also write a typed columnar copy
 
 random.seed(RNG_SEED)
 
@@ -58,37 +64,12 @@ def load_teams(path):
     if not teams_text:
         raise RuntimeError("No teams section found in internal CSV.")
 
-    f = io.StringIO(teams_text)
-    reader = csv.DictReader(f)
     teams = []
-    for row in reader:
+    for row in csv.DictReader(io.StringIO(teams_text)):
         team_id_raw = (row.get("team_id") or "").strip()
         if not team_id_raw or not team_id_raw.lstrip().isdigit():
             continue
-        team_id = int(team_id_raw)
-        name = (row.get("team_name") or f"Team_{team_id}").strip()
-        ts = float(row.get("true_strength") or 0.0)
-        dist_name = (row.get("dist_name") or "").strip()
-        raw_params = (row.get("dist_params") or "").strip()
-        # fix CSV double-quote style if present
-        if raw_params.startswith('"') and raw_params.endswith('"'):
-            inner = raw_params[1:-1].replace('""', '"')
-            params_text = inner
-        else:
-            params_text = raw_params.replace('""', '"')
-        try:
-            params = json.loads(params_text) if params_text else {}
-        except Exception:
-            params = {}
-        tournament_price = float(row.get("tournament_price") or 0.0)
-        teams.append({
-            "team_id": team_id,
-            "team_name": name,
-            "true_strength": ts,
-            "dist_name": dist_name,
-            "dist_params": params,
-            "tournament_price": tournament_price
-        })
+        teams.append(Team.from_row(row))
     return teams
 
 
@@ -97,109 +78,100 @@ def load_initial_matchups(path):
     _, matchups_text = split_internal_file(path)
     if not matchups_text:
         return None
-    f = io.StringIO(matchups_text)
-    reader = csv.DictReader(f)
     matchups = []
-    for row in reader:
+    for row in csv.DictReader(io.StringIO(matchups_text)):
         mid_raw = (row.get("match_id") or "").strip()
         if not mid_raw or not mid_raw.lstrip().isdigit():
             continue
         try:
-            m = {
-                "match_id": int(mid_raw),
-                "team_A_id": int((row.get("team_A_id") or "").strip()),
-                "team_B_id": int((row.get("team_B_id") or "").strip()),
-                "team_A": row.get("team_A") or "",
-                "team_B": row.get("team_B") or "",
-                "team_A_price": float(row.get("team_A_price") or 0.0),
-                "team_B_price": float(row.get("team_B_price") or 0.0)
-            }
-            matchups.append(m)
+            matchups.append(Matchup.from_row(row))
         except Exception:
             continue
     return matchups if matchups else None
 
 
 def simulate_match(teamA, teamB, trials_mc=1200):
-    specA = {"name": teamA.get("dist_name") or "normal", "params": teamA.get("dist_params") or {}}
-    specB = {"name": teamB.get("dist_name") or "normal", "params": teamB.get("dist_params") or {}}
-    pA = probability_A_beats_B(teamA["true_strength"], teamB["true_strength"], specA, specB, trials_mc=trials_mc)
+    """Play one game between two Team records; returns a MatchResult."""
+    specA = {"name": teamA.dist_name or "normal", "params": teamA.dist_params or {}}
+    specB = {"name": teamB.dist_name or "normal", "params": teamB.dist_params or {}}
+    pA = probability_A_beats_B(teamA.true_strength, teamB.true_strength, specA, specB, trials_mc=trials_mc)
     pA = max(0.0, min(1.0, float(pA)))
     winner = teamA if random.random() < pA else teamB
     loser = teamB if winner is teamA else teamA
-    return {
-        "probA": round(pA, 4),
-        "probB": round(1.0 - pA, 4),
-        "winner": winner,
-        "loser": loser
-    }
-
-
-def simulate_tournament(teams, initial_matchups=None):
-    """Simulate entire bracket. Return list of match records (with rounds)"""
-    id_map = {t["team_id"]: t for t in teams}
-    # Create initial pairings
+    return MatchResult(round(pA, 4), round(1.0 - pA, 4), winner, loser)
+
+
+def initial_leaves(teams, initial_matchups=None):
+    """
+    Round-1 leaf layout (team indices) for the bracket. Teams not covered by
+    initial_matchups get byes; without matchups the top seeds get the byes and
+    everyone else is shuffled and paired sequentially.
+    """
+    index = {t["team_id"]: i for i, t in enumerate(teams)}
     pairs = []
     if initial_matchups:
         # use provided matchups
         for m in initial_matchups:
-            A = id_map.get(m["team_A_id"])
-            B = id_map.get(m["team_B_id"])
+            A = index.get(m["team_A_id"])
+            B = index.get(m["team_B_id"])
             if A is None or B is None:
                 # fallback to skipping invalid
                 continue
             pairs.append((A, B))
+        paired = {i for pair in pairs for i in pair}
+        byes = [i for i in seed_ranking(teams) if i not in paired]
     else:
-        # random seeding
-        shuffled = teams[:]
-        random.shuffle(shuffled)
-        for i in range(0, len(shuffled), 2):
-            pairs.append((shuffled[i], shuffled[i+1]))
+        # random seeding (byes, if any, go to the top seeds)
+        byes, others = split_byes(teams)
+        random.shuffle(others)
+        for i in range(0, len(others), 2):
+            pairs.append((others[i], others[i+1]))
+    return leaves_from_pairs(pairs, byes)
+
+
+def simulate_tournament(teams, initial_matchups=None, reseed_rounds=False):
+    """
+    Simulate entire bracket. Return list of MatchRecords (with rounds).
+    teams may be Team records or team dicts (as generate_teams builds them).
+    Any field size works: missing slots become byes. With reseed_rounds the
+    survivors are re-laid out by seed after every round (live_repricer prices a
+    fixed bracket, so leave it off for events whose Asset 2 is repriced).
+    """
+    bracket = new_bracket(initial_leaves(teams, initial_matchups))
+    ranking = seed_ranking(teams)
+    records = [Team.from_dict(t) for t in teams]
 
     matches_output = []
     round_num = 1
+    bracket_round = 1
     match_id_global = 1
-    current_pairs = pairs
 
-    while current_pairs:
-        next_round_teams = []
-        for pair in current_pairs:
-            teamA, teamB = pair
+    while champion(bracket) is None:
+        for node, a, b in round_matches(bracket, bracket_round):
+            teamA, teamB = records[a], records[b]
             res = simulate_match(teamA, teamB)
-            winner = res["winner"]
-            loser = res["loser"]
-            record = {
-                "round": round_num,
-                "match_id": match_id_global,
-                "teamA_id": teamA["team_id"],
-                "teamB_id": teamB["team_id"],
-                "teamA": teamA["team_name"],
-                "teamB": teamB["team_name"],
-                "probA": res["probA"],
-                "probB": res["probB"],
-                "winner_id": winner["team_id"],
-                "loser_id": loser["team_id"],
-                "winner": winner["team_name"],
-                "loser": loser["team_name"]
-            }
-            matches_output.append(record)
-            next_round_teams.append(winner)
+            winner = res.winner
+            loser = res.loser
+            matches_output.append(MatchRecord(
+                round_num, match_id_global,
+                teamA.team_id, teamB.team_id, teamA.team_name, teamB.team_name,
+                res.probA, res.probB,
+                winner.team_id, loser.team_id, winner.team_name, loser.team_name
+            ))
+            advance(bracket, node, a if winner is teamA else b)
             match_id_global += 1
-        # pair winners sequentially
-        if len(next_round_teams) == 1:
-            break
-        new_pairs = []
-        for i in range(0, len(next_round_teams), 2):
-            new_pairs.append((next_round_teams[i], next_round_teams[i+1]))
-        current_pairs = new_pairs
         round_num += 1
+        bracket_round += 1
+        if reseed_rounds and champion(bracket) is None:
+            bracket = reseed(bracket, ranking)
+            bracket_round = 1
 
     # return the flat list of match records
     return matches_output
 
 
-def write_tournament_csv(matches, path=OUTPUT_RESULTS):
-    """Write matches list to CSV."""
+def write_tournament_csv(matches, path=OUTPUT_RESULTS, columnar=None):
+    """Write matches list to CSV (plus a columnar copy when columnar="arrow"/"parquet")."""
     fieldnames = [
         "round", "match_id",
         "teamA_id", "teamB_id", "teamA", "teamB",
@@ -210,8 +182,11 @@ def write_tournament_csv(matches, path=OUTPUT_RESULTS):
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         for m in matches:
-            writer.writerow(m)
+            writer.writerow(m.to_row())
     print(f"Wrote tournament results to {path}")
+    if columnar:
+        out = write_rows(matches, arrow_schema("tournament_results"), columnar_path(path, columnar), columnar)
+        print(f"Wrote columnar tournament results to {out}")
 
 
 def main():
@@ -219,7 +194,7 @@ def main():
     initial_matchups = load_initial_matchups(INPUT_INTERNAL)
     print(f"Loaded {len(teams)} teams; using initial matchups: {bool(initial_matchups)}")
     matches = simulate_tournament(teams, initial_matchups)
-    write_tournament_csv(matches)
+    write_tournament_csv(matches, columnar=COLUMNAR_FORMAT)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+sweep_runner.py
+
+Run many challenge scenarios (generate -> simulate -> price -> settle) across a
+process pool and stream one summary row per scenario into a single output file.
+
+Each scenario varies the RNG seed, field size, distribution pool and price
+noise levels. Nothing is written to the working directory per scenario: the
+initial state, bracket results and round prices are kept in memory, and the
+existing mock_trades_roundN.csv files are settled against the scenario's prices.
+
+Outputs:
+ - sweep_summary.parquet (or .csv; Parquet needs pyarrow, otherwise CSV is used)
+
+Requires:
+ - distributions.py, generate_initial_state.py, simulate_tournament.py,
+   price_generation.py, calculate_payout_price.py
+ - mock_trades_round*.csv
+"""
+
+import argparse
+import csv
+import glob
+import itertools
+import os
+import random
+import re
+import time
+from multiprocessing import Pool
+
+import numpy as np
+from generate_initial_state import DISTRIBUTION_POOL, generate_teams, compute_tournament_prices, compute_round_matchups
+from simulate_tournament import simulate_tournament
+from live_repricer import bracket_from_results, title_probabilities
+from price_generation import fair_value_table, generate_price_scenarios, id_price_tables
+from calculate_payout_price import init_player_portfolios, check_spending_limits, apply_round_to_portfolio
+from fast_trades import load_trade_columns
+from results_index import ResultsIndex, settle_columns
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: fall back to CSV output
+    pa = None
+    pq = None
+
+# -------------------
+# CONFIG
+# -------------------
+OUTPUT_SUMMARY = "sweep_summary.parquet"
+MOCK_TRADES_GLOB = "mock_trades_round*.csv"
+BATCH_SIZE = 256
+
+# Every column a summary row can carry, in output order, with its type. Rows
+# from failed scenarios have only the config columns plus "error"; the rest
+# are written as nulls (Parquet) or blanks (CSV).
+SUMMARY_COLUMNS = [
+    ("seed", "int"),
+    ("num_teams", "int"),
+    ("pool", "str"),
+    ("model", "str"),
+    ("asset1_sd", "float"),
+    ("asset2_sd", "float"),
+    ("champion", "str"),
+    ("champion_fair_price", "float"),
+    ("favourite", "str"),
+    ("favourite_fair_price", "float"),
+    ("favourite_won", "bool"),
+    ("upsets", "int"),
+    ("asset1_mean_abs_error", "float"),
+    ("asset2_mean_abs_error", "float"),
+    ("players", "int"),
+    ("trades", "int"),
+    ("settle_errors", "int"),
+    ("total_pnl", "float"),
+    ("seconds", "float"),
+    ("error", "str"),
+]
+
+
+def _pool_by_names(*names):
+    return [spec for spec in DISTRIBUTION_POOL if spec['name'] in names]
+
+
+SWEEP_POOLS = {
+    "all": DISTRIBUTION_POOL,
+    "gaussian": _pool_by_names('normal'),
+    "heavy_tails": _pool_by_names('student_t', 'laplace', 'logistic'),
+    "skewed": _pool_by_names('mixture_normal', 'max_of_n', 'skew_normal_approx', 'beta'),
+}
+
+
+def find_mock_trades(pattern=MOCK_TRADES_GLOB):
+    """Return {round_num: path} for the mock trade files in the working directory."""
+    files = {}
+    for path in glob.glob(pattern):
+        m = re.search(r"round(\d+)", os.path.basename(path))
+        if m:
+            files[int(m.group(1))] = path
+    return files
+
+
+def build_configs(seeds, team_counts, pools, models, asset1_sds, asset2_sds):
+    """Yield one config dict per point of the sweep grid."""
+    for seed, num_teams, pool, model, sd1, sd2 in itertools.product(
+            seeds, team_counts, pools, models, asset1_sds, asset2_sds):
+        yield {
+            "seed": seed,
+            "num_teams": num_teams,
+            "pool": pool,
+            "model": model,
+            "asset1_sd": sd1,
+            "asset2_sd": sd2,
+        }
+
+
+# -------------------
+# SCENARIO
+# -------------------
+def settle_mock_trades(matches, fair, prices, mock_trades):
+    """
+    Settle every round's mock trades in sequence through a results index over
+    the scenario's matches; return (portfolio, n_trades, n_errors).
+    """
+    index = ResultsIndex.from_matches(matches)
+    tables = id_price_tables(index, fair, prices)
+    portfolio = {}
+    n_trades = 0
+    n_errors = 0
+    for round_num, path in sorted(mock_trades.items()):
+        if round_num not in tables:
+            continue
+        table = tables[round_num]
+        cols = load_trade_columns(path, index.round_prices(table))
+        trades = list(cols)
+        n_trades += len(trades)
+        init_player_portfolios(portfolio, trades)
+        if not check_spending_limits(trades, portfolio):
+            n_errors += 1
+            continue
+        payouts = settle_columns(cols, index, index.outcome_array(round_num), table)
+        if payouts is None:
+            n_errors += 1
+            continue
+        apply_round_to_portfolio(portfolio, trades, payouts)
+    return portfolio, n_trades, n_errors
+
+
+def run_scenario(config, mock_trades=None):
+    """Run one full scenario in memory and return its summary row."""
+    start = time.perf_counter()
+    random.seed(config["seed"])
+    teams = generate_teams(config["num_teams"], SWEEP_POOLS[config["pool"]])
+    teams = compute_tournament_prices(teams)
+    matchups = compute_round_matchups(teams)
+    matches = simulate_tournament(teams, matchups)
+
+    bracket = bracket_from_results(teams, matches)
+    names = {t["team_id"]: t["team_name"] for t in teams}
+    # Pre-tournament title prices (covers teams with round-1 byes too)
+    pre_titles = {names[tid]: p * 100 for tid, p in title_probabilities(bracket).items()}
+    fair = fair_value_table(teams, matches, bracket)
+    noise = {
+        "asset1": {'name': config["model"], 'params': {'sd': config["asset1_sd"]}},
+        "asset2": {'name': config["model"], 'params': {'sd': config["asset2_sd"]}},
+        "spread": 0.0,
+    }
+    prices = generate_price_scenarios(fair, noise, n_scenarios=1, seed=config["seed"])
+
+    if mock_trades is None:
+        mock_trades = find_mock_trades()
+    portfolio, n_trades, n_errors = settle_mock_trades(matches, fair, prices, mock_trades)
+
+    final = matches[-1]
+    favourite = max(pre_titles, key=pre_titles.get)
+    upsets = sum(
+        1 for m in matches
+        if (m["winner_id"] == m["teamA_id"] and m["probA"] < 0.5)
+        or (m["winner_id"] == m["teamB_id"] and m["probB"] < 0.5)
+    )
+    alive = np.concatenate([fair["asset2_A"], fair["asset2_B"]]) > 0
+    asset2_err = np.abs(np.concatenate([
+        prices["team_A_tournament_price"][0] - fair["asset2_A"],
+        prices["team_B_tournament_price"][0] - fair["asset2_B"],
+    ]))[alive]
+
+    row = dict(config)
+    row.update({
+        "champion": final["winner"],
+        "champion_fair_price": round(float(pre_titles[final["winner"]]), 4),
+        "favourite": favourite,
+        "favourite_fair_price": round(float(pre_titles[favourite]), 4),
+        "favourite_won": favourite == final["winner"],
+        "upsets": upsets,
+        "asset1_mean_abs_error": round(float(np.mean(np.abs(prices["team_A_price"][0] - fair["asset1_A"]))), 4),
+        "asset2_mean_abs_error": round(float(asset2_err.mean()) if asset2_err.size else 0.0, 4),
+        "players": len(portfolio),
+        "trades": n_trades,
+        "settle_errors": n_errors,
+        "total_pnl": round(sum(p["cumulative_pnl"] for p in portfolio.values()), 4),
+        "seconds": round(time.perf_counter() - start, 3),
+    })
+    return row
+
+
+def _run_scenario_safe(config):
+    try:
+        return run_scenario(config)
+    except Exception as e:
+        row = dict(config)
+        row["error"] = f"{type(e).__name__}: {e}"
+        return row
+
+
+# -------------------
+# STREAMING OUTPUT
+# -------------------
+def summary_schema():
+    """Arrow schema for SUMMARY_COLUMNS."""
+    types = {"int": pa.int64(), "float": pa.float64(), "str": pa.string(), "bool": pa.bool_()}
+    return pa.schema([(name, types[kind]) for name, kind in SUMMARY_COLUMNS])
+
+
+def stream_summaries(rows, path, batch_size=BATCH_SIZE):
+    """
+    Consume summary rows as they arrive and write them in batches, so only one
+    batch is ever held in memory. Parquet row groups are used when pyarrow is
+    available and the path ends in .parquet; otherwise rows go to CSV.
+    """
+    use_parquet = path.endswith(".parquet") and pa is not None
+    if path.endswith(".parquet") and pa is None:
+        path = path[:-len(".parquet")] + ".csv"
+        print(f"pyarrow not installed; writing CSV to {path}")
+
+    fieldnames = [name for name, _ in SUMMARY_COLUMNS]
+    writer = None
+    handle = None
+    batch = []
+    count = 0
+
+    def flush():
+        nonlocal writer, handle
+        if not batch:
+            return
+        unknown = set().union(*batch) - set(fieldnames)
+        if unknown:
+            raise ValueError(f"Summary columns missing from SUMMARY_COLUMNS: {sorted(unknown)}")
+        if use_parquet:
+            if writer is None:
+                writer = pq.ParquetWriter(path, summary_schema())
+            writer.write_table(pa.Table.from_pylist(batch, schema=writer.schema))
+        else:
+            if writer is None:
+                handle = open(path, "w", newline="")
+                writer = csv.DictWriter(handle, fieldnames=fieldnames)
+                writer.writeheader()
+            writer.writerows(batch)
+            handle.flush()
+        batch.clear()
+
+    try:
+        for row in rows:
+            row.setdefault("error", "")
+            batch.append(row)
+            count += 1
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    finally:
+        if use_parquet and writer is not None:
+            writer.close()
+        if handle is not None:
+            handle.close()
+    return path, count
+
+
+def run_sweep(configs, output=OUTPUT_SUMMARY, workers=None, batch_size=BATCH_SIZE):
+    """Run configs across a process pool, streaming rows to output as scenarios finish."""
+    with Pool(processes=workers) as pool:
+        results = pool.imap_unordered(_run_scenario_safe, configs, chunksize=1)
+        return stream_summaries(results, output, batch_size)
+
+
+def _csv_list(text, cast):
+    return [cast(x) for x in text.split(",") if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seeds", type=int, default=8, help="Number of seeds per grid point")
+    parser.add_argument("--seed-start", type=int, default=42, help="First seed")
+    parser.add_argument("--teams", type=str, default="32", help="Comma-separated field sizes")
+    parser.add_argument("--pools", type=str, default="all", help=f"Comma-separated pools from {sorted(SWEEP_POOLS)}")
+    parser.add_argument("--models", type=str, default="multiplicative", help="Comma-separated noise models")
+    parser.add_argument("--asset1-sd", type=str, default="0.12", help="Comma-separated Asset 1 noise levels")
+    parser.add_argument("--asset2-sd", type=str, default="0.2", help="Comma-separated Asset 2 noise levels")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--output", type=str, default=OUTPUT_SUMMARY, help="Summary output file (.parquet or .csv)")
+    args = parser.parse_args()
+
+    pools = _csv_list(args.pools, str)
+    for name in pools:
+        if name not in SWEEP_POOLS:
+            parser.error(f"Unknown pool {name}")
+    configs = build_configs(
+        range(args.seed_start, args.seed_start + args.seeds),
+        _csv_list(args.teams, int), pools, _csv_list(args.models, str),
+        _csv_list(args.asset1_sd, float), _csv_list(args.asset2_sd, float),
+    )
+    start = time.perf_counter()
+    path, count = run_sweep(configs, args.output, args.workers)
+    print(f"Wrote {count} scenario summaries to {path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Regression tests for order_book.MatchingEngine account checks and settlement."""
+
+import pytest
+
+from order_book import BUY, SELL, MatchingEngine
+
+PRICES = {"Team_1": {"asset1": 40.0, "asset2": 30.0}}
+
+
+def _engine(holdings=None, portfolio=None):
+    engine = MatchingEngine(PRICES, holdings=holdings, portfolio=portfolio)
+    engine.start_auction()
+    engine.uncross()
+    return engine
+
+
+def test_settles_sell_from_carried_forward_holdings():
+    engine = _engine(holdings={"alice": {("Team_1", "2"): 5}})
+    engine.submit("alice", "Team_1", "2", SELL, 40, 5)
+    _, fills = engine.submit("bob", "Team_1", "2", BUY, 45, 5)
+    assert len(fills) == 1 and fills[0].price == 4000
+
+    payouts = engine.settle({"Team_1": True}, PRICES)
+    assert payouts is not None
+    assert payouts["bob"]["asset2_pnl"] == pytest.approx(5 * (30.0 - 40.0))
+    assert payouts["alice"]["asset2_pnl"] == pytest.approx(5 * (40.0 - 30.0))
+    assert engine.holdings["alice"][("Team_1", "2")] == 0
+    assert engine.holdings["bob"][("Team_1", "2")] == 5
+
+
+def test_rejects_sell_without_holdings():
+    engine = _engine()
+    with pytest.raises(ValueError, match="POSITION_ERROR"):
+        engine.submit("alice", "Team_1", "2", SELL, 40, 5)
+
+
+def test_resting_sells_commit_holdings_until_cancelled():
+    engine = _engine(holdings={"alice": {("Team_1", "1"): 5}})
+    order_id, _ = engine.submit("alice", "Team_1", "1", SELL, 60, 5)
+    with pytest.raises(ValueError, match="POSITION_ERROR"):
+        engine.submit("alice", "Team_1", "1", SELL, 61, 1)
+    assert engine.cancel(order_id)
+    engine.submit("alice", "Team_1", "1", SELL, 61, 5)
+
+
+def test_rejects_buy_over_liquid_balance():
+    engine = _engine(portfolio={"bob": {"liquid_balance": 100.0}})
+    engine.submit("bob", "Team_1", "1", BUY, 20, 4)
+    with pytest.raises(ValueError, match="SPENDING_LIMIT_ERROR"):
+        engine.submit("bob", "Team_1", "1", BUY, 25, 1)
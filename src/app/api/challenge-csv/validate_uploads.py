@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+validate_uploads.py
+
+Pre-check a directory of pending trade uploads before round close, without
+settling anything.
+
+calculate_payout_price.py only finds problems while settling and stops at the
+first POSITION_ERROR or SPENDING_LIMIT_ERROR. Here every file is checked in
+full and every problem is reported with its CSV line number (the header is
+line 1):
+
+ - LOAD_ERROR            file unreadable, or no player_id/team_id/action columns
+ - MISSING_FIELD         empty player_id, team_id or action (load_trades skips the row)
+ - BAD_ACTION            action other than BUY/SELL (load_trades skips the row)
+ - BAD_QUANTITY          quantity not a number > 0 (load_trades settles it as 0)
+ - BAD_ASSET             asset other than 1/2 (load_trades settles it as Asset 2)
+ - UNKNOWN_TEAM          team not in this round's prices (settles at price 0)
+ - POSITION_ERROR        sell beyond the holdings built up earlier in the file; the
+                         row is then left out of the running holdings so later rows
+                         are judged as if it were removed
+ - SPENDING_LIMIT_ERROR  a player's buy cost exceeds their liquid balance; reported
+                         at the buy row that crosses it
+
+Rows are parsed exactly as load_trades parses them, so the position and
+spending checks see the same trades settlement would. Balances come from the
+current portfolio (read only), 500 for new players; each file is judged on its
+own against them.
+
+Files are checked in a process pool. The round prices, outcomes and balances
+are loaded once and handed to each worker by its initializer, so a task only
+carries a file path.
+
+Outputs:
+ - validation_roundN.json
+   {"round", "files": [{"file", "status": "OK" | "INVALID", "rows", "errors": [
+       {"row", "code", "message", "player_id", "team_id"}]}],
+    "summary": {"files", "invalid_files", "errors": {code: count}}}
+
+Usage:
+    python validate_uploads.py --round 1 --round-prices round_1_prices.csv --uploads pending/
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from calculate_payout_price import load_outcomes, load_round_prices, load_portfolio_state
+
+# -------------------
+# CONFIG
+# -------------------
+STARTING_BALANCE = 500.0
+CHUNK_SIZE = 16           # files per task sent to a worker
+REQUIRED_COLUMNS = ("player_id", "action")
+
+
+def _error(row, code, message, player_id="", team_id=""):
+    return {"row": row, "code": code, "message": message, "player_id": player_id, "team_id": team_id}
+
+
+# -------------------
+# CHECKS
+# -------------------
+def parse_rows(reader, errors):
+    """
+    [(line, player_id, team_id, action, quantity, asset)] for the rows load_trades
+    keeps, recording row-level errors along the way.
+    """
+    rows = []
+    for row in reader:
+        line = reader.line_num
+        team_id = (row.get("team_id") or row.get("team") or "").strip()
+        action = (row.get("action") or "").strip().upper()
+        player_id = (row.get("player_id") or "").strip()
+        asset = (row.get("asset") or "1").strip()
+        if not team_id or not action or not player_id:
+            missing = [name for name, value in (("player_id", player_id), ("team_id", team_id), ("action", action))
+                       if not value]
+            errors.append(_error(line, "MISSING_FIELD", f"Missing {', '.join(missing)}", player_id, team_id))
+            continue
+        if action not in ("BUY", "SELL"):
+            errors.append(_error(line, "BAD_ACTION", f"Action {action!r} is not BUY or SELL", player_id, team_id))
+            continue
+        try:
+            quantity = float(row.get("quantity"))
+        except (TypeError, ValueError):
+            quantity = 0.0
+        if not quantity > 0:
+            errors.append(_error(line, "BAD_QUANTITY", f"Quantity {row.get('quantity')!r} is not a positive number",
+                                 player_id, team_id))
+        if asset not in ("1", "2"):
+            errors.append(_error(line, "BAD_ASSET", f"Asset {asset!r} is not 1 or 2", player_id, team_id))
+        rows.append((line, player_id, team_id, action.lower(), quantity, asset))
+    return rows
+
+
+def check_rows(rows, round_prices, balances, errors):
+    """Unknown teams, overselling and spending limits over the parsed rows."""
+    holdings = {}        # (player_id, team_id, asset) -> running net quantity
+    spent = {}           # player_id -> running buy cost
+    over_limit = set()
+    for line, player_id, team_id, action, quantity, asset in rows:
+        prices = round_prices.get(team_id)
+        if prices is None:
+            errors.append(_error(line, "UNKNOWN_TEAM", f"{team_id} has no price this round", player_id, team_id))
+        price = (prices or {}).get("asset1" if asset == "1" else "asset2", 0)
+        key = (player_id, team_id, asset)
+        held = holdings.get(key, 0.0)
+        if action == "sell":
+            if held < quantity:
+                errors.append(_error(line, "POSITION_ERROR",
+                                     f"Selling {quantity} of {team_id} asset {asset}, but only owns {held}",
+                                     player_id, team_id))
+                continue
+            holdings[key] = held - quantity
+            continue
+        holdings[key] = held + quantity
+        spent[player_id] = spent.get(player_id, 0.0) + quantity * price
+        balance = balances.get(player_id, STARTING_BALANCE)
+        if spent[player_id] > balance and player_id not in over_limit:
+            over_limit.add(player_id)
+            errors.append(_error(line, "SPENDING_LIMIT_ERROR",
+                                 f"Buy cost reaches {spent[player_id]:.2f}, liquid balance is {balance:.2f}",
+                                 player_id, team_id))
+
+
+def validate_file(path, round_prices, balances):
+    """Report dict for one upload file."""
+    errors = []
+    try:
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            columns = reader.fieldnames or []
+            missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+            if not ("team_id" in columns or "team" in columns):
+                missing.append("team_id")
+            if missing:
+                errors.append(_error(1, "LOAD_ERROR", f"Missing columns: {', '.join(missing)}"))
+                rows = []
+            else:
+                rows = parse_rows(reader, errors)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        errors.append(_error(0, "LOAD_ERROR", str(e)))
+        rows = []
+    check_rows(rows, round_prices, balances, errors)
+    errors.sort(key=lambda e: e["row"])
+    return {"file": path, "status": "INVALID" if errors else "OK", "rows": len(rows), "errors": errors}
+
+
+# -------------------
+# WORKERS
+# -------------------
+_TABLES = None
+
+
+def _init_worker(tables):
+    global _TABLES
+    _TABLES = tables
+
+
+def _validate(path):
+    return validate_file(path, _TABLES["round_prices"], _TABLES["balances"])
+
+
+def load_tables(round_num, prices_file, outcomes_file=None, portfolio_file=None):
+    """The reference tables every worker shares. Teams with an outcome but no price are known, at price 0."""
+    round_prices = load_round_prices(prices_file, round_num)
+    if outcomes_file and os.path.exists(outcomes_file):
+        for team_id in load_outcomes(outcomes_file, round_num):
+            round_prices.setdefault(team_id, {"asset1": 0.0, "asset2": 0.0})
+    portfolio = load_portfolio_state(portfolio_file) if portfolio_file else {}
+    balances = {pid: state["liquid_balance"] for pid, state in portfolio.items()}
+    return {"round_prices": round_prices, "balances": balances}
+
+
+def validate_uploads(paths, tables, workers=None):
+    """Reports for every file, in input order."""
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tables,)) as pool:
+        return list(pool.map(_validate, paths, chunksize=CHUNK_SIZE))
+
+
+def summarize(reports):
+    counts = {}
+    for report in reports:
+        for e in report["errors"]:
+            counts[e["code"]] = counts.get(e["code"], 0) + 1
+    return {"files": len(reports), "invalid_files": sum(r["status"] != "OK" for r in reports), "errors": counts}
+
+
+def upload_paths(targets):
+    """CSV files from a mix of directories and file paths, sorted within each directory."""
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(sorted(glob.glob(os.path.join(target, "*.csv"))))
+        else:
+            paths.append(target)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--round", type=int, required=True, help="Round number")
+    parser.add_argument("--round-prices", type=str, required=True, help="Path to round_N_prices.csv")
+    parser.add_argument("--uploads", type=str, nargs="+", required=True, help="Upload directories and/or CSV files")
+    parser.add_argument("--outcomes", type=str, default="tournament_outcomes.csv", help="Path to tournament outcomes CSV")
+    parser.add_argument("--portfolio", type=str, default="portfolio_state.json", help="Portfolio JSON for balances (read only)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--report", type=str, help="Output JSON (default validation_roundN.json)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = upload_paths(args.uploads)
+    tables = load_tables(args.round, args.round_prices, args.outcomes, args.portfolio)
+    reports = validate_uploads(paths, tables, args.workers)
+    summary = summarize(reports)
+    output = args.report or f"validation_round{args.round}.json"
+    with open(output, "w") as f:
+        json.dump({"round": args.round, "files": reports, "summary": summary}, f, indent=2)
+    for report in reports:
+        if report["errors"]:
+            print(f"{report['file']}: {len(report['errors'])} errors")
+    print(f"Validated {summary['files']} uploads in {time.perf_counter() - start:.2f}s: "
+          f"{summary['invalid_files']} invalid {summary['errors']}; report in {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+vector_samplers.py
+
+numpy versions of the performance samplers in distributions.py.
+
+Each sampler draws a whole array of performances in one call from a
+np.random.Generator, following the same distribution (and the same parameter
+defaults) as its scalar counterpart in distributions.SAMPLERS. They do not
+reproduce the scalar random stream, only the distribution, so results agree
+with probability_A_beats_B up to Monte Carlo error (see golden_harness.py).
+Strengths go through distributions.calibrated_strength first, so both paths
+share the same memoized mean offsets and E[perf] = strength for every spec.
+
+ - sample(strength, spec, n, rng):               n performances for one team
+ - probability_A_beats_B_np(...):                drop-in for the scalar estimate
+ - probability_matrix(teams, trials_mc, rng):    full pairwise win matrix
+"""
+
+import numpy as np
+from distributions import calibrated_strength
+
+# -------------------
+# SAMPLERS
+# -------------------
+def _normal(strength, params, n, rng):
+    return rng.normal(strength, params.get('sd', 0.05), n)
+
+
+def _laplace(strength, params, n, rng):
+    return strength + rng.laplace(0.0, params.get('b', 0.04), n)
+
+
+def _student_t(strength, params, n, rng):
+    return strength + params.get('scale', 0.06) * rng.standard_t(params.get('df', 3), n)
+
+
+def _logistic(strength, params, n, rng):
+    return strength + rng.logistic(0.0, params.get('s', 0.04), n)
+
+
+def _lognormal(strength, params, n, rng):
+    sigma = params.get('sigma', 0.2)
+    if strength <= 0:
+        eps = rng.normal(0.0, params.get('rel_sd', 0.1), n)
+        return np.maximum(0.0, strength * (1 + eps))
+    mu = np.log(max(1e-6, strength)) - 0.5 * sigma * sigma
+    return rng.lognormal(mu, sigma, n)
+
+
+def _beta(strength, params, n, rng):
+    k = params.get('k', 30.0)
+    return rng.beta(max(1e-6, strength * k), max(1e-6, (1.0 - strength) * k), n)
+
+
+def _mixture_normal(strength, params, n, rng):
+    p = params.get('p', 0.3)
+    delta = params.get('delta', 0.07)
+    first = rng.random(n) < p
+    high = rng.normal(strength + delta, params.get('sd1', 0.03), n)
+    low = rng.normal(strength - delta, params.get('sd2', 0.06), n)
+    return np.where(first, high, low)
+
+
+def _max_of_n(strength, params, n, rng):
+    draws = rng.normal(strength - 0.02, params.get('sd', 0.05), (n, params.get('n', 3)))
+    return draws.max(axis=1)
+
+
+def _skew_normal_approx(strength, params, n, rng):
+    rho = params.get('rho', 0.6)
+    z1 = np.abs(rng.standard_normal(n))
+    z2 = rng.standard_normal(n)
+    return strength + params.get('sd', 0.05) * (rho * z1 + (1 - rho) * z2)
+
+
+SAMPLERS_NP = {
+    'normal': _normal,
+    'laplace': _laplace,
+    'student_t': _student_t,
+    'logistic': _logistic,
+    'lognormal': _lognormal,
+    'beta': _beta,
+    'mixture_normal': _mixture_normal,
+    'max_of_n': _max_of_n,
+    'skew_normal_approx': _skew_normal_approx,
+}
+
+
+def sample(strength, spec, n, rng):
+    """n performance draws for one team with the given distribution spec."""
+    name = spec.get('name', 'normal')
+    func = SAMPLERS_NP.get(name)
+    if func is None:
+        raise ValueError(f"Unknown sampler {name}")
+    return func(calibrated_strength(strength, spec), spec.get('params', {}), n, rng)
+
+
+# -------------------
+# PROBABILITIES
+# -------------------
+def probability_A_beats_B_np(teamA_strength, teamB_strength, specA, specB, trials_mc=3000, rng=None):
+    """Vectorized Monte Carlo estimate of P(A beats B)."""
+    rng = rng if rng is not None else np.random.default_rng()
+    a = sample(teamA_strength, specA, trials_mc, rng)
+    b = sample(teamB_strength, specB, trials_mc, rng)
+    return float(np.count_nonzero(a > b)) / trials_mc
+
+
+def team_samples(teams, trials_mc, rng):
+    """(n_teams, trials_mc) performance draws, one row per team."""
+    return np.stack([
+        sample(t["true_strength"], {'name': t.get("dist_name") or 'normal', 'params': t.get("dist_params") or {}},
+               trials_mc, rng)
+        for t in teams
+    ])
+
+
+def probability_matrix(teams, trials_mc=1200, rng=None):
+    """
+    win[i, j] = P(teams[i] beats teams[j]) from one draw matrix: every pair
+    compares the same trials_mc draws per team (win[j, i] = 1 - win[i, j]).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    draws = team_samples(teams, trials_mc, rng)
+    n = len(teams)
+    win = np.full((n, n), 0.5)
+    for i in range(n - 1):
+        win[i, i + 1:] = (draws[i] > draws[i + 1:]).mean(axis=1)
+        win[i + 1:, i] = 1.0 - win[i, i + 1:]
+    return win
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+what_if.py
+
+Read-only what-if evaluation of a candidate trade set: the Asset 1 and Asset 2
+payoffs each player would be settled under every possible result of the round,
+without running calculate_payout_price.py or touching portfolio state.
+
+calculate_round's P&L is linear in each team's round result w (1 = won):
+
+    Asset 1 trade:  s * q * (100 * w - price)                   -> asset1_realized
+    Asset 2 trade:  s * q * (asset2_price - price)  if w = 1    -> asset2_pnl
+                    s * q * (0 - price)             if w = 0    -> asset1_realized
+
+(s = +1 for a buy, -1 for a sell), so a trade set reduces to a few
+(n_players, n_teams) coefficient matrices and every scenario's payoffs come out
+of one matrix product against a (n_scenarios, n_teams) 0/1 win matrix.
+Prices come from round_N_prices.csv via load_round_prices, the same table
+settlement uses, and positions are validated with calculate_round (overselling
+is rejected exactly as on upload).
+
+Scenarios:
+ - outcomes:  every combination of the round's matches (2 ** n_matches rows),
+              weighted by the market-implied probability from the Asset 1 prices
+ - simulated: the remaining bracket simulated n_sims times (risk_analytics),
+              equally weighted
+
+Outputs:
+ - whatif_roundN.csv (per player: expected, worst and best realized / Asset 2 /
+   total payoff, P(total > 0), and the worst-case outcome's winners)
+
+Requires:
+ - round_N_prices.csv; initial_state_internal.csv and tournament_results.csv
+   for --scenarios simulated
+ - numpy
+
+Usage:
+    python what_if.py --round 1 --trades mock_trades_round1.csv --round-prices round_1_prices.csv
+    python what_if.py --round 2 --trades my_trades.csv --round-prices round_2_prices.csv \
+        --scenarios simulated --sims 20000
+"""
+
+import argparse
+import csv
+import numpy as np
+from calculate_payout_price import load_round_prices, load_trades, calculate_round
+from live_repricer import load_results
+from risk_analytics import INPUT_INTERNAL, INPUT_RESULTS, N_SIMS, RNG_SEED, conditioned_bracket, \
+    payoff_matrix, simulate_remaining
+from simulate_tournament import load_teams
+
+# -------------------
+# CONFIG
+# -------------------
+MAX_ENUMERATED_MATCHES = 20     # 2 ** 20 outcome rows
+CHUNK_SCENARIOS = 8192          # scenarios per matrix product in summarize()
+SCENARIOS = ("outcomes", "simulated")
+
+
+def round_matches(prices_file, round_num):
+    """[(team_A, team_B, p_A)] for the round, p_A implied by the Asset 1 prices."""
+    matches = []
+    with open(prices_file, newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get("round") and int(row["round"]) != round_num:
+                continue
+            a, b = row["team_A"].strip(), row["team_B"].strip()
+            pa, pb = float(row.get("team_A_price") or 0), float(row.get("team_B_price") or 0)
+            matches.append((a, b, pa / (pa + pb) if pa + pb > 0 else 0.5))
+    return matches
+
+
+# -------------------
+# TRADE BOOK
+# -------------------
+class TradeBook:
+    """
+    A validated trade set as per-team coefficient matrices (rows = players,
+    columns = teams). realized = const + win @ a1_coef.T - (1 - win) @ a2_cost.T,
+    asset2 = win @ (a2_value - a2_cost).T.
+    """
+
+    def __init__(self, player_ids, team_ids, const, a1_coef, a2_cost, a2_value):
+        self.player_ids = player_ids
+        self.team_ids = team_ids
+        self.const = const
+        self.a1_coef = a1_coef
+        self.a2_cost = a2_cost
+        self.a2_value = a2_value
+
+    @classmethod
+    def from_trades(cls, trades, round_prices, team_ids=()):
+        """None if the trades oversell (calculate_round prints the POSITION_ERROR)."""
+        if calculate_round(None, {}, trades, round_prices, holdings={}) is None:
+            return None
+        player_ids = list(dict.fromkeys(t.player_id for t in trades))
+        team_ids = list(dict.fromkeys(list(team_ids) + [t.team_id for t in trades]))
+        row = {pid: i for i, pid in enumerate(player_ids)}
+        col = {tid: j for j, tid in enumerate(team_ids)}
+        shape = (len(player_ids), len(team_ids))
+        const = np.zeros(len(player_ids))
+        a1_coef, a2_cost, a2_qty = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+        for t in trades:
+            i, j = row[t.player_id], col[t.team_id]
+            signed = t.quantity if t.action == "buy" else -t.quantity
+            if t.asset == "1":
+                const[i] -= signed * t.price
+                a1_coef[i, j] += 100.0 * signed
+            elif t.asset == "2":
+                a2_cost[i, j] += signed * t.price
+                a2_qty[i, j] += signed
+        price2 = np.array([round_prices.get(tid, {}).get("asset2", 0) for tid in team_ids], dtype=np.float64)
+        return cls(player_ids, team_ids, const, a1_coef, a2_cost, a2_qty * price2)
+
+    def payoffs(self, win):
+        """(realized, asset2), each (n_players, n_scenarios), for a (n_scenarios, n_teams) 0/1 matrix."""
+        win = np.asarray(win, dtype=np.float64)
+        realized = self.const[:, None] + self.a1_coef @ win.T - self.a2_cost @ (1.0 - win).T
+        asset2 = (self.a2_value - self.a2_cost) @ win.T
+        return realized, asset2
+
+
+# -------------------
+# SCENARIOS
+# -------------------
+def enumerate_outcomes(matches, team_ids):
+    """(win, weights) over all 2 ** len(matches) results; bit k of the row index is match k's winner."""
+    if len(matches) > MAX_ENUMERATED_MATCHES:
+        raise ValueError(f"{len(matches)} matches is too many to enumerate; use --scenarios simulated")
+    col = {tid: j for j, tid in enumerate(team_ids)}
+    bits = (np.arange(2 ** len(matches))[:, None] >> np.arange(len(matches))) & 1   # 1 = team_B won
+    win = np.zeros((len(bits), len(team_ids)))
+    weights = np.ones(len(bits))
+    for k, (a, b, pa) in enumerate(matches):
+        b_won = bits[:, k]
+        win[:, col[a]] = 1 - b_won
+        win[:, col[b]] = b_won
+        weights *= np.where(b_won, 1.0 - pa, pa)
+    return win, weights
+
+
+def simulated_outcomes(team_ids, round_num, n_sims=N_SIMS, seed=RNG_SEED,
+                       internal=INPUT_INTERNAL, results=INPUT_RESULTS):
+    """(win, weights) from n_sims simulations of the bracket conditioned on earlier rounds."""
+    teams = load_teams(internal)
+    bracket = conditioned_bracket(teams, load_results(results), round_num)
+    winners = simulate_remaining(bracket, n_sims, np.random.default_rng(seed))
+    round_win = payoff_matrix(bracket, winners, round_num)[:, :len(teams)] / 100.0
+    col = {tid: j for j, tid in enumerate(team_ids)}
+    win = np.zeros((n_sims, len(team_ids)))
+    for k, t in enumerate(teams):
+        if t["team_name"] in col:
+            win[:, col[t["team_name"]]] = round_win[:, k]
+    return win, np.full(n_sims, 1.0 / n_sims)
+
+
+def summarize(book, win, weights, chunk=CHUNK_SCENARIOS):
+    """Per-player weighted mean / min / max of each payoff and P(total > 0), in scenario chunks."""
+    n = len(book.player_ids)
+    weights = weights / weights.sum()
+    out = {f"{stat}_{kind}": np.zeros(n) if stat == "expected" else np.full(n, np.inf if stat == "worst" else -np.inf)
+           for stat in ("expected", "worst", "best") for kind in ("realized", "asset2", "total")}
+    out["prob_profit"] = np.zeros(n)
+    out["worst_scenario"] = np.zeros(n, dtype=np.int64)
+    for lo in range(0, len(win), chunk):
+        realized, asset2 = book.payoffs(win[lo:lo + chunk])
+        w = weights[lo:lo + chunk]
+        for kind, values in (("realized", realized), ("asset2", asset2), ("total", realized + asset2)):
+            out[f"expected_{kind}"] += values @ w
+            out[f"best_{kind}"] = np.maximum(out[f"best_{kind}"], values.max(axis=1))
+            if kind == "total":
+                idx = values.argmin(axis=1)
+                lower = values[np.arange(n), idx] < out["worst_total"]
+                out["worst_scenario"][lower] = lo + idx[lower]
+            out[f"worst_{kind}"] = np.minimum(out[f"worst_{kind}"], values.min(axis=1))
+        out["prob_profit"] += (realized + asset2 > 0) @ w
+    return out
+
+
+def evaluate(trades, round_num, round_prices, prices_file, scenarios="outcomes", n_sims=N_SIMS, seed=RNG_SEED):
+    """(book, win, weights, summary) for a candidate trade set, or None on a position error."""
+    matches = round_matches(prices_file, round_num)
+    book = TradeBook.from_trades(trades, round_prices, [t for m in matches for t in m[:2]])
+    if book is None:
+        return None
+    if scenarios == "outcomes":
+        win, weights = enumerate_outcomes(matches, book.team_ids)
+    else:
+        win, weights = simulated_outcomes(book.team_ids, round_num, n_sims, seed)
+    return book, win, weights, summarize(book, win, weights)
+
+
+def write_whatif_csv(book, win, summary, path):
+    stats = [f"{stat}_{kind}" for stat in ("expected", "worst", "best") for kind in ("realized", "asset2", "total")]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["player_id"] + stats + ["prob_profit", "worst_case_winners"])
+        for i, pid in enumerate(book.player_ids):
+            worst = win[summary["worst_scenario"][i]]
+            winners = ";".join(tid for tid, w in zip(book.team_ids, worst) if w)
+            writer.writerow([pid] + [round(float(summary[s][i]), 2) for s in stats]
+                            + [round(float(summary["prob_profit"][i]), 4), winners])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--round", type=int, required=True, help="Current round number")
+    parser.add_argument("--trades", type=str, required=True, help="Candidate trades CSV")
+    parser.add_argument("--round-prices", type=str, required=True, help="Path to round_N_prices.csv")
+    parser.add_argument("--scenarios", choices=SCENARIOS, default="outcomes", help="Outcome enumeration or simulation")
+    parser.add_argument("--sims", type=int, default=N_SIMS, help="Simulations for --scenarios simulated")
+    parser.add_argument("--seed", type=int, default=RNG_SEED, help="RNG seed for the simulations")
+    parser.add_argument("--output", type=str, help="Output CSV (default whatif_roundN.csv)")
+    args = parser.parse_args()
+
+    round_prices = load_round_prices(args.round_prices, args.round)
+    trades = load_trades(args.trades, round_prices)
+    result = evaluate(trades, args.round, round_prices, args.round_prices, args.scenarios, args.sims, args.seed)
+    if result is None:
+        return
+    book, win, weights, summary = result
+    output = args.output or f"whatif_round{args.round}.csv"
+    write_whatif_csv(book, win, summary, output)
+    print(f"Wrote what-if payoffs for {len(book.player_ids)} players over {len(win)} scenarios to {output}")
+
+
+if __name__ == "__main__":
+    main()